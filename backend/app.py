@@ -15,6 +15,14 @@ from routes.mindmap_explain_routes import mindmap_explain_bp
 from routes.insights_routes import insights_bp
 from routes.chatbot_routes import chatbot_bp
 from routes.feedback_routes import feedback_bp
+from routes.cache_routes import cache_bp
+from routes.job_routes import job_bp
+from routes.chart_routes import chart_bp
+from routes.bundle_routes import bundle_bp
+from routes.upstream_routes import upstream_bp
+from routes.metrics_routes import metrics_bp
+from utils.request_deadline import install_request_deadlines
+from utils.telemetry import install_telemetry
 
 import os
 from dotenv import load_dotenv
@@ -46,8 +54,24 @@ app.register_blueprint(mindmap_explain_bp)
 app.register_blueprint(insights_bp)
 app.register_blueprint(chatbot_bp)
 app.register_blueprint(feedback_bp)
+app.register_blueprint(cache_bp)
+app.register_blueprint(job_bp)
+app.register_blueprint(chart_bp)
+app.register_blueprint(bundle_bp)
+app.register_blueprint(upstream_bp)
+app.register_blueprint(metrics_bp)
+
+# Telemetry first: after_request hooks run in reverse, so it sees the final status
+install_telemetry(app)
+install_request_deadlines(app)
 
 os.makedirs("uploads", exist_ok=True)
 
 if __name__ == "__main__":
-    app.run(debug=True, port=5000, host="127.0.0.1")
+    # Development server only; use serve.py (gunicorn) in production.
+    app.run(
+        debug=os.getenv("FLASK_DEBUG", "0") == "1",
+        host=os.getenv("HOST", "127.0.0.1"),
+        port=int(os.getenv("PORT", "5000")),
+        threaded=True,
+    )
@@ -0,0 +1,79 @@
+"""
+bench_chart_tables.py
+Regression check and throughput benchmark for chart_service.extract_all_tables.
+
+fixtures/charts/<name>.txt is the input and <name>.tables.json the tables
+it must produce, recorded from the original three-parser implementation.
+
+Run from backend/:
+    python benchmarks/bench_chart_tables.py [--repeat N] [--scale N]
+"""
+
+import os
+import sys
+import glob
+import json
+import time
+import argparse
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from services.chart_service import extract_all_tables  # noqa: E402
+
+FIXTURE_DIR = os.path.join(BACKEND_DIR, "benchmarks", "fixtures", "charts")
+
+
+def load_fixtures():
+    fixtures = []
+    for path in sorted(glob.glob(os.path.join(FIXTURE_DIR, "*.txt"))):
+        with open(path, encoding="utf-8") as f:
+            source = f.read()
+        with open(path[:-4] + ".tables.json", encoding="utf-8") as f:
+            expected = json.load(f)
+        fixtures.append((os.path.basename(path), source, expected))
+    return fixtures
+
+
+def check_regressions(fixtures) -> int:
+    failures = 0
+    for name, source, expected in fixtures:
+        if extract_all_tables(source) != expected:
+            print(f"[ChartTables] table mismatch: {name}")
+            failures += 1
+    return failures
+
+
+def benchmark(fixtures, repeat: int, scale: int) -> float:
+    # A whole-book sized input: every fixture repeated back to back
+    corpus = "\n".join(source for _, source, _ in fixtures) * scale
+    size_mb = len(corpus.encode("utf-8")) / (1024 * 1024)
+
+    extract_all_tables(corpus)  # warm-up
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        extract_all_tables(corpus)
+        best = min(best, time.perf_counter() - start)
+
+    mb_per_s = size_mb / best
+    print(f"[ChartTables] {size_mb:.2f} MB in {best * 1000:.1f} ms (best of {repeat}) -> {mb_per_s:.1f} MB/s")
+    return mb_per_s
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--scale", type=int, default=300, help="copies of the fixture corpus to scan")
+    args = parser.parse_args()
+
+    fixtures = load_fixtures()
+    failures = check_regressions(fixtures)
+    print(f"[ChartTables] {len(fixtures) - failures}/{len(fixtures)} fixtures match")
+    if failures:
+        sys.exit(1)
+    benchmark(fixtures, args.repeat, args.scale)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+bench_serving.py
+Closed-loop load generator: N concurrent clients hammer one endpoint for a
+fixed duration and the sustained requests/second and latency percentiles
+are reported. Pair it with stub_llm_server.py so the numbers measure the
+serving model, not the LLM provider. Every client sends the same payload,
+so start the backend with RESPONSE_CACHE_ENABLED=0 REQUEST_COALESCING=0.
+
+    python benchmarks/bench_serving.py --url http://127.0.0.1:5000/simplify_text \
+        --concurrency 64 --duration 30
+"""
+
+import json
+import time
+import argparse
+import threading
+import requests
+
+
+def _percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def run(url: str, payload: dict, concurrency: int, duration: float) -> dict:
+    latencies, errors = [], []
+    lock = threading.Lock()
+    stop_at = time.monotonic() + duration
+
+    def client():
+        session = requests.Session()
+        while time.monotonic() < stop_at:
+            start = time.monotonic()
+            try:
+                ok = session.post(url, json=payload, timeout=600).status_code < 400
+            except requests.RequestException:
+                ok = False
+            elapsed = time.monotonic() - start
+            with lock:
+                (latencies if ok else errors).append(elapsed)
+
+    threads = [threading.Thread(target=client, daemon=True) for _ in range(concurrency)]
+    started = time.monotonic()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.monotonic() - started
+
+    return {
+        "url": url,
+        "concurrency": concurrency,
+        "duration_s": round(wall, 2),
+        "requests": len(latencies),
+        "errors": len(errors),
+        "rps": round(len(latencies) / wall, 2),
+        "p50_ms": round(_percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(_percentile(latencies, 95) * 1000, 1),
+        "p99_ms": round(_percentile(latencies, 99) * 1000, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:5000/simplify_text")
+    parser.add_argument("--payload", default='{"text": "Plants are made of different kinds of tissues."}')
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=30)
+    args = parser.parse_args()
+
+    print(json.dumps(run(args.url, json.loads(args.payload), args.concurrency, args.duration), indent=2))
+
+
+if __name__ == "__main__":
+    main()
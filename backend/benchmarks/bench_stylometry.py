@@ -0,0 +1,81 @@
+"""
+bench_stylometry.py
+Golden-output check and throughput benchmark for stylometrize_text.
+
+fixtures/stylometry/<name>.txt is the input and <name>.golden.txt the
+expected output, recorded from the original five-pass formatter. Any change
+to the formatter must keep every golden file byte-identical.
+
+Run from backend/:
+    python benchmarks/bench_stylometry.py [--repeat N] [--scale N]
+"""
+
+import os
+import sys
+import glob
+import time
+import argparse
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from services.stylometry_service import stylometrize_text  # noqa: E402
+
+FIXTURE_DIR = os.path.join(BACKEND_DIR, "benchmarks", "fixtures", "stylometry")
+
+
+def load_fixtures():
+    fixtures = []
+    for path in sorted(glob.glob(os.path.join(FIXTURE_DIR, "*.txt"))):
+        if path.endswith(".golden.txt"):
+            continue
+        with open(path, encoding="utf-8", newline="") as f:
+            source = f.read()
+        with open(path[:-4] + ".golden.txt", encoding="utf-8", newline="") as f:
+            golden = f.read()
+        fixtures.append((os.path.basename(path), source, golden))
+    return fixtures
+
+
+def check_golden(fixtures) -> int:
+    failures = 0
+    for name, source, golden in fixtures:
+        if stylometrize_text(source) != golden:
+            print(f"[Stylometry] golden mismatch: {name}")
+            failures += 1
+    return failures
+
+
+def benchmark(fixtures, repeat: int, scale: int) -> float:
+    # One large document built from every fixture, like a whole simplified chapter
+    corpus = "\n\n".join(source for _, source, _ in fixtures) * scale
+    size_mb = len(corpus.encode("utf-8")) / (1024 * 1024)
+
+    stylometrize_text(corpus)  # warm-up
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        stylometrize_text(corpus)
+        best = min(best, time.perf_counter() - start)
+
+    mb_per_s = size_mb / best
+    print(f"[Stylometry] {size_mb:.2f} MB in {best * 1000:.1f} ms (best of {repeat}) -> {mb_per_s:.1f} MB/s")
+    return mb_per_s
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--scale", type=int, default=200, help="copies of the fixture corpus to format")
+    args = parser.parse_args()
+
+    fixtures = load_fixtures()
+    failures = check_golden(fixtures)
+    print(f"[Stylometry] {len(fixtures) - failures}/{len(fixtures)} golden files match")
+    if failures:
+        sys.exit(1)
+    benchmark(fixtures, args.repeat, args.scale)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,345 @@
+"""
+bench_suite.py
+Micro-benchmarks for the CPU-bound paths, from one topic up to a whole
+textbook:
+
+    stylometry.stylometrize    services/stylometry_service.stylometrize_text
+    charts.extract_tables      services/chart_service.extract_all_tables
+    charts.render              services/chart_service._render_chart (uncached)
+    export.md_to_html          routes/export_routes._md_to_html (uncached)
+    export.render_pdf          routes/export_routes._render_pdf (cache miss)
+    pdf.extract_text           services/text_service.extract_text_from_pdf
+
+Inputs are built from the NCERT excerpts in fixtures/ (synthetic PDFs for
+the extractor), scaled to a topic (~3 KB), a chapter (~15 topics) and a
+book (~15 chapters); --pdf adds real textbook PDFs. Each function reports
+latency percentiles, throughput and the peak Python heap of one call
+(tracemalloc does not see memory held by PyMuPDF, WeasyPrint or Agg).
+
+Results are saved as JSON. Given --baseline, any function whose median
+latency grew by more than --threshold is flagged and the exit code is 1.
+Cases whose libraries are not installed are reported as skipped.
+
+Run from backend/:
+    python benchmarks/bench_suite.py
+    python benchmarks/bench_suite.py --only pdf,export --sizes topic,chapter
+    python benchmarks/bench_suite.py --baseline benchmarks/results/before.json --threshold 0.15
+"""
+
+import os
+import io
+import sys
+import glob
+import json
+import time
+import platform
+import shutil
+import tempfile
+import itertools
+import argparse
+import subprocess
+import tracemalloc
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+FIXTURE_DIR = os.path.join(BACKEND_DIR, "benchmarks", "fixtures")
+RESULTS_DIR = os.path.join(BACKEND_DIR, "benchmarks", "results")
+
+# Input size per scale, in characters of source text
+TEXT_SIZES = {"topic": 3_000, "chapter": 45_000, "book": 700_000}
+PDF_PAGES = {"topic": 2, "chapter": 20, "book": 250}
+CHARTS = {"topic": 1, "chapter": 6, "book": 40}
+
+
+# ---------- Fixtures ----------
+
+def _read_fixtures(pattern: str, exclude: str = None) -> list:
+    texts = []
+    for path in sorted(glob.glob(os.path.join(FIXTURE_DIR, pattern))):
+        if exclude and path.endswith(exclude):
+            continue
+        with open(path, encoding="utf-8", newline="") as f:
+            texts.append(f.read())
+    return texts
+
+
+def _grow(parts: list, size: int, sep: str = "\n\n") -> str:
+    """Whole fixtures back to back until the text reaches size characters."""
+    out, length, i = [], 0, 0
+    while length < size:
+        part = parts[i % len(parts)]
+        out.append(part)
+        length += len(part) + len(sep)
+        i += 1
+    return sep.join(out)
+
+
+def _raw_texts() -> list:
+    """Model output as stylometrize_text receives it."""
+    return _read_fixtures("stylometry/*.txt", exclude=".golden.txt")
+
+
+def _golden_texts() -> list:
+    """Stylometrized text, as the export routes receive it."""
+    return _read_fixtures("stylometry/*.golden.txt")
+
+
+def _synthetic_pdf(pages: int) -> bytes:
+    """A textbook-like PDF: every page filled with NCERT text."""
+    import fitz
+
+    text = _grow(_raw_texts() + _read_fixtures("charts/*.txt"), 2_400 * pages)
+    per_page = len(text) // pages
+    doc = fitz.open()
+    try:
+        for i in range(pages):
+            page = doc.new_page()
+            page.insert_textbox(fitz.Rect(50, 50, 545, 792), text[i * per_page:(i + 1) * per_page], fontsize=8)
+        return doc.tobytes()
+    finally:
+        doc.close()
+
+
+# ---------- Cases ----------
+#
+# Each case maps a size to (fn, input_bytes, items): fn runs the function once
+# on a prepared input, items optionally counts what it handles ({"pages": 20}).
+# Imports happen here so a missing library only skips its case.
+
+def case_stylometrize(size: str):
+    from services.stylometry_service import stylometrize_text
+    text = _grow(_raw_texts(), TEXT_SIZES[size])
+    return lambda: stylometrize_text(text), len(text.encode("utf-8")), None
+
+
+def case_extract_tables(size: str):
+    from services.chart_service import extract_all_tables
+    text = _grow(_read_fixtures("charts/*.txt"), TEXT_SIZES[size], sep="\n")
+    return lambda: extract_all_tables(text), len(text.encode("utf-8")), None
+
+
+def case_render_charts(size: str):
+    from services.chart_service import extract_all_tables, _chart_spec, _choose_chart_type, _render_local
+    tables = extract_all_tables("\n".join(_read_fixtures("charts/*.txt")))
+    specs = [
+        _chart_spec(_choose_chart_type(t["labels"]), t["labels"], t["values"], t["title"])
+        for t in (tables * CHARTS[size])[:CHARTS[size]]
+    ]
+
+    def run():
+        for spec in specs:
+            _render_local(spec)
+
+    return run, sum(len(json.dumps(s)) for s in specs), {"charts": len(specs)}
+
+
+def case_md_to_html(size: str):
+    from routes.export_routes import _md_to_html
+    text = _grow(_golden_texts(), TEXT_SIZES[size])
+    convert = _md_to_html.__wrapped__   # skip the fragment cache
+    return lambda: convert(text), len(text.encode("utf-8")), None
+
+
+def case_render_pdf(size: str):
+    from routes.export_routes import _md_to_html, _build_html, _render_pdf
+    body = _md_to_html.__wrapped__(_grow(_golden_texts(), TEXT_SIZES[size]))
+    html = _build_html("Benchmark", body)
+    calls = itertools.count()
+
+    def run():
+        # A fresh comment per call keeps every render a cache miss
+        _render_pdf(f"{html}<!-- {next(calls)} -->").close()
+
+    return run, len(html.encode("utf-8")), None
+
+
+def case_extract_pdf(size: str, pdf_bytes: bytes = None):
+    import fitz
+    from services.text_service import extract_text_from_pdf
+    data = pdf_bytes if pdf_bytes is not None else _synthetic_pdf(PDF_PAGES[size])
+    with fitz.open(stream=data, filetype="pdf") as doc:
+        pages = doc.page_count
+    return lambda: extract_text_from_pdf(io.BytesIO(data)), len(data), {"pages": pages}
+
+
+CASES = {
+    "stylometry.stylometrize": case_stylometrize,
+    "charts.extract_tables": case_extract_tables,
+    "charts.render": case_render_charts,
+    "export.md_to_html": case_md_to_html,
+    "export.render_pdf": case_render_pdf,
+    "pdf.extract_text": case_extract_pdf,
+}
+
+
+# ---------- Measurement ----------
+
+def _percentile(sorted_values: list, pct: float) -> float:
+    rank = (len(sorted_values) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(sorted_values) - 1)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (rank - low)
+
+
+def measure(fn, input_bytes: int, items: dict, min_time: float, min_runs: int, max_runs: int) -> dict:
+    fn()  # warm-up: imports, regex compilation, font loading
+    timings = []
+    started = time.perf_counter()
+    while len(timings) < max_runs and (len(timings) < min_runs or time.perf_counter() - started < min_time):
+        t0 = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - t0)
+
+    # Memory in a separate call so tracing does not slow the timed runs
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    timings.sort()
+    mean = sum(timings) / len(timings)
+    result = {
+        "runs": len(timings),
+        "input_bytes": input_bytes,
+        "p50_ms": round(_percentile(timings, 50) * 1000, 3),
+        "p95_ms": round(_percentile(timings, 95) * 1000, 3),
+        "p99_ms": round(_percentile(timings, 99) * 1000, 3),
+        "mean_ms": round(mean * 1000, 3),
+        "calls_per_s": round(1 / mean, 2),
+        "mb_per_s": round(input_bytes / (1024 * 1024) / mean, 3),
+        "peak_mb": round(peak / (1024 * 1024), 3),
+    }
+    for unit, count in (items or {}).items():
+        result[unit] = count
+        result[f"{unit}_per_s"] = round(count / mean, 2)
+    return result
+
+
+def run_suite(cases: list, sizes: list, pdfs: list, min_time: float, min_runs: int, max_runs: int) -> dict:
+    results = {}
+    jobs = [(name, size, None) for name in cases for size in sizes]
+    if "pdf.extract_text" in cases:
+        jobs += [("pdf.extract_text", f"real:{os.path.basename(p)}", p) for p in pdfs]
+
+    for name, size, pdf_path in jobs:
+        label = f"{name}[{size}]"
+        try:
+            if pdf_path:
+                with open(pdf_path, "rb") as f:
+                    fn, input_bytes, items = case_extract_pdf(size, f.read())
+            else:
+                fn, input_bytes, items = CASES[name](size)
+        except ImportError as e:
+            results[label] = {"skipped": f"{e.name or e} not installed"}
+            print(f"[Bench] {label}: skipped ({results[label]['skipped']})")
+            continue
+        except OSError as e:
+            # e.g. WeasyPrint installed without the Pango system library
+            results[label] = {"skipped": str(e).split(". ")[0]}
+            print(f"[Bench] {label}: skipped ({results[label]['skipped']})")
+            continue
+        result = measure(fn, input_bytes, items, min_time, min_runs, max_runs)
+        results[label] = result
+        if items:
+            rate = ", ".join(f"{result[unit + '_per_s']:.1f} {unit}/s" for unit in items)
+        else:
+            rate = f"{result['mb_per_s']:.2f} MB/s"
+        print(f"[Bench] {label}: p50 {result['p50_ms']:.2f} ms, p95 {result['p95_ms']:.2f} ms, "
+              f"{rate}, peak {result['peak_mb']:.1f} MB ({result['runs']} runs)")
+    return results
+
+
+# ---------- Reports ----------
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR,
+                              capture_output=True, text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    """Cases whose median latency grew by more than threshold (a fraction) over the baseline."""
+    regressions = []
+    for label, result in results.items():
+        before = baseline.get(label)
+        if "p50_ms" not in result or not before or "p50_ms" not in before:
+            continue
+        change = result["p50_ms"] / before["p50_ms"] - 1 if before["p50_ms"] else 0.0
+        result["p50_change"] = round(change, 4)
+        if change > threshold:
+            regressions.append({"case": label, "before_ms": before["p50_ms"],
+                                "after_ms": result["p50_ms"], "change": round(change, 4)})
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", help="comma-separated case names or prefixes (e.g. pdf,export.md_to_html)")
+    parser.add_argument("--sizes", default="topic,chapter,book", help="comma-separated: topic, chapter, book")
+    parser.add_argument("--pdf", action="append", default=[], help="real textbook PDF to extract (repeatable)")
+    parser.add_argument("--min-time", type=float, default=2.0, help="seconds to keep timing each case")
+    parser.add_argument("--min-runs", type=int, default=3)
+    parser.add_argument("--max-runs", type=int, default=200)
+    parser.add_argument("--output", help="results file (default: benchmarks/results/bench-<time>.json)")
+    parser.add_argument("--baseline", help="earlier results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="median latency growth counted as a regression (0.10 = 10%%)")
+    args = parser.parse_args()
+
+    sizes = [s.strip() for s in args.sizes.split(",") if s.strip()]
+    unknown = [s for s in sizes if s not in TEXT_SIZES]
+    if unknown:
+        parser.error(f"unknown sizes: {', '.join(unknown)}")
+    prefixes = [p.strip() for p in (args.only or "").split(",") if p.strip()]
+    cases = [name for name in CASES if not prefixes or any(name.startswith(p) for p in prefixes)]
+    if not cases:
+        parser.error(f"no case matches --only {args.only}")
+
+    # Rendered PDFs and charts go to a scratch cache, not the server's
+    scratch = tempfile.mkdtemp(prefix="edubridge-bench-")
+    os.environ["EXPORT_CACHE_DIR"] = os.path.join(scratch, "exports")
+    os.environ["CHART_CACHE_DIR"] = os.path.join(scratch, "charts")
+
+    try:
+        results = run_suite(cases, sizes, args.pdf, args.min_time, args.min_runs, args.max_runs)
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "results": results,
+    }
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline.get("results", {}), args.threshold)
+        report["baseline"] = {"path": args.baseline, "commit": baseline.get("commit"),
+                              "threshold": args.threshold, "regressions": regressions}
+        for r in regressions:
+            print(f"[Bench] REGRESSION {r['case']}: p50 {r['before_ms']:.2f} -> {r['after_ms']:.2f} ms "
+                  f"(+{r['change'] * 100:.1f}%)")
+        if not regressions:
+            print(f"[Bench] no regressions beyond {args.threshold * 100:.0f}% against {args.baseline}")
+
+    output = args.output or os.path.join(RESULTS_DIR, time.strftime("bench-%Y%m%d-%H%M%S.json"))
+    directory = os.path.dirname(output)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"[Bench] results saved to {output}")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+stub_llm_server.py
+Minimal OpenAI-compatible server for load tests: answers every
+POST .../chat/completions after a fixed delay, so serving throughput can be
+measured without real LLM calls or API quotas.
+
+    python benchmarks/stub_llm_server.py --port 8081 --latency 0.8
+then start the backend with BASE_URL=http://127.0.0.1:8081/v1.
+"""
+
+import json
+import time
+import argparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+REPLY = (
+    "Plants are made of tissues.\n\n"
+    "**Meristematic tissue:** cells that keep dividing.\n"
+    "- Found at root and shoot tips\n"
+    "- Increases length of the plant"
+)
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    latency = 0.5
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        if not self.path.endswith("/chat/completions"):
+            self.send_error(404)
+            return
+        time.sleep(self.latency)
+
+        if body.get("stream"):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for word in REPLY.split(" "):
+                self._chunk(_sse({"choices": [{"index": 0, "delta": {"content": word + " "}}]}))
+            self._chunk(b"data: [DONE]\n\n")
+            self._chunk(b"")
+            return
+
+        data = json.dumps({
+            "id": "stub",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "stub"),
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": REPLY}}],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+        }).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _chunk(self, data: bytes):
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+
+
+def _sse(payload: dict) -> bytes:
+    return f"data: {json.dumps(payload)}\n\n".encode("utf-8")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency", type=float, default=0.5, help="seconds before each reply")
+    args = parser.parse_args()
+
+    StubHandler.latency = args.latency
+    server = ThreadingHTTPServer((args.host, args.port), StubHandler)
+    server.daemon_threads = True
+    print(f"[StubLLM] listening on http://{args.host}:{args.port}/v1 (latency {args.latency}s)")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+gunicorn.conf.py
+Production server settings, all read from the environment.
+
+Nearly every endpoint waits on upstream HTTP (LLM, TTS, image APIs), so the
+default model is a few processes with many threads each ("gthread"). Model
+calls themselves are multiplexed on one asyncio loop per process (see
+utils/async_runtime.py), so threads only cover the open HTTP requests.
+For very high concurrency set WEB_WORKER_CLASS=gevent (pip install gevent).
+
+    WEB_CONCURRENCY       worker processes        (default: min(2 * CPUs, 4))
+    WEB_THREADS           threads per worker      (default: 16, gthread only)
+    WEB_WORKER_CLASS      gthread | gevent | sync (default: gthread)
+    WEB_WORKER_CONNECTIONS  gevent connections per worker (default: 200)
+    WEB_TIMEOUT           hard kill for a silent worker, seconds (default: 330,
+                          above the longest per-route timeout in ROUTE_TIMEOUTS)
+    WEB_GRACEFUL_TIMEOUT  seconds to finish in-flight requests on SIGTERM (default: 30)
+    WEB_KEEPALIVE         client keep-alive seconds (default: 5)
+    WEB_MAX_REQUESTS      recycle a worker after N requests, 0 = never (default: 0)
+    HOST / PORT           bind address (default: 0.0.0.0:5000)
+    LOG_LEVEL             gunicorn log level (default: info)
+
+Per-route request timeouts are REQUEST_TIMEOUT / ROUTE_TIMEOUTS, see
+utils/request_deadline.py.
+"""
+
+import os
+import multiprocessing
+
+# Workers share JOB_DIR; interrupted jobs are recovered once, in on_starting.
+os.environ.setdefault("JOB_RECOVER_ON_START", "0")
+
+bind = f"{os.getenv('HOST', '0.0.0.0')}:{os.getenv('PORT', '5000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", str(min(2 * multiprocessing.cpu_count(), 4))))
+worker_class = os.getenv("WEB_WORKER_CLASS", "gthread")
+threads = int(os.getenv("WEB_THREADS", "16"))
+worker_connections = int(os.getenv("WEB_WORKER_CONNECTIONS", "200"))
+timeout = int(os.getenv("WEB_TIMEOUT", "330"))
+graceful_timeout = int(os.getenv("WEB_GRACEFUL_TIMEOUT", "30"))
+keepalive = int(os.getenv("WEB_KEEPALIVE", "5"))
+max_requests = int(os.getenv("WEB_MAX_REQUESTS", "0"))
+max_requests_jitter = max_requests // 10
+loglevel = os.getenv("LOG_LEVEL", "info")
+accesslog = "-"
+errorlog = "-"
+
+
+def on_starting(server):
+    from utils.job_queue import recover_interrupted_jobs
+    recover_interrupted_jobs()
+
+
+def worker_exit(server, worker):
+    # Let running background jobs finish (bounded by graceful_timeout), then
+    # stop the chart rendering processes and the shared event loop.
+    from utils.job_queue import shutdown_job_queue
+    from services.chart_service import shutdown_chart_pool
+    from utils.async_runtime import shutdown_async_runtime
+    shutdown_job_queue(wait=True)
+    shutdown_chart_pool()
+    shutdown_async_runtime()
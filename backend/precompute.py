@@ -0,0 +1,72 @@
+"""
+precompute.py
+Pre-generate every topic artifact for a directory of NCERT PDFs into the
+artifact store, before the term starts:
+
+    python precompute.py books/
+    python precompute.py books/ --chapters chapters.json --topics 8 --llm-concurrency 16
+    python precompute.py --status
+
+chapters.json maps a PDF (relative to the books directory) to the page
+ranges teachers upload it by, e.g. {"science/class9.pdf": ["1-14", "15-30"]};
+without it each PDF is processed whole. Safe to interrupt and rerun: it
+resumes from the last checkpoint. Run it from the backend directory (or set
+ARTIFACT_STORE_PATH) so the server finds the store.
+"""
+
+import os
+import sys
+import json
+import argparse
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pdf_dir", nargs="?", help="directory of textbook PDFs (searched recursively)")
+    parser.add_argument("--chapters", help="JSON file mapping PDFs to page ranges")
+    parser.add_argument("--artifacts", default="simplified,mindmap,flashcards,quiz,insights,translation",
+                        help="comma-separated artifacts to generate")
+    parser.add_argument("--topics", type=int, default=4, help="topics processed at once")
+    parser.add_argument("--llm-concurrency", type=int, default=8, help="in-flight LLM calls per API key")
+    parser.add_argument("--translate-concurrency", type=int, default=2, help="topics translated at once")
+    parser.add_argument("--store", help="artifact store path (default: ARTIFACT_STORE_PATH)")
+    parser.add_argument("--status", action="store_true", help="print what the store holds and exit")
+    args = parser.parse_args(argv)
+
+    if not args.status and not args.pdf_dir:
+        parser.error("pdf_dir is required unless --status is given")
+
+    # The services read these once at import time
+    os.environ["RESPONSE_CACHE_ENABLED"] = "1"
+    os.environ["LLM_MAX_CONCURRENCY_PER_KEY"] = str(args.llm_concurrency)
+    os.environ["LLM_ASYNC_MAX_CONCURRENCY_PER_KEY"] = str(args.llm_concurrency)
+    if args.store:
+        os.environ["ARTIFACT_STORE_PATH"] = os.path.abspath(args.store)
+    pdf_dir = os.path.abspath(args.pdf_dir) if args.pdf_dir else None
+    chapters_path = os.path.abspath(args.chapters) if args.chapters else None
+    os.chdir(BACKEND_DIR)
+    sys.path.insert(0, BACKEND_DIR)
+
+    if args.status:
+        from utils.artifact_store import get_artifact_store
+        store = get_artifact_store()
+        print(json.dumps({"store": store.stats(), "progress": store.progress_summary()}, indent=2))
+        return 0
+
+    from services.precompute_service import run_pipeline, load_chapters
+
+    summary = run_pipeline(
+        pdf_dir,
+        artifacts=[a.strip() for a in args.artifacts.split(",") if a.strip()],
+        chapters=load_chapters(chapters_path) if chapters_path else None,
+        topic_concurrency=args.topics,
+        translate_concurrency=args.translate_concurrency,
+    )
+    print(json.dumps(summary, indent=2))
+    return 1 if summary["error"] or summary["units_failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
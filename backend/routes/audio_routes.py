@@ -1,7 +1,6 @@
-from flask import Blueprint, request, Response
+from flask import Blueprint, request, Response, redirect, send_file, stream_with_context, url_for
 from utils.response_formatter import error_response
-from services.audio_service import generate_audio_stream
-import json
+from services.audio_service import get_audio_key, get_cached_audio_by_key, open_audio_stream
 
 audio_bp = Blueprint("audio_bp", __name__)
 
@@ -15,14 +14,20 @@ def generate_audio_route():
         return error_response("No text provided", 400)
     
     try:
-        audio_stream = generate_audio_stream(text, language)
+        # Repeat requests: send the client to the cached file, where Range works
+        # (Werkzeug only honours Range on GET/HEAD)
+        key = get_audio_key(text, language)
+        if get_cached_audio_by_key(key):
+            return redirect(url_for("audio_bp.cached_audio_route", key=key), code=303)
+
+        audio_stream = open_audio_stream(text, language)
         
         if audio_stream is None:
             return error_response("Failed to generate audio", 500)
         
-        # Stream the audio directly
+        # Forward upstream chunks as they arrive
         return Response(
-            audio_stream,
+            stream_with_context(audio_stream),
             mimetype="audio/mpeg",
             headers={
                 "Content-Disposition": "attachment; filename=audio.mp3",
@@ -30,4 +35,17 @@ def generate_audio_route():
             }
         )
     except Exception as e:
-        return error_response(str(e))
\ No newline at end of file
+        return error_response(str(e))
+
+
+@audio_bp.route("/audio/<key>", methods=["GET"])
+def cached_audio_route(key):
+    """An already synthesized MP3, with Range and conditional GET support."""
+    cached = get_cached_audio_by_key(key)
+    if cached:
+        try:
+            return send_file(cached, mimetype="audio/mpeg", as_attachment=True,
+                             download_name="audio.mp3", conditional=True)
+        except FileNotFoundError:
+            pass  # evicted since the lookup
+    return error_response("Audio not found", 404)
@@ -0,0 +1,29 @@
+from flask import Blueprint, request
+from utils.response_formatter import error_response
+from utils.ndjson import ndjson_response
+from services.topic_bundle_service import iter_topic_bundle, BUNDLE_ARTIFACTS
+
+bundle_bp = Blueprint("bundle_bp", __name__)
+
+@bundle_bp.route("/topic_bundle", methods=["POST"])
+def topic_bundle_route():
+    """
+    Body: {"topic", "text", "artifacts": [...] (default: all), "simplified": bool}
+    Streams NDJSON, one line per artifact as soon as it is ready, then a
+    final {"artifact": "done"} line.
+    """
+    data = request.get_json(silent=True) or {}
+    topic = data.get("topic", "")
+    text = data.get("text", "")
+    artifacts = data.get("artifacts") or list(BUNDLE_ARTIFACTS)
+
+    if not topic or not text:
+        return error_response("Topic and text are required", 400)
+    if not isinstance(artifacts, list) or not all(isinstance(a, str) for a in artifacts):
+        return error_response("artifacts must be a list of artifact names", 400)
+    unknown = [a for a in artifacts if a not in BUNDLE_ARTIFACTS]
+    if unknown:
+        return error_response(f"Unknown artifacts: {', '.join(unknown)}", 400)
+
+    records = iter_topic_bundle(topic, text, dict.fromkeys(artifacts), bool(data.get("simplified")))
+    return ndjson_response(records)
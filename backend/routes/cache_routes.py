@@ -0,0 +1,31 @@
+from flask import Blueprint, request
+from utils.response_formatter import success_response
+from utils.response_cache import get_cache_stats, invalidate_namespace, purge_stale_entries
+from routes.export_routes import get_export_cache_stats
+from services.audio_service import get_audio_cache_stats
+from services.chart_service import get_chart_cache_stats
+
+cache_bp = Blueprint("cache_bp", __name__)
+
+@cache_bp.route("/cache/stats", methods=["GET"])
+def cache_stats_route():
+    stats = get_cache_stats()
+    stats["exports"] = get_export_cache_stats()
+    stats["audio"] = get_audio_cache_stats()
+    stats["charts"] = get_chart_cache_stats()
+    return success_response(stats)
+
+@cache_bp.route("/cache/invalidate", methods=["POST"])
+def cache_invalidate_route():
+    """
+    Drop one generator's entries, or every entry from an outdated prompt
+    version. Precomputed artifacts are read-only here; re-run precompute.py.
+    """
+    data = request.get_json(silent=True) or {}
+    namespace = data.get("namespace")
+
+    if namespace:
+        removed = invalidate_namespace(namespace)
+    else:
+        removed = purge_stale_entries()
+    return success_response({"removed": removed})
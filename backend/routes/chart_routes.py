@@ -0,0 +1,23 @@
+from flask import Blueprint, request
+from utils.response_formatter import success_response, error_response
+from services.chart_service import generate_charts_for_content, CHART_FORMATS
+
+chart_bp = Blueprint("chart_bp", __name__)
+
+@chart_bp.route("/generate_charts", methods=["POST"])
+def generate_charts_route():
+    """Charts for every data table found in the text, as PNG (base64) or SVG."""
+    data = request.get_json(silent=True) or {}
+    text = data.get("text", "")
+    fmt = (data.get("format") or "png").lower()
+
+    if not text:
+        return error_response("No text provided", 400)
+    if fmt not in CHART_FORMATS:
+        return error_response(f"format must be one of: {', '.join(CHART_FORMATS)}", 400)
+
+    try:
+        charts = generate_charts_for_content(text, fmt)
+        return success_response({"charts": charts})
+    except Exception as e:
+        return error_response(str(e))
@@ -1,27 +1,78 @@
 from flask import Blueprint, request
 from utils.response_formatter import success_response, error_response
-from services.chatbot_service import chat_with_bot
+from utils.sse import sse_event, sse_response, wants_stream
+from services.chatbot_service import chat_with_bot, stream_chat_with_bot
+from services.chat_session_service import (
+    open_session, get_session, delete_session, chat_in_session, stream_chat_in_session,
+)
 
 chatbot_bp = Blueprint("chatbot_bp", __name__)
 
 
 @chatbot_bp.route("/chat", methods=["POST"])
 def chat_route():
+    """
+    Stateless by default. With "session_id" (or "session": true) the turn
+    runs in a server-side session: only the new message needs to be sent,
+    and the reply comes with per-turn token/latency "usage". An unknown or
+    expired session_id starts a new session from topic/topic_content.
+    """
     data = request.get_json()
 
     topic = data.get("topic", "")
     topic_content = data.get("topic_content", "")
     conversation_history = data.get("conversation_history", [])  # list of {role, content}
     user_message = data.get("message", "").strip()
+    session_id = data.get("session_id")
 
     if not user_message:
         return error_response("No message provided", 400)
 
+    if session_id or data.get("session"):
+        session = get_session(session_id) if session_id else None
+        if session is None:
+            if not topic_content:
+                return error_response("Session expired; topic content is required to start a new one", 400)
+            session = get_session(open_session(topic, topic_content, conversation_history))
+
+        if wants_stream(data):
+            events = (sse_event(kind, payload) for kind, payload in stream_chat_in_session(session, user_message))
+            return sse_response(events)
+
+        try:
+            return success_response(chat_in_session(session, user_message))
+        except Exception as e:
+            return error_response(str(e))
+
     if not topic_content:
         return error_response("No topic content provided", 400)
 
+    if wants_stream(data):
+        events = (
+            sse_event(kind, payload)
+            for kind, payload in stream_chat_with_bot(topic, topic_content, conversation_history, user_message)
+        )
+        return sse_response(events)
+
     try:
         reply = chat_with_bot(topic, topic_content, conversation_history, user_message)
         return success_response({"reply": reply})
     except Exception as e:
-        return error_response(str(e))
\ No newline at end of file
+        return error_response(str(e))
+
+
+@chatbot_bp.route("/chat/sessions", methods=["POST"])
+def create_chat_session_route():
+    data = request.get_json(silent=True) or {}
+    topic_content = data.get("topic_content", "")
+    if not topic_content:
+        return error_response("No topic content provided", 400)
+    session_id = open_session(data.get("topic", ""), topic_content, data.get("conversation_history"))
+    return success_response({"session_id": session_id})
+
+
+@chatbot_bp.route("/chat/sessions/<session_id>", methods=["DELETE"])
+def delete_chat_session_route(session_id):
+    if not delete_session(session_id):
+        return error_response("Session not found", 404)
+    return success_response({"deleted": session_id})
@@ -1,17 +1,113 @@
 import base64
+import json
+import os
 import re
+import threading
+from functools import lru_cache
 from io import BytesIO
 from flask import Blueprint, request, send_file
 from weasyprint import HTML, CSS
-from utils.response_formatter import error_response
+from weasyprint.urls import URLFetcher, URLFetcherResponse
+from weasyprint.text.fonts import FontConfiguration
+from utils.response_formatter import success_response, error_response
+from utils.blob_cache import BlobCache, content_key
 
 export_bp = Blueprint("export_bp", __name__)
 
-# ---------- CSS ----------
+# Rendered PDFs keyed by a hash of the final HTML (title, topics, template and
+# images are all inlined into it), so an unchanged export skips WeasyPrint.
+EXPORT_CACHE_DIR = os.getenv("EXPORT_CACHE_DIR", os.path.join("cache", "exports"))
+EXPORT_CACHE_MAX_BYTES = int(os.getenv("EXPORT_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+# Per-topic markdown -> HTML fragments kept in memory
+EXPORT_FRAGMENT_CACHE_SIZE = int(os.getenv("EXPORT_FRAGMENT_CACHE_SIZE", "2048"))
+# Bump whenever BASE_CSS or the HTML layout changes
+EXPORT_LAYOUT_VERSION = "2"
+
+# Binary image uploads (mindmaps, page templates), content-addressed
+EXPORT_ASSET_DIR = os.getenv("EXPORT_ASSET_DIR", os.path.join("cache", "export_assets"))
+EXPORT_ASSET_MAX_BYTES = int(os.getenv("EXPORT_ASSET_MAX_BYTES", str(512 * 1024 * 1024)))
+
+_pdf_cache = BlobCache(EXPORT_CACHE_DIR, EXPORT_CACHE_MAX_BYTES, suffix=".pdf")
+_asset_store = BlobCache(EXPORT_ASSET_DIR, EXPORT_ASSET_MAX_BYTES, suffix=".img")
+_render_lock = threading.Lock()
+
+# ---------- Fonts & resource fetching ----------
+#
+# Rendering must never touch the network: fonts come from assets/fonts and
+# images are either uploaded assets or inline data: URLs, so any other URL is
+# refused outright instead of stalling the render until a timeout.
+
+ASSETS_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "assets"))
+ASSET_SCHEME = "edubridge-asset:"
+UPLOAD_SCHEME = "edubridge-upload:"
+_ASSET_ID_RE = re.compile(r"^[0-9a-f]{64}$")
+
+# (weight, file) pairs looked up in assets/fonts; missing files are skipped and
+# the font-family stack falls back to locally installed fonts.
+BUNDLED_FONTS = [
+    (400, "Nunito-Regular.ttf"),
+    (600, "Nunito-SemiBold.ttf"),
+    (700, "Nunito-Bold.ttf"),
+]
+
+
+class _LocalURLFetcher(URLFetcher):
+    """
+    Serves data: URLs and the edubridge-asset:/edubridge-upload: schemes, and
+    refuses everything else. URLs that fail are appended to `failed` when a
+    list is given, since WeasyPrint logs and skips them rather than raising.
+    """
+
+    def __init__(self, failed: list = None):
+        super().__init__()
+        self.failed = failed
+
+    def fetch(self, url, headers=None):
+        try:
+            return self._fetch_local(url, headers)
+        except Exception:
+            if self.failed is not None:
+                self.failed.append(url[:80])
+            raise
+
+    def _fetch_local(self, url, headers):
+        if url.startswith("data:"):
+            return super().fetch(url, headers)
+        if url.startswith(ASSET_SCHEME):
+            rel = url[len(ASSET_SCHEME):].lstrip("/")
+            path = os.path.abspath(os.path.join(ASSETS_DIR, rel))
+            if not path.startswith(ASSETS_DIR + os.sep):
+                raise ValueError(f"Asset path escapes assets dir: {url}")
+            with open(path, "rb") as f:
+                return URLFetcherResponse(url, f.read())
+        if url.startswith(UPLOAD_SCHEME):
+            asset_id = url[len(UPLOAD_SCHEME):]
+            path = _asset_store.get(asset_id) if _ASSET_ID_RE.match(asset_id) else None
+            if not path:
+                raise ValueError(f"Unknown export asset: {asset_id}")
+            # Handed to WeasyPrint as a file (closed by it): no base64 round-trip, no extra copy
+            return URLFetcherResponse(url, open(path, "rb"))
+        raise ValueError(f"External resource blocked during PDF export: {url[:80]}")
+
+
+def _font_face_css() -> str:
+    rules = []
+    for weight, filename in BUNDLED_FONTS:
+        if os.path.isfile(os.path.join(ASSETS_DIR, "fonts", filename)):
+            rules.append(
+                "@font-face { font-family: 'Nunito'; font-style: normal; "
+                f"font-weight: {weight}; src: url('{ASSET_SCHEME}fonts/{filename}'); }}"
+            )
+    return "\n".join(rules)
 
-BASE_CSS = CSS(string="""
-    @import url('https://fonts.googleapis.com/css2?family=Nunito:wght@400;600;700&display=swap');
 
+# Built once at import and shared by every render
+FONT_CONFIG = FontConfiguration()
+FONT_FACE_CSS = _font_face_css()
+
+# ---------- CSS ----------
+
+BASE_CSS_TEXT = """
     @page {
         size: A4;
         margin: 18mm 18mm 18mm 18mm;
@@ -126,10 +222,17 @@ BASE_CSS = CSS(string="""
         border-top: 1.5px solid #dde3f0;
         margin: 18px 0 6px 0;
     }
-""")
+"""
+
+BASE_CSS = CSS(
+    string=FONT_FACE_CSS + BASE_CSS_TEXT,
+    font_config=FONT_CONFIG,
+    url_fetcher=_LocalURLFetcher(),
+)
 
 # ---------- Markdown-to-HTML Converter ----------
 
+@lru_cache(maxsize=EXPORT_FRAGMENT_CACHE_SIZE)
 def _md_to_html(text: str) -> str:
     """
     Convert stylometrized markdown-ish text to clean HTML.
@@ -289,85 +392,155 @@ def _b64_to_data_url(data_url: str) -> str:
     return data_url or ""
 
 
-def _render_pdf(html_string: str) -> BytesIO:
-    pdf_bytes = HTML(string=html_string).write_pdf(stylesheets=[BASE_CSS])
+def _render_pdf(html_string: str):
+    key = content_key(EXPORT_LAYOUT_VERSION, FONT_FACE_CSS, html_string)
+    cached = _pdf_cache.get(key)
+    if cached:
+        try:
+            return open(cached, "rb")
+        except FileNotFoundError:
+            pass  # evicted between the lookup and the open; render it again
+
+    # WeasyPrint logs and skips resources its fetcher fails on, so note them:
+    # a PDF with missing images must not be cached under this HTML's key.
+    failed = []
+    fetcher = _LocalURLFetcher(failed)
+
+    # The shared FontConfiguration is not safe to use from two renders at
+    # once; layout is CPU-bound under the GIL anyway, so serialize it.
+    with _render_lock:
+        pdf_bytes = HTML(string=html_string, url_fetcher=fetcher).write_pdf(
+            stylesheets=[BASE_CSS], font_config=FONT_CONFIG
+        )
+    if failed:
+        print(f"[Export] Not caching PDF, {len(failed)} resource(s) failed to load: {', '.join(failed[:3])}")
+    else:
+        try:
+            _pdf_cache.put(key, pdf_bytes)
+        except OSError as e:
+            print(f"[Export] Could not cache rendered PDF: {e}")
     out = BytesIO(pdf_bytes)
     out.seek(0)
     return out
 
 
-# ---------- Routes ----------
+def get_export_cache_stats() -> dict:
+    fragments = _md_to_html.cache_info()
+    return {
+        "pdf": _pdf_cache.stats(),
+        "fragments": {
+            "hits": fragments.hits,
+            "misses": fragments.misses,
+            "items": fragments.currsize,
+            "max_items": fragments.maxsize,
+        },
+    }
 
-@export_bp.route("/export/notes/pdf", methods=["POST"])
-def export_notes_pdf():
-    data = request.get_json() or {}
+
+# ---------- Request parsing ----------
+#
+# Every export endpoint accepts either the original JSON body (images as
+# base64 data: URLs) or multipart/form-data with the images as binary file
+# parts. Images can also be referenced by the asset_id returned from
+# /export/assets, so a chapter's mindmaps only need uploading once.
+
+def _store_asset(file_storage) -> str:
+    data = file_storage.read()
+    asset_id = content_key(data)
+    if not _asset_store.get(asset_id):
+        _asset_store.put(asset_id, data)
+    return asset_id
+
+
+def _read_export_request():
+    """Return the export fields as a dict, whatever the request encoding."""
+    if request.files or request.content_type and request.content_type.startswith("multipart/"):
+        data = request.form.to_dict()
+        if "topics" in data:
+            try:
+                data["topics"] = json.loads(data["topics"])
+            except ValueError:
+                raise ValueError("'topics' must be a JSON array")
+        return data
+    return request.get_json() or {}
+
+
+def _image_src(data: dict, name: str, files=None, file_field: str = None) -> str:
+    """
+    Resolve an image for the page: a binary upload in `file_field`, an
+    `<name>_asset_id` reference, or the legacy `<name>_data_url` field.
+    """
+    upload = files.get(file_field or name) if files else None
+    if upload:
+        return f"{UPLOAD_SCHEME}{_store_asset(upload)}"
+
+    asset_id = data.get(f"{name}_asset_id")
+    if asset_id:
+        if not (_ASSET_ID_RE.match(asset_id) and _asset_store.get(asset_id)):
+            raise ValueError(f"Unknown asset_id for {name}")
+        return f"{UPLOAD_SCHEME}{asset_id}"
+
+    return data.get(f"{name}_data_url", "")
+
+
+# ---------- Document builders ----------
+#
+# Each builder turns the export fields into (html, download_name) and raises
+# ValueError for bad input. The routes and background export jobs share them.
+
+def _notes_document(data: dict, files=None):
     topic_name = data.get("topic_name", "Topic")
     content    = data.get("content", "")
-    template_data_url = data.get("template_data_url", "")
+    template_data_url = _image_src(data, "template", files)
 
     if not content:
-        return error_response("No content provided", 400)
+        raise ValueError("No content provided")
 
     body = f'<h1 class="chapter-title">{topic_name}</h1>\n'
     body += _md_to_html(content)
 
-    html = _build_html(topic_name, body, template_data_url)
-    out  = _render_pdf(html)
-    return send_file(out, mimetype="application/pdf", as_attachment=True,
-                     download_name=f"{topic_name}_notes.pdf")
+    return _build_html(topic_name, body, template_data_url), f"{topic_name}_notes.pdf"
 
 
-@export_bp.route("/export/mindmap/pdf", methods=["POST"])
-def export_mindmap_pdf():
-    data = request.get_json() or {}
+def _mindmap_document(data: dict, files=None):
     topic_name = data.get("topic_name", "Topic")
-    mindmap_data_url  = data.get("mindmap_image_data_url", "")
-    template_data_url = data.get("template_data_url", "")
+    mindmap_data_url  = _image_src(data, "mindmap_image", files)
+    template_data_url = _image_src(data, "template", files)
 
     if not mindmap_data_url:
-        return error_response("No mindmap image provided", 400)
+        raise ValueError("No mindmap image provided")
 
     body = f'<h1 class="chapter-title">{topic_name}</h1>\n'
     body += f'<div class="mindmap-section"><img src="{mindmap_data_url}" /></div>'
 
-    html = _build_html(topic_name, body, template_data_url)
-    out  = _render_pdf(html)
-    return send_file(out, mimetype="application/pdf", as_attachment=True,
-                     download_name=f"{topic_name}_mindmap.pdf")
+    return _build_html(topic_name, body, template_data_url), f"{topic_name}_mindmap.pdf"
 
 
-@export_bp.route("/export/topic/combined/pdf", methods=["POST"])
-def export_topic_combined_pdf():
-    data = request.get_json() or {}
+def _topic_combined_document(data: dict, files=None):
     topic_name = data.get("topic_name", "Topic")
     content    = data.get("content", "")
-    mindmap_data_url  = data.get("mindmap_image_data_url", "")
-    template_data_url = data.get("template_data_url", "")
+    mindmap_data_url  = _image_src(data, "mindmap_image", files)
+    template_data_url = _image_src(data, "template", files)
 
     if not content:
-        return error_response("No content provided", 400)
+        raise ValueError("No content provided")
     if not mindmap_data_url:
-        return error_response("No mindmap image provided", 400)
+        raise ValueError("No mindmap image provided")
 
     body  = f'<h1 class="chapter-title">{topic_name}</h1>\n'
     body += _md_to_html(content)
     body += f'<div class="mindmap-section"><img src="{mindmap_data_url}" /></div>'
 
-    html = _build_html(topic_name, body, template_data_url)
-    out  = _render_pdf(html)
-    return send_file(out, mimetype="application/pdf", as_attachment=True,
-                     download_name=f"{topic_name}_combined.pdf")
+    return _build_html(topic_name, body, template_data_url), f"{topic_name}_combined.pdf"
 
 
-@export_bp.route("/export/chapter/pdf", methods=["POST"])
-def export_chapter_pdf():
-    data = request.get_json() or {}
+def _chapter_document(data: dict, files=None):
     chapter_title = data.get("chapter_title", "Chapter Notes")
     topics        = data.get("topics", [])
-    template_data_url = data.get("template_data_url", "")
+    template_data_url = _image_src(data, "template", files)
 
     if not topics or not isinstance(topics, list):
-        return error_response("No topics provided", 400)
+        raise ValueError("No topics provided")
 
     body = f'<h1 class="chapter-title">{chapter_title}</h1>\n'
 
@@ -380,28 +553,27 @@ def export_chapter_pdf():
         body += f'<h2 class="topic-title">{topic_name}</h2>\n'
         body += _md_to_html(content)
 
-    html = _build_html(chapter_title, body, template_data_url)
-    out  = _render_pdf(html)
-    return send_file(out, mimetype="application/pdf", as_attachment=True,
-                     download_name="chapter_notes.pdf")
+    return _build_html(chapter_title, body, template_data_url), "chapter_notes.pdf"
 
 
-@export_bp.route("/export/chapter/combined/pdf", methods=["POST"])
-def export_chapter_combined_pdf():
-    data = request.get_json() or {}
+def _chapter_combined_document(data: dict, files=None):
     chapter_title = data.get("chapter_title", "Chapter Notes + Mindmaps")
     topics        = data.get("topics", [])
-    template_data_url = data.get("template_data_url", "")
+    template_data_url = _image_src(data, "template", files)
 
     if not topics or not isinstance(topics, list):
-        return error_response("No topics provided", 400)
+        raise ValueError("No topics provided")
 
     body = f'<h1 class="chapter-title">{chapter_title}</h1>\n'
 
     for idx, t in enumerate(topics, start=1):
         topic_name       = t.get("topic", f"Topic {idx}")
         content          = t.get("content", "")
-        mindmap_data_url = t.get("mindmap_image_data_url", "")
+        # Multipart uploads name each topic's image "mindmap_image_<n>" (1-based)
+        try:
+            mindmap_data_url = _image_src(t, "mindmap_image", files, f"mindmap_image_{idx}")
+        except ValueError as e:
+            raise ValueError(f"Topic {idx}: {e}")
 
         if idx > 1:
             body += '<hr class="topic-divider">'
@@ -411,7 +583,75 @@ def export_chapter_combined_pdf():
         if mindmap_data_url:
             body += f'<div class="mindmap-section"><img src="{mindmap_data_url}" /></div>\n'
 
-    html = _build_html(chapter_title, body, template_data_url)
-    out  = _render_pdf(html)
+    return _build_html(chapter_title, body, template_data_url), "chapter_combined.pdf"
+
+
+EXPORT_BUILDERS = {
+    "notes": _notes_document,
+    "mindmap": _mindmap_document,
+    "topic_combined": _topic_combined_document,
+    "chapter": _chapter_document,
+    "chapter_combined": _chapter_combined_document,
+}
+
+
+def render_export(kind: str, data: dict):
+    """Render an export outside a request (background jobs). Returns (pdf_bytes, download_name)."""
+    builder = EXPORT_BUILDERS.get(kind)
+    if builder is None:
+        raise ValueError(f"Unknown export type: {kind}")
+    html, download_name = builder(data)
+    out = _render_pdf(html)
+    try:
+        return out.read(), download_name
+    finally:
+        out.close()
+
+
+def _export_response(builder):
+    try:
+        data = _read_export_request()
+        html, download_name = builder(data, request.files)
+    except ValueError as e:
+        return error_response(str(e), 400)
+
+    out = _render_pdf(html)
     return send_file(out, mimetype="application/pdf", as_attachment=True,
-                     download_name="chapter_combined.pdf")
\ No newline at end of file
+                     download_name=download_name)
+
+
+# ---------- Routes ----------
+
+@export_bp.route("/export/assets", methods=["POST"])
+def upload_export_assets():
+    """Upload one or more images once; reference them later by asset_id."""
+    if not request.files:
+        return error_response("No files uploaded", 400)
+
+    assets = {field: _store_asset(f) for field, f in request.files.items()}
+    return success_response({"assets": assets}, "Assets stored")
+
+
+@export_bp.route("/export/notes/pdf", methods=["POST"])
+def export_notes_pdf():
+    return _export_response(_notes_document)
+
+
+@export_bp.route("/export/mindmap/pdf", methods=["POST"])
+def export_mindmap_pdf():
+    return _export_response(_mindmap_document)
+
+
+@export_bp.route("/export/topic/combined/pdf", methods=["POST"])
+def export_topic_combined_pdf():
+    return _export_response(_topic_combined_document)
+
+
+@export_bp.route("/export/chapter/pdf", methods=["POST"])
+def export_chapter_pdf():
+    return _export_response(_chapter_document)
+
+
+@export_bp.route("/export/chapter/combined/pdf", methods=["POST"])
+def export_chapter_combined_pdf():
+    return _export_response(_chapter_combined_document)
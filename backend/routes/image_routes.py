@@ -1,7 +1,8 @@
 from flask import Blueprint, request
 from utils.response_formatter import success_response, error_response
 from utils.gemini_client import initialize_imageprompt_client
-from services.image_service import generate_image_prompts, generate_images_runware
+from utils.sse import sse_event, sse_response, wants_stream
+from services.image_service import generate_image_prompts, generate_images_runware, iter_images_runware
 
 
 image_bp = Blueprint("image_bp", __name__)
@@ -16,10 +17,20 @@ def generate_images_route():
 
     client = initialize_imageprompt_client()
 
+    if wants_stream(data):
+        # One "image" event per finished image (in completion order), then "done".
+        def events():
+            prompts = generate_image_prompts(client, text)
+            yield sse_event("prompts", {"count": len(prompts)})
+            for index, image in iter_images_runware(prompts):
+                yield sse_event("image", {"index": index, **image})
+            yield sse_event("done", {"count": len(prompts)})
+        return sse_response(events())
+
     try:
         prompts = generate_image_prompts(client, text)        # Gemini
         images = generate_images_runware(prompts)             # Runware
 
         return success_response({"images": images, "count": len(images)})
     except Exception as e:
-        return error_response(str(e))
\ No newline at end of file
+        return error_response(str(e))
@@ -1,8 +1,8 @@
-import json
 from flask import Blueprint, request
 from utils.response_formatter import success_response, error_response
 from utils.gemini_client import initialize_simplify_client
-from services.insights_service import generate_insights
+from utils.sse import sse_event, sse_response, wants_stream
+from services.insights_service import generate_insights, parse_insights_json, stream_insights
 
 insights_bp = Blueprint("insights_bp", __name__)
 
@@ -14,31 +14,14 @@ def generate_insights_route():
         return error_response("No text provided", 400)
 
     client = initialize_simplify_client()
+
+    if wants_stream(data):
+        events = (sse_event(kind, payload) for kind, payload in stream_insights(client, text))
+        return sse_response(events)
+
     try:
         raw = generate_insights(client, text)
-        
-        # Find JSON object in the response (handles mixed text)
-        start_idx = raw.find('{')
-        if start_idx == -1:
-            return error_response("No JSON object found in response")
-        
-        # Find matching closing brace
-        brace_count = 0
-        end_idx = -1
-        for i in range(start_idx, len(raw)):
-            if raw[i] == '{':
-                brace_count += 1
-            elif raw[i] == '}':
-                brace_count -= 1
-                if brace_count == 0:
-                    end_idx = i + 1
-                    break
-        
-        if end_idx == -1:
-            return error_response("Malformed JSON in response")
-        
-        json_str = raw[start_idx:end_idx]
-        parsed = json.loads(json_str)
+        parsed = parse_insights_json(raw)
         return success_response(parsed)
     except Exception as e:
-        return error_response(str(e))
\ No newline at end of file
+        return error_response(str(e))
@@ -0,0 +1,92 @@
+from flask import Blueprint, request, send_file
+from utils.response_formatter import success_response, error_response
+from utils.gemini_client import initialize_imageprompt_client, initialize_mindmap_client
+from utils.job_queue import register_job_kind, submit_job, get_job, get_job_result
+from routes.export_routes import render_export
+from services.image_service import generate_image_prompts, iter_images_runware
+from services.mindmap_explain_service import generate_mindmap_explanation, text_to_speech_elevenlabs
+
+job_bp = Blueprint("job_bp", __name__)
+
+
+# ---------- Job kinds ----------
+
+def _export_job(payload, progress):
+    """payload: {"type": "notes" | "mindmap" | "topic_combined" | "chapter" | "chapter_combined", ...export fields}"""
+    progress(0.1, "Rendering PDF")
+    pdf_bytes, download_name = render_export(payload.get("type", ""), payload)
+    return pdf_bytes, "application/pdf", download_name
+
+
+def _images_job(payload, progress):
+    text = payload.get("text", "")
+    if not text:
+        raise ValueError("No text provided")
+
+    progress(0.05, "Writing image prompts")
+    prompts = generate_image_prompts(initialize_imageprompt_client(), text)
+    images = [None] * len(prompts)
+    for done, (index, image) in enumerate(iter_images_runware(prompts), start=1):
+        images[index] = image
+        progress(0.1 + 0.9 * done / len(prompts), f"{done}/{len(prompts)} images ready")
+    return {"images": images, "count": len(images)}
+
+
+def _explain_mindmap_job(payload, progress):
+    mindmap = payload.get("mindmap") or {}
+    if not mindmap.get("nodes"):
+        raise ValueError("Mindmap has no nodes")
+
+    progress(0.05, "Writing explanation")
+    explanation = generate_mindmap_explanation(initialize_mindmap_client(), mindmap)
+    progress(0.5, "Synthesizing audio")
+    audio_bytes = text_to_speech_elevenlabs(explanation)
+    return audio_bytes, "audio/mpeg", "mindmap_explanation.mp3"
+
+
+register_job_kind("export", _export_job)
+register_job_kind("generate_images", _images_job)
+register_job_kind("explain_mindmap", _explain_mindmap_job)
+
+
+# ---------- Routes ----------
+
+@job_bp.route("/jobs", methods=["POST"])
+def submit_job_route():
+    data = request.get_json() or {}
+    kind = data.get("kind", "")
+    payload = data.get("payload") or {}
+
+    if not isinstance(payload, dict):
+        return error_response("payload must be an object", 400)
+
+    try:
+        job = submit_job(kind, payload)
+        return success_response(job, "Job submitted")
+    except ValueError as e:
+        return error_response(str(e), 400)
+
+
+@job_bp.route("/jobs/<job_id>", methods=["GET"])
+def job_status_route(job_id):
+    job = get_job(job_id)
+    if job is None:
+        return error_response("Job not found", 404)
+    return success_response(job)
+
+
+@job_bp.route("/jobs/<job_id>/result", methods=["GET"])
+def job_result_route(job_id):
+    job = get_job(job_id)
+    if job is None:
+        return error_response("Job not found", 404)
+    if job["status"] == "failed":
+        return error_response(job["error"] or "Job failed", 500)
+
+    result = get_job_result(job_id)
+    if result is None:
+        return error_response(f"Job is {job['status']}", 409)
+
+    path, mimetype, filename = result
+    return send_file(path, mimetype=mimetype, as_attachment=bool(filename),
+                     download_name=filename, conditional=True)
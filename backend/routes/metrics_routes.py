@@ -0,0 +1,44 @@
+from flask import Blueprint, Response
+from utils.telemetry import render_metrics, render_metric
+from utils.gemini_client import get_client_pool_stats
+from utils.resilience import get_resilience_stats
+from utils.response_cache import get_cache_stats
+
+metrics_bp = Blueprint("metrics_bp", __name__)
+
+_CIRCUIT_STATES = {"closed": 0, "half_open": 1, "open": 2}
+
+
+def _state_metrics() -> list:
+    """The counters the /upstream/stats and /cache/stats endpoints report, as metrics."""
+    upstreams = get_resilience_stats()
+    pool = get_client_pool_stats()
+    cache = get_cache_stats()
+    coalescing = cache["coalescing"]
+
+    events = ("requests", "successes", "failures", "retries", "hedges",
+              "hedge_wins", "rejected", "circuit_opened")
+    return [
+        render_metric("upstream_circuit_state", "gauge", "Circuit breaker state (0 closed, 1 half open, 2 open)",
+                      [({"host": host}, _CIRCUIT_STATES[s["state"]]) for host, s in upstreams.items()]),
+        render_metric("upstream_events_total", "counter", "Upstream calls, retries, hedges and breaker events",
+                      [({"host": host, "event": e}, s[e]) for host, s in upstreams.items() for e in events]),
+        render_metric("llm_client_pool_total", "counter", "Client registry and connection pool events",
+                      [({"event": k}, v) for k, v in pool.items() if k != "clients"]),
+        render_metric("llm_clients", "gauge", "Pooled clients alive", [({}, pool["clients"])]),
+        render_metric("response_cache_lookups_total", "counter", "Response cache lookups by namespace and result",
+                      [({"namespace": ns, "result": result}, c[field])
+                       for ns, c in cache["namespaces"].items()
+                       for result, field in (("hit", "hits"), ("miss", "misses"))]),
+        render_metric("coalesced_calls_total", "counter", "Generation calls served by an identical in-flight call",
+                      [({"namespace": ns}, c["coalesced"]) for ns, c in coalescing["namespaces"].items()]),
+        render_metric("coalescing_in_flight", "gauge", "Distinct generation calls in flight",
+                      [({}, coalescing["in_flight"])]),
+    ]
+
+
+@metrics_bp.route("/metrics", methods=["GET"])
+def metrics_route():
+    """Prometheus text exposition of this worker's metrics."""
+    body = "\n".join([render_metrics()] + _state_metrics()) + "\n"
+    return Response(body, content_type="text/plain; version=0.0.4; charset=utf-8")
@@ -1,7 +1,7 @@
-from flask import Blueprint, request, Response
+from flask import Blueprint, request, Response, stream_with_context
 from utils.response_formatter import error_response
 from utils.gemini_client import initialize_mindmap_client   # reuse same Mistral client factory
-from services.mindmap_explain_service import explain_mindmap
+from services.mindmap_explain_service import explain_mindmap, explain_mindmap_pipelined
 
 mindmap_explain_bp = Blueprint("mindmap_explain_bp", __name__)
 
@@ -18,6 +18,42 @@ def explain_mindmap_route():
     if not nodes:
         return error_response("Mindmap has no nodes", 400)
 
+    if data.get("stream"):
+        # Pipelined mode: MP3 chunks are sent as each sentence group is voiced.
+        # The first chunk is produced before the 200 goes out, so LLM/TTS
+        # failures at the start still get a proper error response.
+        try:
+            client = initialize_mindmap_client()
+            chunks = explain_mindmap_pipelined(client, mindmap)
+            first = next(chunks, None)
+        except Exception as e:
+            return error_response(str(e), 500)
+        if first is None:
+            return error_response("No narration audio was produced", 500)
+
+        def generate():
+            try:
+                yield first
+                yield from chunks
+            except Exception as e:
+                # Too late for an error status: re-raise so the server drops the
+                # connection and the client sees a truncated response, not a clean end
+                print(f"[MindmapExplain] Pipelined narration failed mid-stream: {e}")
+                raise
+            finally:
+                chunks.close()
+
+        return Response(
+            stream_with_context(generate()),
+            status=200,
+            mimetype="audio/mpeg",
+            headers={
+                "Content-Disposition": "inline; filename=mindmap_explanation.mp3",
+                "Cache-Control": "no-cache",
+                "X-Accel-Buffering": "no",
+            },
+        )
+
     try:
         client = initialize_mindmap_client()   # same Mistral/OpenAI-compat client you already use
         audio_bytes = explain_mindmap(client, mindmap)
@@ -1,8 +1,9 @@
 from flask import Blueprint, request
 from utils.response_formatter import success_response, error_response
-from services.text_service import extract_text_from_pdf
+from services.text_service import iter_pdf_pages, parse_page_range
 from utils.gemini_client import initialize_openai_client
-from services.text_service import generate_json_dataset
+from services.text_service import structure_chapter
+from utils.telemetry import span
 
 pdf_bp = Blueprint("pdf_bp", __name__)
 
@@ -15,14 +16,26 @@ def upload_pdf():
     if file.filename == "":
         return error_response("No file selected", 400)
 
+    # Optional page range so a teacher can process one chapter of a whole book,
+    # e.g. pages=45-80 (1-based, inclusive)
     try:
-        text = extract_text_from_pdf(file)
+        first_page, last_page = parse_page_range(request.form.get("pages", ""))
+    except ValueError as e:
+        return error_response(str(e), 400)
+
+    try:
+        with span("pdf.extract") as s:
+            pages = list(iter_pdf_pages(file, first_page, last_page))
+            s.set(pages=len(pages))
+        text = "".join(f"{page}\n" for page in pages)
         client = initialize_openai_client()
-        dataset = generate_json_dataset(client, text)
+        dataset = structure_chapter(client, text, pages=pages)
 
-        if "error" in dataset:
+        if isinstance(dataset, dict) and "error" in dataset:
             return error_response(dataset["error"])
 
         return success_response(dataset, "PDF processed successfully")
+    except ValueError as e:
+        return error_response(str(e), 400)
     except Exception as e:
-        return error_response(str(e))
\ No newline at end of file
+        return error_response(str(e))
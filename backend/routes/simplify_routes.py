@@ -1,7 +1,8 @@
 from flask import Blueprint, request
 from utils.response_formatter import success_response, error_response
 from utils.gemini_client import initialize_simplify_client
-from services.simplify_service import simplify_text
+from utils.sse import sse_event, sse_response, wants_stream
+from services.simplify_service import simplify_text, stream_simplified_text
 
 simplify_bp = Blueprint("simplify_bp", __name__)
 
@@ -13,6 +14,11 @@ def simplify_text_route():
         return error_response("No text provided", 400)
 
     client = initialize_simplify_client()
+
+    if wants_stream(data):
+        events = (sse_event(kind, payload) for kind, payload in stream_simplified_text(client, text))
+        return sse_response(events)
+
     try:
         simplified_formatted = simplify_text(client, text)
         return success_response(simplified_formatted)
@@ -1,7 +1,7 @@
 from flask import Blueprint, request
 from utils.response_formatter import success_response, error_response
 from utils.gemini_client import initialize_openai_client
-from services.text_service import generate_json_dataset
+from services.text_service import structure_chapter
 
 text_bp = Blueprint("text_bp", __name__)
 
@@ -14,9 +14,9 @@ def extract_text():
 
     try:
         client = initialize_openai_client()
-        dataset = generate_json_dataset(client, text)
+        dataset = structure_chapter(client, text)
 
-        if "error" in dataset:
+        if isinstance(dataset, dict) and "error" in dataset:
             return error_response(dataset["error"])
 
         return success_response(dataset, "Text structured successfully")
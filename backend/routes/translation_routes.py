@@ -1,6 +1,6 @@
 from flask import Blueprint, request
 from utils.response_formatter import success_response, error_response
-from services.translation_service import translate_text_to_hindi
+from services.translation_service import translate_text_to_hindi, translate_texts_to_hindi
 
 translation_bp = Blueprint("translation_bp", __name__)
 
@@ -8,7 +8,16 @@ translation_bp = Blueprint("translation_bp", __name__)
 def translate_route():
     data = request.get_json()
     text = data.get("text", "")
-    
+    texts = data.get("texts")
+
+    # Batch form: {"texts": [...]} translates everything in one pass
+    if isinstance(texts, list):
+        try:
+            translated = translate_texts_to_hindi([str(t or "") for t in texts])
+            return success_response({"translated_texts": translated}, "Translation successful")
+        except Exception as e:
+            return error_response(f"Translation failed: {e}")
+
     if not text:
         return error_response("No text provided", 400)
     
@@ -16,4 +25,4 @@ def translate_route():
         translated_text = translate_text_to_hindi(text)
         return success_response({"translated_text": translated_text}, "Translation successful")
     except Exception as e:
-        return error_response(str(e))
\ No newline at end of file
+        return error_response(str(e))
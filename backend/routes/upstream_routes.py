@@ -0,0 +1,14 @@
+from flask import Blueprint
+from utils.response_formatter import success_response
+from utils.gemini_client import get_client_pool_stats
+from utils.resilience import get_resilience_stats
+
+upstream_bp = Blueprint("upstream_bp", __name__)
+
+@upstream_bp.route("/upstream/stats", methods=["GET"])
+def upstream_stats_route():
+    """Circuit breaker state, retry/hedge counts and latency percentiles per upstream host."""
+    return success_response({
+        "upstreams": get_resilience_stats(),
+        "client_pool": get_client_pool_stats(),
+    })
@@ -0,0 +1,36 @@
+"""
+serve.py
+Production entry point: `python serve.py`.
+
+Runs gunicorn with gunicorn.conf.py (all settings from the environment).
+gunicorn does not run on Windows, so there it falls back to waitress with
+WEB_THREADS threads in a single process.
+"""
+
+import os
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def main():
+    os.chdir(BACKEND_DIR)
+    if sys.platform == "win32":
+        from waitress import serve
+        from wsgi import app
+        serve(
+            app,
+            host=os.getenv("HOST", "0.0.0.0"),
+            port=int(os.getenv("PORT", "5000")),
+            threads=int(os.getenv("WEB_THREADS", "16")),
+            channel_timeout=int(os.getenv("WEB_TIMEOUT", "330")),
+        )
+        return
+
+    from gunicorn.app.wsgiapp import run
+    sys.argv = ["gunicorn", "-c", os.path.join(BACKEND_DIR, "gunicorn.conf.py"), "wsgi:app"]
+    run()
+
+
+if __name__ == "__main__":
+    main()
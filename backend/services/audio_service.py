@@ -1,22 +1,69 @@
 import requests
 import os
+import re
+import json
+import time
 from dotenv import load_dotenv
+from utils.gemini_client import get_http_session
+from utils.blob_cache import BlobCache, content_key
 
 load_dotenv()
 
 XI_API_KEY = os.getenv("ELEVENLABS_API_KEY")
 VOICE_ID = os.getenv("ELEVENLABS_VOICE_ID")
 
-def generate_audio_stream(text: str, language: str = "english"):
+TTS_MODEL_ID = "eleven_multilingual_v2"
+VOICE_SETTINGS = {
+    "stability": 0.8,
+    "similarity_boost": 0.9,
+    "style": 0.2,
+    "use_speaker_boost": False
+}
+TTS_CONNECT_TIMEOUT = float(os.getenv("TTS_CONNECT_TIMEOUT", "5"))
+TTS_READ_TIMEOUT = float(os.getenv("TTS_READ_TIMEOUT", "60"))
+# The read timeout only bounds the gap between chunks; this bounds the whole stream
+TTS_TOTAL_TIMEOUT = float(os.getenv("TTS_TOTAL_TIMEOUT", "180"))
+TTS_CHUNK_SIZE = 16 * 1024
+
+# Synthesized audio, keyed by text + voice + model + voice settings
+AUDIO_CACHE_DIR = os.getenv("AUDIO_CACHE_DIR", os.path.join("cache", "audio"))
+AUDIO_CACHE_MAX_BYTES = int(os.getenv("AUDIO_CACHE_MAX_BYTES", str(1024 * 1024 * 1024)))
+
+_audio_cache = BlobCache(AUDIO_CACHE_DIR, AUDIO_CACHE_MAX_BYTES, suffix=".mp3")
+_AUDIO_KEY_RE = re.compile(r"^[0-9a-f]{64}$")
+
+
+def _audio_key(text: str) -> str:
+    return content_key(text, VOICE_ID, TTS_MODEL_ID, json.dumps(VOICE_SETTINGS, sort_keys=True))
+
+
+def get_audio_key(text: str, language: str = "english") -> str:
+    """Key this text's MP3 is cached under, and served from at GET /audio/<key>."""
+    return _audio_key(text)
+
+
+def get_cached_audio(text: str, language: str = "english"):
+    """Path of an already synthesized MP3 for this text, or None."""
+    return _audio_cache.get(_audio_key(text))
+
+
+def get_cached_audio_by_key(key: str):
+    """Path of the cached MP3 with this key, or None (also for malformed keys)."""
+    if not _AUDIO_KEY_RE.match(key or ""):
+        return None
+    return _audio_cache.get(key)
+
+
+def open_audio_stream(text: str, language: str = "english"):
     """
-    Generate audio using ElevenLabs API and return as stream
-    
+    Start an ElevenLabs stream and return a generator of MP3 chunks that are
+    forwarded as they arrive and teed into the audio cache at the same time.
+    The generator's return value is True only if the whole MP3 arrived.
+    Returns None if the upstream request fails before any audio is sent.
+
     Args:
         text: Text to convert to speech
         language: "english" or "hindi"
-    
-    Returns:
-        Audio stream or None if failed
     """
     tts_url = f"https://api.elevenlabs.io/v1/text-to-speech/{VOICE_ID}/stream"
     
@@ -28,25 +75,84 @@ def generate_audio_stream(text: str, language: str = "english"):
     
     data = {
         "text": text,
-        "model_id": "eleven_multilingual_v2",
-        "voice_settings": {
-            "stability": 0.8,
-            "similarity_boost": 0.9,
-            "style": 0.2,
-            "use_speaker_boost": False
-        }
+        "model_id": TTS_MODEL_ID,
+        "voice_settings": VOICE_SETTINGS
     }
     
     try:
-        response = requests.post(tts_url, headers=headers, json=data, stream=True)
+        response = get_http_session("elevenlabs").post(
+            tts_url, headers=headers, json=data, stream=True,
+            timeout=(TTS_CONNECT_TIMEOUT, TTS_READ_TIMEOUT)
+        )
         
         if not response.ok:
             print(f"TTS Error: {response.text}")
+            response.close()
             return None
-        
-        # Return the raw content as bytes
-        return response.content
-        
+
     except Exception as e:
         print(f"Audio generation error: {e}")
-        return None
\ No newline at end of file
+        return None
+
+    def chunks():
+        writer = _audio_cache.writer(_audio_key(text))
+        complete = False
+        give_up = time.monotonic() + TTS_TOTAL_TIMEOUT
+        try:
+            for chunk in response.iter_content(chunk_size=TTS_CHUNK_SIZE):
+                if time.monotonic() > give_up:
+                    print(f"Audio stream took longer than {TTS_TOTAL_TIMEOUT:.0f}s, giving up")
+                    return
+                if chunk:
+                    writer.write(chunk)
+                    yield chunk
+            complete = True
+        except requests.exceptions.RequestException as e:
+            print(f"Audio stream interrupted: {e}")
+        finally:
+            response.close()
+            # Only publish complete files; a client disconnect leaves nothing behind
+            if complete:
+                writer.commit()
+            else:
+                writer.abort()
+        return complete
+
+    return chunks()
+
+
+def generate_audio_stream(text: str, language: str = "english"):
+    """
+    Generate audio using ElevenLabs API and return it as bytes
+    
+    Args:
+        text: Text to convert to speech
+        language: "english" or "hindi"
+    
+    Returns:
+        MP3 bytes or None if failed
+    """
+    cached = get_cached_audio(text, language)
+    if cached:
+        try:
+            with open(cached, "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            pass  # evicted since the lookup; synthesize it again
+
+    stream = open_audio_stream(text, language)
+    if stream is None:
+        return None
+    parts = []
+    try:
+        while True:
+            parts.append(next(stream))
+    except StopIteration as stop:
+        complete = bool(stop.value)
+    # A stream cut short (timeout, dropped connection) is never cached; don't return it either.
+    # A complete one is returned from memory, even if the cache has already evicted it.
+    return b"".join(parts) if complete else None
+
+
+def get_audio_cache_stats() -> dict:
+    return _audio_cache.stats()
@@ -6,191 +6,176 @@ generates matplotlib charts automatically. Works on:
   - Inline tables like "Bicycle | 30 | Motorcycle | 25"
   - Practice set data tables
   - Named number sequences (e.g. "Ramesh: 30, Shobha: 60")
+
+Charts are rendered as PNG (base64) or SVG, in parallel across a process
+pool, and cached on disk under CHART_CACHE_DIR.
 """
 
+import os
 import re
-import base64
 import io
+import json
+import base64
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 import matplotlib
 matplotlib.use("Agg")
-import matplotlib.pyplot as plt
 import matplotlib.ticker as ticker
-import numpy as np
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from utils.blob_cache import BlobCache, content_key
 
 _COLORS = [
     "#4CAEE1", "#2E86C1", "#87CEFA", "#1A9CD8",
     "#5DADE2", "#7FB3D3", "#AED6F1", "#0D6EAB",
 ]
 
-# ── Parsers ───────────────────────────────────────────────────
-
-def _parse_label_value_blocks(text: str) -> list:
-    """
-    Match blocks of lines like:
-        Bicycle: 30
-        Motorcycle: 25
-    or
-        Ramesh | 30 litres
-        Shobha | 60 litres
-    """
-    lines = text.split("\n")
-    tables, label_buf, value_buf, title_buf = [], [], [], None
-    prev_heading = None
-
-    row_re = re.compile(
-        r"^[-•*]?\s*\*{0,2}"
-        r"([A-Za-z][A-Za-z0-9\s\-/()']+?)"
-        r"\*{0,2}\s*[:|]\s*"
-        r"(\d+(?:\.\d+)?)"
-        r"(?:\s*(?:litres?|kg|km|cm|mm|°C|minutes?|hours?|trees?|animals?|students?|customers?|plants?|vehicles?|people|children|units?))?"
-        r"\s*$",
-        re.IGNORECASE
-    )
-    heading_re = re.compile(r"^(?:#{1,3}\s*)?([A-Z][A-Za-z0-9\s\-:()]+)$")
-
-    def flush(override_title=None):
-        nonlocal title_buf
-        if len(label_buf) >= 2:
-            tables.append({
-                "title":  override_title or title_buf,
-                "labels": label_buf[:],
-                "values": value_buf[:],
-            })
-        label_buf.clear(); value_buf.clear()
-        title_buf = override_title or None
-
-    for ln in lines:
+# ── Line tokenizer ────────────────────────────────────────────
+#
+# Every line is classified exactly once, then one linear scan feeds three
+# detectors that share those classifications:
+#   - label:value blocks   ("Bicycle: 30" / "Ramesh | 30 litres")
+#   - pipe tables          ("| Name | Ramesh | Shobha |" over a numeric row)
+#   - practice tables      (2+ space or tab separated, NCERT practice sets)
+
+_ROW_RE = re.compile(
+    r"^[-•*]?\s*\*{0,2}"
+    r"([A-Za-z][A-Za-z0-9\s\-/()']+?)"
+    r"\*{0,2}\s*[:|]\s*"
+    r"(\d+(?:\.\d+)?)"
+    r"(?:\s*(?:litres?|kg|km|cm|mm|°C|minutes?|hours?|trees?|animals?|students?|customers?|plants?|vehicles?|people|children|units?))?"
+    r"\s*$",
+    re.IGNORECASE
+)
+_HEADING_RE = re.compile(r"^(?:#{1,3}\s*)?([A-Z][A-Za-z0-9\s\-:()]+)$")
+_NUMBER_RE = re.compile(r"^\d+(?:\.\d+)?$")
+_PIPE_SEPARATOR_RE = re.compile(r"^[-|:\s]+$")
+_COLUMN_SPLIT_RE = re.compile(r"\s{2,}|\t")
+
+
+class _Line:
+    """One stripped line and everything the detectors need to know about it."""
+
+    __slots__ = ("text", "row", "is_heading", "pipe_parts", "pipe_numeric",
+                 "columns", "numeric_count")
+
+    def __init__(self, ln: str):
         s = ln.strip()
-        m = row_re.match(s)
-        if m:
-            label_buf.append(m.group(1).strip())
-            value_buf.append(float(m.group(2)))
-        else:
-            flush()
-            h = heading_re.match(s)
-            if h and 4 < len(s) < 80 and not s.endswith("."):
-                prev_heading = s
-                title_buf = s
-
-    flush()
-    return tables
-
-
-def _parse_inline_tables(text: str) -> list:
-    """
-    Match markdown-style tables:
-    | Name | Ramesh | Shobha | Ayub |
-    | Litres | 30 | 60 | 40 |
+        self.text = s
+
+        # label:value row, or else possibly a heading that titles the next block
+        m = _ROW_RE.match(s) if (":" in s or "|" in s) else None
+        self.row = (m.group(1).strip(), float(m.group(2))) if m else None
+        self.is_heading = (
+            m is None and 4 < len(s) < 80 and not s.endswith(".")
+            and _HEADING_RE.match(s) is not None
+        )
 
-    Or two-row inline tables from NCERT practice sets.
-    """
-    tables = []
-    lines = [ln.strip() for ln in text.split("\n") if ln.strip()]
-
-    i = 0
-    while i < len(lines) - 1:
-        row1 = lines[i]
-        row2 = lines[i + 1] if i + 1 < len(lines) else ""
-
-        # Detect pipe-separated rows
-        if row1.count("|") >= 2 and row2.count("|") >= 2:
-            parts1 = [p.strip() for p in row1.split("|") if p.strip()]
-            parts2 = [p.strip() for p in row2.split("|") if p.strip()]
-
-            # Try to figure out which row is labels and which is numbers
-            def all_numeric(parts):
-                return all(re.match(r'^\d+(?:\.\d+)?$', p) for p in parts)
-
-            if all_numeric(parts2) and not all_numeric(parts1):
-                # row1 = labels, row2 = values
-                if len(parts1) == len(parts2) and len(parts1) >= 2:
-                    # Skip separator rows like |---|---|
-                    if not re.match(r'^[-|:\s]+$', row2):
-                        tables.append({
-                            "title": None,
-                            "labels": parts1,
-                            "values": [float(v) for v in parts2],
-                        })
-                        i += 2
-                        continue
-            elif all_numeric(parts1) and not all_numeric(parts2):
-                if len(parts1) == len(parts2) and len(parts1) >= 2:
-                    tables.append({
-                        "title": None,
-                        "labels": parts2,
-                        "values": [float(v) for v in parts1],
-                    })
-                    i += 2
-                    continue
-        i += 1
-
-    return tables
-
-
-def _parse_ncert_practice_tables(text: str) -> list:
+        # pipe-separated cells
+        if s.count("|") >= 2:
+            self.pipe_parts = [p.strip() for p in s.split("|") if p.strip()]
+            self.pipe_numeric = all(_NUMBER_RE.match(p) for p in self.pipe_parts)
+        else:
+            self.pipe_parts = None
+            self.pipe_numeric = False
+
+        # whitespace-separated columns
+        self.columns = [p.strip() for p in _COLUMN_SPLIT_RE.split(s) if p.strip()]
+        self.numeric_count = sum(1 for p in self.columns if _NUMBER_RE.match(p))
+
+
+def _pipe_table(row1: _Line, row2: _Line):
+    """A labels row over a numbers row (either order), or None."""
+    parts1, parts2 = row1.pipe_parts, row2.pipe_parts
+    if len(parts1) != len(parts2) or len(parts1) < 2:
+        return None
+    if row2.pipe_numeric and not row1.pipe_numeric:
+        # Skip separator rows like |---|---|
+        if _PIPE_SEPARATOR_RE.match(row2.text):
+            return None
+        return {"title": None, "labels": parts1, "values": [float(v) for v in parts2]}
+    if row1.pipe_numeric and not row2.pipe_numeric:
+        return {"title": None, "labels": parts2, "values": [float(v) for v in parts1]}
+    return None
+
+
+def _practice_table(labels_row: _Line, values_row: _Line):
     """
     NCERT practice sets often have two-row tables like:
     Name    | Ramesh | Shobha | Ayub  | Julie | Rahul
     Litres  | 30     | 60     | 40    | 50    | 55
-
-    or Animals | Deer | Tiger | Monkey
-       Number  | 20   | 4     | 12
+    The first label cell is the row header when the labels row is longer.
     """
-    tables = []
-    lines = [ln for ln in text.split("\n")]
-
-    for i in range(len(lines) - 1):
-        ln1 = lines[i].strip()
-        ln2 = lines[i + 1].strip()
-
-        # Split by 2+ spaces or tabs (NCERT text often space-separated)
-        parts1 = re.split(r'\s{2,}|\t', ln1)
-        parts2 = re.split(r'\s{2,}|\t', ln2)
+    parts1, parts2 = labels_row.columns, values_row.columns
+    has_header = len(parts1) > len(parts2)
+    labels = parts1[1:] if has_header else parts1
+    values_raw = [p for p in parts2 if _NUMBER_RE.match(p)]
+    if len(labels) == len(values_raw) and len(labels) >= 2:
+        return {
+            "title": parts1[0] if has_header else None,
+            "labels": labels,
+            "values": [float(v) for v in values_raw],
+        }
+    return None
+
+
+def _scan_tables(text: str):
+    """
+    Single pass over the text. Returns the label:value, pipe and practice
+    tables as three lists, each in document order.
+    """
+    block_tables, pipe_tables, practice_tables = [], [], []
+    label_buf, value_buf, title_buf = [], [], None
+    pipe_prev = None       # previous non-empty line, unless it closed a pipe table
+    prev = None            # previous raw line
+
+    for ln in text.split("\n"):
+        line = _Line(ln)
+
+        # label:value blocks, titled by a heading right above them
+        if line.row:
+            label_buf.append(line.row[0])
+            value_buf.append(line.row[1])
+        else:
+            if len(label_buf) >= 2:
+                block_tables.append({"title": title_buf, "labels": label_buf, "values": value_buf})
+            label_buf, value_buf = [], []
+            title_buf = line.text if line.is_heading else None
+
+        # pipe tables over consecutive non-empty lines; a matched pair is consumed
+        if line.text:
+            table = None
+            if pipe_prev is not None and pipe_prev.pipe_parts is not None and line.pipe_parts is not None:
+                table = _pipe_table(pipe_prev, line)
+            if table:
+                pipe_tables.append(table)
+                pipe_prev = None
+            else:
+                pipe_prev = line
 
-        parts1 = [p.strip() for p in parts1 if p.strip()]
-        parts2 = [p.strip() for p in parts2 if p.strip()]
+        # practice tables: one row mostly text, the adjacent row mostly numbers
+        if prev is not None and len(prev.columns) >= 3 and len(line.columns) >= 3:
+            table = None
+            if line.numeric_count >= len(line.columns) - 1 and prev.numeric_count <= 1:
+                table = _practice_table(prev, line)
+            elif prev.numeric_count >= len(prev.columns) - 1 and line.numeric_count <= 1:
+                table = _practice_table(line, prev)
+            if table:
+                practice_tables.append(table)
+        prev = line
 
-        if len(parts1) < 3 or len(parts2) < 3:
-            continue
+    if len(label_buf) >= 2:
+        block_tables.append({"title": title_buf, "labels": label_buf, "values": value_buf})
 
-        def count_numeric(parts):
-            return sum(1 for p in parts if re.match(r'^\d+(?:\.\d+)?$', p))
-
-        nums1 = count_numeric(parts1)
-        nums2 = count_numeric(parts2)
-
-        # One row mostly text, other row mostly numbers
-        if nums2 >= len(parts2) - 1 and nums1 <= 1:
-            # row1 = labels (skip first cell which is the row header)
-            labels = parts1[1:] if len(parts1) > len(parts2) else parts1
-            values_raw = [p for p in parts2 if re.match(r'^\d+(?:\.\d+)?$', p)]
-            if len(labels) == len(values_raw) and len(labels) >= 2:
-                tables.append({
-                    "title": parts1[0] if len(parts1) > len(parts2) else None,
-                    "labels": labels,
-                    "values": [float(v) for v in values_raw],
-                })
-
-        elif nums1 >= len(parts1) - 1 and nums2 <= 1:
-            labels = parts2[1:] if len(parts2) > len(parts1) else parts2
-            values_raw = [p for p in parts1 if re.match(r'^\d+(?:\.\d+)?$', p)]
-            if len(labels) == len(values_raw) and len(labels) >= 2:
-                tables.append({
-                    "title": parts2[0] if len(parts2) > len(parts1) else None,
-                    "labels": labels,
-                    "values": [float(v) for v in values_raw],
-                })
-
-    return tables
+    return block_tables, pipe_tables, practice_tables
 
 
 def extract_all_tables(text: str) -> list:
-    """Run all parsers and deduplicate by label sets."""
-    all_tables = (
-        _parse_label_value_blocks(text) +
-        _parse_inline_tables(text) +
-        _parse_ncert_practice_tables(text)
-    )
+    """Scan for every table shape and deduplicate by label sets."""
+    block_tables, pipe_tables, practice_tables = _scan_tables(text)
+    all_tables = block_tables + pipe_tables + practice_tables
 
     # Deduplicate: skip tables whose label sets are identical to an earlier one
     seen = set()
@@ -205,94 +190,239 @@ def extract_all_tables(text: str) -> list:
 
 
 # ── Chart renderers ───────────────────────────────────────────
+#
+# matplotlib holds the GIL while rasterizing and its global state is not
+# thread-safe, so batches of charts are rendered across a process pool.
+# Each process keeps one styled figure per chart kind and reuses it; the
+# shared styling lives in _STYLE and is applied through rcParams rather
+# than per-chart spine/color calls. Rendered images are cached on disk by
+# a hash of the chart kind, format, labels, values and title.
+
+CHART_FORMATS = ("png", "svg")
+CHART_DPI = int(os.getenv("CHART_DPI", "130"))
+CHART_WORKERS = int(os.getenv("CHART_WORKERS", str(min(4, os.cpu_count() or 1))))
+CHART_CACHE_DIR = os.getenv("CHART_CACHE_DIR", os.path.join("cache", "charts"))
+CHART_CACHE_MAX_BYTES = int(os.getenv("CHART_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+# Bump when _STYLE or the drawing code changes so old images stop matching
+CHART_STYLE_VERSION = "1"
+
+_STYLE = {
+    "figure.facecolor": "#F1FAFF",
+    "savefig.facecolor": "#F1FAFF",
+    "axes.facecolor": "#F8FCFF",
+    "axes.edgecolor": "#D0E9F7",
+    "axes.spines.top": False,
+    "axes.spines.right": False,
+    "axes.labelcolor": "#4A6A85",
+    "axes.labelsize": 10,
+    "axes.titlesize": 11,
+    "axes.titlecolor": "#112F4D",
+    "axes.titleweight": "bold",
+    "axes.titlepad": 12,
+    "xtick.color": "#4A6A85",
+    "ytick.color": "#4A6A85",
+    "xtick.labelsize": 9,
+    "ytick.labelsize": 9,
+    "svg.fonttype": "none",  # keep SVG text as text instead of paths
+}
+
+_templates = {}          # chart kind -> reusable Figure, per process
+_render_lock = threading.Lock()
+_pool = None
+_pool_lock = threading.Lock()
+_chart_cache = BlobCache(CHART_CACHE_DIR, CHART_CACHE_MAX_BYTES, suffix=".chart")
+
+
+def _template(kind: str) -> Figure:
+    fig = _templates.get(kind)
+    if fig is None:
+        with matplotlib.rc_context(_STYLE):
+            fig = Figure()
+            FigureCanvasAgg(fig)
+            fig.add_subplot(1, 1, 1)
+        _templates[kind] = fig
+    return fig
+
+
+def _value_label(val: float) -> str:
+    return str(int(val)) if val == int(val) else f"{val:.1f}"
+
+
+def _render_chart(spec: dict) -> bytes:
+    """
+    Draw one chart on this process's template figure and return the image
+    bytes. spec: {"kind", "labels", "values", "title", "xlabel", "ylabel", "format"}.
+    """
+    labels, values = spec["labels"], spec["values"]
+    n = len(labels)
+    colors = [_COLORS[i % len(_COLORS)] for i in range(n)]
+    max_val = max(values) if values else 1
 
-def _to_b64(fig) -> str:
-    buf = io.BytesIO()
-    fig.savefig(buf, format="png", dpi=130, bbox_inches="tight",
-                facecolor=fig.get_facecolor())
-    plt.close(fig)
-    buf.seek(0)
-    return base64.b64encode(buf.read()).decode("utf-8")
+    fig = _template(spec["kind"])
+    ax = fig.axes[0]
+    with matplotlib.rc_context(_STYLE):
+        ax.cla()
+        if spec["kind"] == "vertical":
+            # Vertical bars — better for short labels (months, days)
+            fig.set_size_inches(max(6, n * 0.9), 5)
+            bars = ax.bar(labels, values, color=colors, edgecolor="white",
+                          linewidth=0.8, width=0.6)
+            for bar, val in zip(bars, values):
+                ax.text(
+                    bar.get_x() + bar.get_width() / 2,
+                    bar.get_height() + max_val * 0.02,
+                    _value_label(val),
+                    ha="center", va="bottom", fontsize=9,
+                    color="#112F4D", fontweight="bold"
+                )
+            ax.yaxis.set_major_locator(ticker.MaxNLocator(integer=True))
+            ax.set_ylim(0, max_val * 1.18)
+            ax.tick_params(axis="x", labelrotation=20)
+            for tick_label in ax.get_xticklabels():
+                tick_label.set_horizontalalignment("right")
+        else:
+            # Horizontal bars — better for long label names
+            fig.set_size_inches(8, max(3.5, n * 0.65 + 1.5))
+            bars = ax.barh(labels, values, color=colors, edgecolor="white",
+                           linewidth=0.8, height=0.58)
+            for bar, val in zip(bars, values):
+                ax.text(
+                    bar.get_width() + max_val * 0.02,
+                    bar.get_y() + bar.get_height() / 2,
+                    _value_label(val),
+                    va="center", ha="left", fontsize=9,
+                    color="#112F4D", fontweight="bold"
+                )
+            ax.set_xlabel(spec.get("xlabel") or "Value")
+            ax.set_ylabel(spec.get("ylabel") or "Items")
+            ax.xaxis.set_major_locator(ticker.MaxNLocator(integer=True))
+            ax.set_xlim(0, max_val * 1.18)
+
+        if spec.get("title"):
+            ax.set_title(spec["title"])
+
+        fig.tight_layout()
+        buf = io.BytesIO()
+        fig.savefig(buf, format=spec.get("format", "png"), dpi=CHART_DPI, bbox_inches="tight")
+    return buf.getvalue()
+
+
+def _chart_key(spec: dict) -> str:
+    return content_key(
+        CHART_STYLE_VERSION, spec["kind"], spec.get("format", "png"),
+        json.dumps([spec["labels"], spec["values"], spec.get("title"),
+                    spec.get("xlabel"), spec.get("ylabel")], ensure_ascii=False),
+    )
 
 
-def generate_bar_chart(labels: list, values: list,
-                        title: str = None,
-                        xlabel: str = "Value",
-                        ylabel: str = "Items") -> str:
-    """Horizontal bar chart — better for long label names."""
-    n = len(labels)
-    fig_h = max(3.5, n * 0.65 + 1.5)
-    fig, ax = plt.subplots(figsize=(8, fig_h))
-    fig.patch.set_facecolor("#F1FAFF")
-    ax.set_facecolor("#F8FCFF")
+def _get_pool():
+    global _pool
+    if CHART_WORKERS <= 1:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            # spawn, not fork: the parent is a threaded web server
+            _pool = ProcessPoolExecutor(
+                max_workers=CHART_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _pool
 
-    colors = [_COLORS[i % len(_COLORS)] for i in range(n)]
-    bars = ax.barh(labels, values, color=colors, edgecolor="white",
-                   linewidth=0.8, height=0.58)
 
-    max_val = max(values) if values else 1
-    for bar, val in zip(bars, values):
-        ax.text(
-            bar.get_width() + max_val * 0.02,
-            bar.get_y() + bar.get_height() / 2,
-            str(int(val)) if val == int(val) else f"{val:.1f}",
-            va="center", ha="left", fontsize=9,
-            color="#112F4D", fontweight="bold"
-        )
+def _reset_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False)
+        _pool = None
 
-    ax.set_xlabel(xlabel, fontsize=10, color="#4A6A85")
-    ax.set_ylabel(ylabel, fontsize=10, color="#4A6A85")
-    if title:
-        ax.set_title(title, fontsize=11, color="#112F4D",
-                     fontweight="bold", pad=12)
 
-    ax.tick_params(colors="#4A6A85", labelsize=9)
-    ax.spines["top"].set_visible(False)
-    ax.spines["right"].set_visible(False)
-    ax.spines["left"].set_color("#D0E9F7")
-    ax.spines["bottom"].set_color("#D0E9F7")
-    ax.xaxis.set_major_locator(ticker.MaxNLocator(integer=True))
-    ax.set_xlim(0, max_val * 1.18)
-    plt.tight_layout()
-    return _to_b64(fig)
+def shutdown_chart_pool():
+    """Stop the rendering processes (on server shutdown)."""
+    _reset_pool()
 
 
-def generate_vertical_bar_chart(labels: list, values: list,
-                                  title: str = None) -> str:
-    """Vertical bar chart — better for short labels (months, days)."""
-    n = len(labels)
-    fig, ax = plt.subplots(figsize=(max(6, n * 0.9), 5))
-    fig.patch.set_facecolor("#F1FAFF")
-    ax.set_facecolor("#F8FCFF")
+def _render_local(spec: dict) -> bytes:
+    with _render_lock:
+        return _render_chart(spec)
 
-    colors = [_COLORS[i % len(_COLORS)] for i in range(n)]
-    bars = ax.bar(labels, values, color=colors, edgecolor="white",
-                  linewidth=0.8, width=0.6)
 
-    max_val = max(values) if values else 1
-    for bar, val in zip(bars, values):
-        ax.text(
-            bar.get_x() + bar.get_width() / 2,
-            bar.get_height() + max_val * 0.02,
-            str(int(val)) if val == int(val) else f"{val:.1f}",
-            ha="center", va="bottom", fontsize=9,
-            color="#112F4D", fontweight="bold"
-        )
+def render_charts(specs: list) -> list:
+    """
+    Render many charts, reusing cached images. Misses are spread over the
+    process pool (a single miss is drawn in-process to skip the round trip).
+    Returns a list aligned with specs of image bytes, or None where a chart
+    could not be drawn.
+    """
+    results = [None] * len(specs)
+    misses = []
+    for i, spec in enumerate(specs):
+        path = _chart_cache.get(_chart_key(spec))
+        if path:
+            with open(path, "rb") as f:
+                results[i] = f.read()
+        else:
+            misses.append(i)
 
-    if title:
-        ax.set_title(title, fontsize=11, color="#112F4D",
-                     fontweight="bold", pad=12)
+    pool = _get_pool() if len(misses) > 1 else None
+    futures = {}
+    if pool is not None:
+        try:
+            futures = {i: pool.submit(_render_chart, specs[i]) for i in misses}
+        except BrokenProcessPool:
+            _reset_pool()
 
-    ax.tick_params(colors="#4A6A85", labelsize=9)
-    ax.spines["top"].set_visible(False)
-    ax.spines["right"].set_visible(False)
-    ax.spines["left"].set_color("#D0E9F7")
-    ax.spines["bottom"].set_color("#D0E9F7")
-    ax.yaxis.set_major_locator(ticker.MaxNLocator(integer=True))
-    ax.set_ylim(0, max_val * 1.18)
-    plt.xticks(rotation=20, ha="right")
-    plt.tight_layout()
-    return _to_b64(fig)
+    for i in misses:
+        try:
+            if i in futures:
+                try:
+                    data = futures[i].result()
+                except BrokenProcessPool:
+                    _reset_pool()
+                    data = _render_local(specs[i])
+            else:
+                data = _render_local(specs[i])
+        except Exception as e:
+            print(f"Chart generation skipped: {e}")
+            continue
+        _chart_cache.put(_chart_key(specs[i]), data)
+        results[i] = data
+
+    return results
+
+
+def _chart_spec(kind: str, labels: list, values: list, title: str = None,
+                fmt: str = "png", xlabel: str = None, ylabel: str = None) -> dict:
+    return {
+        "kind": kind,
+        "labels": [str(l) for l in labels],
+        "values": [float(v) for v in values],
+        "title": title,
+        "xlabel": xlabel,
+        "ylabel": ylabel,
+        "format": fmt,
+    }
+
+
+def generate_bar_chart(labels: list, values: list,
+                        title: str = None,
+                        xlabel: str = "Value",
+                        ylabel: str = "Items") -> str:
+    """Horizontal bar chart — better for long label names."""
+    data = render_charts([_chart_spec("horizontal", labels, values, title,
+                                      xlabel=xlabel, ylabel=ylabel)])[0]
+    if data is None:
+        raise RuntimeError("Bar chart rendering failed")
+    return base64.b64encode(data).decode("utf-8")
+
+
+def generate_vertical_bar_chart(labels: list, values: list,
+                                  title: str = None) -> str:
+    """Vertical bar chart — better for short labels (months, days)."""
+    data = render_charts([_chart_spec("vertical", labels, values, title)])[0]
+    if data is None:
+        raise RuntimeError("Bar chart rendering failed")
+    return base64.b64encode(data).decode("utf-8")
 
 
 def _choose_chart_type(labels: list) -> str:
@@ -301,31 +431,41 @@ def _choose_chart_type(labels: list) -> str:
     return "vertical" if avg_len <= 10 and len(labels) <= 7 else "horizontal"
 
 
+def get_chart_cache_stats() -> dict:
+    return _chart_cache.stats()
+
+
 # ── Main entry point ──────────────────────────────────────────
 
-def generate_charts_for_content(text: str) -> list:
+def generate_charts_for_content(text: str, fmt: str = "png") -> list:
     """
     Parse all data tables from text (raw or simplified) and generate charts.
-    Returns list of {"title", "image_b64", "labels", "values"}
+    Returns list of {"title", "labels", "values", "format", "image_b64"},
+    with "image_svg" (markup) instead of "image_b64" when fmt is "svg".
     """
+    if fmt not in CHART_FORMATS:
+        raise ValueError(f"Unsupported chart format: {fmt}")
+
     tables = extract_all_tables(text)
-    charts = []
+    specs = [
+        _chart_spec(_choose_chart_type(t["labels"]), t["labels"], t["values"], t["title"], fmt)
+        for t in tables
+    ]
 
-    for t in tables:
-        try:
-            chart_type = _choose_chart_type(t["labels"])
-            if chart_type == "vertical":
-                b64 = generate_vertical_bar_chart(t["labels"], t["values"], t["title"])
-            else:
-                b64 = generate_bar_chart(t["labels"], t["values"], t["title"])
-
-            charts.append({
-                "title":     t["title"],
-                "labels":    t["labels"],
-                "values":    t["values"],
-                "image_b64": b64,
-            })
-        except Exception as e:
-            print(f"Chart generation skipped: {e}")
+    charts = []
+    for t, data in zip(tables, render_charts(specs)):
+        if data is None:
+            continue
+        chart = {
+            "title":  t["title"],
+            "labels": t["labels"],
+            "values": t["values"],
+            "format": fmt,
+        }
+        if fmt == "svg":
+            chart["image_svg"] = data.decode("utf-8")
+        else:
+            chart["image_b64"] = base64.b64encode(data).decode("utf-8")
+        charts.append(chart)
 
-    return charts
\ No newline at end of file
+    return charts
@@ -0,0 +1,393 @@
+"""
+chat_session_service.py
+Server-side chat sessions for the doubt-solver chatbot.
+
+Stateless /chat calls re-send the whole topic and the whole conversation on
+every turn. A session instead keeps:
+  - a stable prompt prefix (instructions + topic, plus the full material
+    when it is small) that never changes during the session, so provider
+    prompt caching can reuse it;
+  - the recent turns, appended in order and never rewritten;
+  - a rolling summary that older turns are folded into once the history
+    passes CHAT_HISTORY_TOKEN_BUDGET;
+  - for long material, only the paragraphs relevant to each question,
+    attached to that question alone.
+
+Every turn reports prompt/completion tokens and latency.
+
+Saves are compare-and-swap on a per-session revision, so two turns that
+finish at the same time (two tabs, or two gunicorn workers) cannot
+overwrite each other. The later one reloads the session and appends its
+turn again.
+"""
+
+import os
+import re
+import json
+import math
+import time
+import uuid
+import sqlite3
+import threading
+from collections import Counter
+from services.chatbot_service import get_mistral_client, MISTRAL_MODEL, SYSTEM_INSTRUCTIONS
+
+CHAT_SESSION_PATH = os.getenv("CHAT_SESSION_PATH", os.path.join("cache", "chat_sessions.sqlite3"))
+CHAT_SESSION_TTL = int(os.getenv("CHAT_SESSION_TTL", str(24 * 3600)))
+# Material up to this size goes into the stable prefix whole; longer material is retrieved per question
+CHAT_FULL_CONTEXT_TOKENS = int(os.getenv("CHAT_FULL_CONTEXT_TOKENS", "1500"))
+CHAT_RETRIEVAL_TOKENS = int(os.getenv("CHAT_RETRIEVAL_TOKENS", "900"))
+CHAT_PARAGRAPH_CHARS = int(os.getenv("CHAT_PARAGRAPH_CHARS", "800"))
+CHAT_HISTORY_TOKEN_BUDGET = int(os.getenv("CHAT_HISTORY_TOKEN_BUDGET", "1200"))
+CHAT_MIN_RECENT_MESSAGES = int(os.getenv("CHAT_MIN_RECENT_MESSAGES", "4"))
+CHAT_SUMMARY_MODEL = os.getenv("CHAT_SUMMARY_MODEL", "mistral-small-latest")
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+_STOPWORDS = frozenset(
+    "a an the is are was were be been of in on at to for from by with and or not "
+    "what why how when which who whom does do did can could will would should "
+    "this that these those it its i me my you your we our they their he she "
+    "explain tell please about more give example".split()
+)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token); good enough for budgeting."""
+    return (len(text or "") + 3) // 4
+
+
+# ---------- Session store ----------
+
+class _SessionStore:
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connect(self):
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.row_factory = sqlite3.Row
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS chat_sessions ("
+                " id TEXT PRIMARY KEY, topic TEXT, content TEXT, summary TEXT,"
+                " turns TEXT, created REAL, updated REAL, revision INTEGER NOT NULL DEFAULT 0)"
+            )
+            columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(chat_sessions)")}
+            if "revision" not in columns:
+                self._conn.execute("ALTER TABLE chat_sessions ADD COLUMN revision INTEGER NOT NULL DEFAULT 0")
+                self._conn.commit()
+        return self._conn
+
+    def create(self, topic: str, content: str, turns: list) -> str:
+        session_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM chat_sessions WHERE updated < ?", (now - CHAT_SESSION_TTL,))
+            conn.execute(
+                "INSERT INTO chat_sessions (id, topic, content, summary, turns, created, updated)"
+                " VALUES (?, ?, ?, '', ?, ?, ?)",
+                (session_id, topic, content, json.dumps(turns, ensure_ascii=False), now, now),
+            )
+            conn.commit()
+        return session_id
+
+    def get(self, session_id: str):
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT * FROM chat_sessions WHERE id = ?", (session_id,)
+            ).fetchone()
+        if row is None or row["updated"] < time.time() - CHAT_SESSION_TTL:
+            return None
+        return {
+            "id": row["id"],
+            "topic": row["topic"],
+            "content": row["content"],
+            "summary": row["summary"] or "",
+            "turns": json.loads(row["turns"] or "[]"),
+            "revision": row["revision"],
+        }
+
+    def save(self, session: dict) -> bool:
+        """Write the session if nobody else saved it since it was read; False otherwise."""
+        with self._lock:
+            conn = self._connect()
+            cur = conn.execute(
+                "UPDATE chat_sessions SET summary = ?, turns = ?, updated = ?, revision = revision + 1"
+                " WHERE id = ? AND revision = ?",
+                (session["summary"], json.dumps(session["turns"], ensure_ascii=False),
+                 time.time(), session["id"], session["revision"]),
+            )
+            conn.commit()
+        if cur.rowcount == 0:
+            return False
+        session["revision"] += 1
+        return True
+
+    def delete(self, session_id: str) -> bool:
+        with self._lock:
+            conn = self._connect()
+            cur = conn.execute("DELETE FROM chat_sessions WHERE id = ?", (session_id,))
+            conn.commit()
+        return cur.rowcount > 0
+
+
+_store = _SessionStore(CHAT_SESSION_PATH)
+
+
+def open_session(topic: str, topic_content: str, conversation_history: list = None) -> str:
+    """Start a session; an existing client-side history can be carried over."""
+    turns = [{"role": m["role"], "content": m["content"]} for m in (conversation_history or [])]
+    return _store.create(topic, topic_content, turns)
+
+
+def get_session(session_id: str):
+    return _store.get(session_id)
+
+
+def delete_session(session_id: str) -> bool:
+    return _store.delete(session_id)
+
+
+# ---------- Retrieval ----------
+
+def split_paragraphs(content: str, max_chars: int = None) -> list:
+    """Paragraphs of the material, with very long ones cut on sentence ends."""
+    max_chars = max_chars or CHAT_PARAGRAPH_CHARS
+    paragraphs = []
+    for block in re.split(r"\n\s*\n", content or ""):
+        block = block.strip()
+        while len(block) > max_chars:
+            cut = max(block.rfind(". ", 0, max_chars), block.rfind("। ", 0, max_chars))
+            cut = cut + 1 if cut > 0 else max_chars
+            paragraphs.append(block[:cut].strip())
+            block = block[cut:].strip()
+        if block:
+            paragraphs.append(block)
+    return paragraphs
+
+
+def _terms(text: str) -> list:
+    return [w for w in _WORD_RE.findall(text.lower()) if w not in _STOPWORDS and len(w) > 1]
+
+
+def retrieve_paragraphs(paragraphs: list, query: str, budget_tokens: int = None) -> list:
+    """
+    BM25-ranked paragraphs for the query, as many as fit the token budget,
+    returned in document order so the excerpt still reads naturally.
+    """
+    budget_tokens = budget_tokens or CHAT_RETRIEVAL_TOKENS
+    query_terms = set(_terms(query))
+    if not paragraphs or not query_terms:
+        return []
+
+    docs = [Counter(_terms(p)) for p in paragraphs]
+    avg_len = sum(sum(d.values()) for d in docs) / len(docs) or 1
+    df = Counter(t for d in docs for t in query_terms if t in d)
+    k1, b = 1.5, 0.75
+
+    scores = []
+    for i, doc in enumerate(docs):
+        length = sum(doc.values())
+        score = 0.0
+        for term in query_terms:
+            tf = doc.get(term, 0)
+            if not tf:
+                continue
+            idf = math.log(1 + (len(docs) - df[term] + 0.5) / (df[term] + 0.5))
+            score += idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * length / avg_len))
+        if score > 0:
+            scores.append((score, i))
+
+    chosen, used = [], 0
+    for _score, i in sorted(scores, reverse=True):
+        cost = estimate_tokens(paragraphs[i])
+        if chosen and used + cost > budget_tokens:
+            continue
+        chosen.append(i)
+        used += cost
+    return [paragraphs[i] for i in sorted(chosen)]
+
+
+# ---------- Prompt assembly ----------
+
+def _prefix(session: dict) -> str:
+    """The part of the prompt that stays byte-identical for the whole session."""
+    content = session["content"]
+    if estimate_tokens(content) <= CHAT_FULL_CONTEXT_TOKENS:
+        material = f"Here is the full content they are studying:\n---\n{content}\n---"
+    else:
+        material = ("The material is long, so the parts relevant to each question "
+                    "are included with that question.")
+    return SYSTEM_INSTRUCTIONS.format(topic=session["topic"], material=material)
+
+
+def _build_turn(session: dict, message: str):
+    """Messages for this turn, plus what went into them (for reporting)."""
+    parts = []
+    if session["summary"]:
+        parts.append(f"Summary of our conversation so far:\n{session['summary']}")
+
+    excerpts = []
+    if estimate_tokens(session["content"]) > CHAT_FULL_CONTEXT_TOKENS:
+        recent_user = " ".join(t["content"] for t in session["turns"][-2:] if t["role"] == "user")
+        excerpts = retrieve_paragraphs(split_paragraphs(session["content"]), f"{message} {recent_user}")
+        if excerpts:
+            parts.append("Relevant parts of the material:\n---\n" + "\n\n".join(excerpts) + "\n---")
+
+    final = "\n\n".join(parts + [f"Student's question: {message}"]) if parts else message
+    messages = (
+        [{"role": "system", "content": _prefix(session)}]
+        + [{"role": t["role"], "content": t["content"]} for t in session["turns"]]
+        + [{"role": "user", "content": final}]
+    )
+    info = {
+        "history_messages": len(session["turns"]),
+        "summary_tokens": estimate_tokens(session["summary"]),
+        "retrieved_paragraphs": len(excerpts),
+        "estimated_prompt_tokens": sum(estimate_tokens(m["content"]) for m in messages),
+    }
+    return messages, info
+
+
+# ---------- Compaction ----------
+
+def _summarize(previous: str, turns: list) -> str:
+    transcript = "\n".join(f"{t['role'].title()}: {t['content']}" for t in turns)
+    prompt = (
+        "Update the running summary of a tutoring conversation. Keep what the student "
+        "asked, what was explained and anything they still find confusing. "
+        "At most 120 words, plain sentences.\n\n"
+        f"Current summary:\n{previous or '(none)'}\n\n"
+        f"New messages:\n{transcript}\n\nUpdated summary:"
+    )
+    response = get_mistral_client().chat.complete(
+        model=CHAT_SUMMARY_MODEL,
+        messages=[{"role": "user", "content": prompt}],
+        max_tokens=250,
+        temperature=0.2,
+    )
+    return (response.choices[0].message.content or "").strip()
+
+
+def _compact(session: dict) -> bool:
+    """Fold the oldest turns into the summary once the history is over budget."""
+    turns = session["turns"]
+    if sum(estimate_tokens(t["content"]) for t in turns) <= CHAT_HISTORY_TOKEN_BUDGET:
+        return False
+
+    # Keep the newest turns under half the budget, but always a few of them
+    keep, used = 0, 0
+    for t in reversed(turns):
+        cost = estimate_tokens(t["content"])
+        if keep >= CHAT_MIN_RECENT_MESSAGES and used + cost > CHAT_HISTORY_TOKEN_BUDGET // 2:
+            break
+        keep += 1
+        used += cost
+    # Never split a user question from its answer
+    if keep < len(turns) and turns[len(turns) - keep]["role"] == "assistant":
+        keep += 1
+    folded, recent = turns[:len(turns) - keep], turns[len(turns) - keep:]
+    if not folded:
+        return False
+
+    try:
+        session["summary"] = _summarize(session["summary"], folded)
+    except Exception as e:
+        print(f"[ChatSession] summary failed, dropping {len(folded)} old messages: {e}")
+    session["turns"] = recent
+    return True
+
+
+# ---------- Turns ----------
+
+def _usage(response_usage, info: dict, latency_ms: int, compaction_ms: int) -> dict:
+    usage = dict(info)
+    usage["prompt_tokens"] = getattr(response_usage, "prompt_tokens", None)
+    usage["completion_tokens"] = getattr(response_usage, "completion_tokens", None)
+    usage["latency_ms"] = latency_ms
+    usage["compaction_ms"] = compaction_ms
+    return usage
+
+
+def _finish_turn(session: dict, message: str, reply: str) -> int:
+    started = time.monotonic()
+    compacted = False
+    while True:
+        session["turns"].append({"role": "user", "content": message})
+        session["turns"].append({"role": "assistant", "content": reply})
+        compacted = _compact(session) or compacted
+        if _store.save(session):
+            break
+        # Another turn on this session was saved first: build on top of it
+        latest = _store.get(session["id"])
+        if latest is None:
+            print(f"[ChatSession] {session['id'][:8]} was deleted or expired, turn not saved")
+            break
+        session.update(latest)
+    return round((time.monotonic() - started) * 1000) if compacted else 0
+
+
+def chat_in_session(session: dict, message: str) -> dict:
+    """One turn in a session: {"reply", "session_id", "usage"}."""
+    messages, info = _build_turn(session, message)
+
+    started = time.monotonic()
+    response = get_mistral_client().chat.complete(
+        model=MISTRAL_MODEL,
+        messages=messages,
+        max_tokens=800,
+        temperature=0.7,
+    )
+    latency_ms = round((time.monotonic() - started) * 1000)
+    reply = response.choices[0].message.content
+
+    compaction_ms = _finish_turn(session, message, reply)
+    usage = _usage(getattr(response, "usage", None), info, latency_ms, compaction_ms)
+    print(f"[ChatSession] {session['id'][:8]} prompt={usage['prompt_tokens']} "
+          f"completion={usage['completion_tokens']} latency={latency_ms}ms")
+    return {"reply": reply, "session_id": session["id"], "usage": usage}
+
+
+def stream_chat_in_session(session: dict, message: str):
+    """
+    Streaming turn. Yields ("token", delta) as the reply arrives, then
+    ("usage", usage) and ("done", full_reply).
+    """
+    messages, info = _build_turn(session, message)
+
+    started = time.monotonic()
+    first_token_ms = None
+    parts, response_usage = [], None
+    stream = get_mistral_client().chat.stream(
+        model=MISTRAL_MODEL,
+        messages=messages,
+        max_tokens=800,
+        temperature=0.7,
+    )
+    with stream as events:
+        for event in events:
+            if getattr(event.data, "usage", None):
+                response_usage = event.data.usage
+            choices = event.data.choices
+            if not choices:
+                continue
+            delta = choices[0].delta.content
+            if isinstance(delta, str) and delta:
+                if first_token_ms is None:
+                    first_token_ms = round((time.monotonic() - started) * 1000)
+                parts.append(delta)
+                yield "token", delta
+    latency_ms = round((time.monotonic() - started) * 1000)
+
+    reply = "".join(parts)
+    compaction_ms = _finish_turn(session, message, reply)
+    usage = _usage(response_usage, info, latency_ms, compaction_ms)
+    usage["first_token_ms"] = first_token_ms
+    usage["session_id"] = session["id"]
+    yield "usage", usage
+    yield "done", reply
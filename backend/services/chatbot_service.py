@@ -1,17 +1,38 @@
 import os
-from mistralai import Mistral
+from utils.gemini_client import get_mistral_client as _get_shared_mistral_client, get_async_mistral_client
+from utils.async_runtime import run_async
 
 MISTRAL_API_KEY = os.environ.get("MISTRAL_API_KEY")
 MISTRAL_MODEL = "mistral-large-latest"
 
+# {material} is the full topic content here, or retrieved excerpts in a chat session
+SYSTEM_INSTRUCTIONS = """You are a friendly, patient, and encouraging tutor helping a student understand their study material.
+
+The student is currently studying the topic: "{topic}"
+
+{material}
+
+Your job is to:
+1. Answer the student's doubts in an even SIMPLER way than the text above.
+2. Always use relatable, real-world examples, analogies, and comparisons that a student would easily understand.
+3. Break down complex ideas into small, digestible chunks.
+4. Use bullet points or numbered steps when explaining processes.
+5. Be warm, encouraging, and supportive — never make the student feel bad for asking.
+6. If a question is outside the topic, gently redirect them back to the current material.
+7. Keep responses concise but complete — don't overwhelm with too much at once.
+8. End with a brief encouraging note or ask if they need further clarification.
+
+Always respond in the same language the student uses (English or Hindi)."""
+
 
 def get_mistral_client():
-    return Mistral(api_key=MISTRAL_API_KEY)
+    return _get_shared_mistral_client("chatbot", MISTRAL_API_KEY)
 
 
-def chat_with_bot(topic: str, topic_content: str, conversation_history: list, user_message: str) -> str:
+async def chat_with_bot_async(topic: str, topic_content: str, conversation_history: list, user_message: str) -> str:
     """
-    Generate a chatbot response using Mistral.
+    Generate a chatbot response using Mistral, without holding a thread
+    while the model answers.
 
     Args:
         topic: The topic name/title the student is studying
@@ -22,28 +43,57 @@ def chat_with_bot(topic: str, topic_content: str, conversation_history: list, us
     Returns:
         The assistant's reply as a string
     """
-    client = get_mistral_client()
+    client = get_async_mistral_client("chatbot", MISTRAL_API_KEY)
+    messages = _build_messages(topic, topic_content, conversation_history, user_message)
 
-    system_prompt = f"""You are a friendly, patient, and encouraging tutor helping a student understand their study material.
+    response = await client.chat.complete_async(
+        model=MISTRAL_MODEL,
+        messages=messages,
+        max_tokens=800,
+        temperature=0.7,
+    )
 
-The student is currently studying the topic: "{topic}"
+    return response.choices[0].message.content
 
-Here is the full content they are studying:
----
-{topic_content}
----
 
-Your job is to:
-1. Answer the student's doubts in an even SIMPLER way than the text above.
-2. Always use relatable, real-world examples, analogies, and comparisons that a student would easily understand.
-3. Break down complex ideas into small, digestible chunks.
-4. Use bullet points or numbered steps when explaining processes.
-5. Be warm, encouraging, and supportive — never make the student feel bad for asking.
-6. If a question is outside the topic, gently redirect them back to the current material.
-7. Keep responses concise but complete — don't overwhelm with too much at once.
-8. End with a brief encouraging note or ask if they need further clarification.
+def chat_with_bot(topic: str, topic_content: str, conversation_history: list, user_message: str) -> str:
+    """Blocking form of chat_with_bot_async."""
+    return run_async(chat_with_bot_async(topic, topic_content, conversation_history, user_message))
 
-Always respond in the same language the student uses (English or Hindi)."""
+
+def stream_chat_with_bot(topic: str, topic_content: str, conversation_history: list, user_message: str):
+    """
+    Streaming variant of chat_with_bot. Yields ("token", delta) as Mistral
+    produces the reply, then ("done", full_reply).
+    """
+    client = get_mistral_client()
+    messages = _build_messages(topic, topic_content, conversation_history, user_message)
+
+    parts = []
+    stream = client.chat.stream(
+        model=MISTRAL_MODEL,
+        messages=messages,
+        max_tokens=800,
+        temperature=0.7,
+    )
+    with stream as events:
+        for event in events:
+            choices = event.data.choices
+            if not choices:
+                continue
+            delta = choices[0].delta.content
+            if isinstance(delta, str) and delta:
+                parts.append(delta)
+                yield "token", delta
+
+    yield "done", "".join(parts)
+
+
+def _build_messages(topic: str, topic_content: str, conversation_history: list, user_message: str) -> list:
+    system_prompt = SYSTEM_INSTRUCTIONS.format(
+        topic=topic,
+        material=f"Here is the full content they are studying:\n---\n{topic_content}\n---",
+    )
 
     messages = [{"role": "system", "content": system_prompt}]
 
@@ -54,11 +104,4 @@ Always respond in the same language the student uses (English or Hindi)."""
     # Add the current user message
     messages.append({"role": "user", "content": user_message})
 
-    response = client.chat.complete(
-        model=MISTRAL_MODEL,
-        messages=messages,
-        max_tokens=800,
-        temperature=0.7,
-    )
-
-    return response.choices[0].message.content
\ No newline at end of file
+    return messages
\ No newline at end of file
@@ -2,9 +2,10 @@
 
 import json
 from openai import OpenAIError
-from utils.gemini_client import MODEL
+from utils.gemini_client import MODEL, async_client_for
+from utils.async_runtime import run_async
 
-def explain_flashcard(client, question: str, answer: str, language: str = "english"):
+async def explain_flashcard_async(client, question: str, answer: str, language: str = "english"):
     """
     Generate explanation for a flashcard answer.
     Can include examples or fun facts if relevant.
@@ -57,7 +58,7 @@ Return ONLY valid JSON with no extra text."""
     ]
 
     try:
-        resp = client.chat.completions.create(
+        resp = await client.chat.completions.create(
             model=MODEL,
             messages=messages,
             response_format={"type": "json_object"},
@@ -74,4 +75,9 @@ Return ONLY valid JSON with no extra text."""
         return result
         
     except (OpenAIError, json.JSONDecodeError) as e:
-        return {"error": str(e)}
\ No newline at end of file
+        return {"error": str(e)}
+
+
+def explain_flashcard(client, question: str, answer: str, language: str = "english"):
+    """Blocking form of explain_flashcard_async (client: sync client from get_client)."""
+    return run_async(explain_flashcard_async(async_client_for(client), question, answer, language))
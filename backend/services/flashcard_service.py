@@ -1,8 +1,14 @@
 import json
 from openai import OpenAIError
-from utils.gemini_client import MODEL
+from utils.gemini_client import MODEL, async_client_for
+from utils.async_runtime import run_async
+from utils.response_cache import cached_generation
 
-def generate_flashcards(client, text: str):
+PROMPT_VERSION = "1"
+
+@cached_generation("flashcards", PROMPT_VERSION)
+async def generate_flashcards_async(client, text: str):
+    """client is an AsyncOpenAI client from get_async_client."""
     messages = [
         {"role": "system", "content": "You are a teacher generating simple flashcards for students."},
         {"role": "user", "content": (
@@ -19,7 +25,7 @@ def generate_flashcards(client, text: str):
     ]
 
     try:
-        resp = client.chat.completions.create(
+        resp = await client.chat.completions.create(
             model=MODEL,
             messages=messages,
             response_format={"type": "json_object"}
@@ -38,4 +44,9 @@ def generate_flashcards(client, text: str):
         
         return cards
     except (OpenAIError, json.JSONDecodeError) as e:
-        return {"error": str(e)}
\ No newline at end of file
+        return {"error": str(e)}
+
+
+def generate_flashcards(client, text: str):
+    """Blocking form of generate_flashcards_async (client: sync client from get_client)."""
+    return run_async(generate_flashcards_async(async_client_for(client), text))
@@ -1,14 +1,22 @@
 import json
-import requests
 import os
+import asyncio
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from openai import OpenAIError
-from utils.gemini_client import MODEL
+from utils.gemini_client import MODEL, get_http_session, get_async_http_client, async_client_for
+from utils.async_runtime import run_async
+from utils.response_cache import cached_generation
 
 RUNWARE_API_KEY = os.getenv("RUNWARE_API_KEY")
-RUNWARE_URL = "https://api.runware.ai/v1"
+RUNWARE_URL = os.getenv("RUNWARE_URL", "https://api.runware.ai/v1")  # point at a local stand-in for testing
+RUNWARE_TIMEOUT = float(os.getenv("RUNWARE_TIMEOUT", "60"))
+RUNWARE_MAX_WORKERS = int(os.getenv("RUNWARE_MAX_WORKERS", "4"))
 
-def generate_image_prompts(client, simplified_text: str):
-    """Step 1: Use Gemini to generate 1-3 image prompts from simplified text."""
+PROMPT_VERSION = "1"
+
+@cached_generation("image_prompts", PROMPT_VERSION)
+async def generate_image_prompts_async(client, simplified_text: str):
+    """Step 1: Use Gemini to generate 1-3 image prompts from simplified text (client: AsyncOpenAI from get_async_client)."""
     messages = [
         {
             "role": "system",
@@ -102,7 +110,7 @@ OUTPUT FORMAT (STRICT JSON ONLY):
     ]
 
     try:
-        resp = client.chat.completions.create(
+        resp = await client.chat.completions.create(
             model=MODEL,
             messages=messages,
             response_format={"type": "json_object"}
@@ -115,64 +123,165 @@ OUTPUT FORMAT (STRICT JSON ONLY):
         raise ValueError(f"Failed to generate image prompts: {str(e)}")
 
 
-def generate_images_runware(prompts: list):
-    """Step 2: Generate images via Runware API."""
-    results = []
+def generate_image_prompts(client, simplified_text: str):
+    """Blocking generate_image_prompts_async; takes a sync client from get_client."""
+    return run_async(generate_image_prompts_async(async_client_for(client), simplified_text))
+
+
+def _runware_task(item: dict) -> dict:
+    return {
+        "taskType": "imageInference",
+        "taskUUID": _make_uuid(),
+        "positivePrompt": item["prompt"],
+        "width": 1024,
+        "height": 1024,
+        "model": "runware:100@1",   # fast general model, swap as needed
+        "numberResults": 1,
+        "outputFormat": "WEBP",
+        "includeCost": False
+    }
+
+
+def _image_result(item: dict, image_url: str = None, error: str = None) -> dict:
+    result = {
+        "title": item["title"],
+        "caption": item["caption"],
+        "prompt": item["prompt"],
+        "image_url": image_url,
+        "image_b64": None
+    }
+    if error:
+        result["error"] = error
+    return result
+
+
+def _post_runware(tasks: list) -> dict:
+    response = get_http_session("runware").post(
+        RUNWARE_URL,
+        headers=_runware_headers(),
+        json=tasks,
+        timeout=RUNWARE_TIMEOUT
+    )
+    # Runware answers 400 with per-task "errors" when only some tasks failed,
+    # so only treat the response as fatal if it carries no usable body.
+    try:
+        data = response.json()
+    except ValueError:
+        response.raise_for_status()
+        raise
+    if not response.ok and not (data.get("data") or data.get("errors")):
+        response.raise_for_status()
+    return data
+
+
+def _single_result(item: dict, task: dict, data: dict) -> dict:
+    # Runware returns { "data": [ { "imageURL": "...", ... } ] }
+    for entry in data.get("data", []):
+        if entry.get("taskUUID") in (None, task["taskUUID"]) and entry.get("imageURL"):
+            return _image_result(item, image_url=entry["imageURL"])
+    errors = data.get("errors") or [{"message": "No image returned"}]
+    raise RuntimeError(errors[0].get("message", "Unknown Runware error"))
+
+
+def _generate_one(item: dict) -> dict:
+    try:
+        task = _runware_task(item)
+        return _single_result(item, task, _post_runware([task]))
+    except Exception as e:
+        print(f"Runware error for '{item['title']}': {str(e)}")
+        return _image_result(item, error=str(e))
+
+
+def iter_images_runware(prompts: list):
+    """
+    Fan the prompts out concurrently and yield (index, result) as each image
+    finishes, so callers can show the first image without waiting for the
+    slowest one. Failures are yielded per image with an "error" field.
+    """
+    if not prompts:
+        return
+    with ThreadPoolExecutor(max_workers=min(len(prompts), RUNWARE_MAX_WORKERS)) as pool:
+        futures = {pool.submit(_generate_one, item): i for i, item in enumerate(prompts)}
+        for future in as_completed(futures):
+            yield futures[future], future.result()
 
-    for item in prompts:
-        try:
-            payload = [
-                {
-                    "taskType": "imageInference",
-                    "taskUUID": _make_uuid(),
-                    "positivePrompt": item["prompt"],
-                    "width": 1024,
-                    "height": 1024,
-                    "model": "runware:100@1",   # fast general model, swap as needed
-                    "numberResults": 1,
-                    "outputFormat": "WEBP",
-                    "includeCost": False
-                }
-            ]
-
-            response = requests.post(
-                RUNWARE_URL,
-                headers={
-                    "Authorization": f"Bearer {RUNWARE_API_KEY}",
-                    "Content-Type": "application/json"
-                },
-                json=payload,
-                timeout=60
-            )
-
-            response.raise_for_status()
-            data = response.json()
-
-            # Runware returns { "data": [ { "imageURL": "...", ... } ] }
-            image_url = data["data"][0]["imageURL"]
-
-            results.append({
-                "title": item["title"],
-                "caption": item["caption"],
-                "prompt": item["prompt"],
-                "image_url": image_url,
-                "image_b64": None
-            })
-
-        except Exception as e:
-            print(f"Runware error for '{item['title']}': {str(e)}")
-            results.append({
-                "title": item["title"],
-                "caption": item["caption"],
-                "prompt": item["prompt"],
-                "image_url": None,
-                "image_b64": None,
-                "error": str(e)
-            })
 
+def _runware_headers() -> dict:
+    return {
+        "Authorization": f"Bearer {RUNWARE_API_KEY}",
+        "Content-Type": "application/json"
+    }
+
+
+async def _post_runware_async(tasks: list) -> dict:
+    response = await get_async_http_client("runware").post(
+        RUNWARE_URL,
+        headers=_runware_headers(),
+        json=tasks,
+        timeout=RUNWARE_TIMEOUT
+    )
+    try:
+        data = response.json()
+    except ValueError:
+        response.raise_for_status()
+        raise
+    if not response.is_success and not (data.get("data") or data.get("errors")):
+        response.raise_for_status()
+    return data
+
+
+async def _generate_one_async(item: dict) -> dict:
+    try:
+        task = _runware_task(item)
+        return _single_result(item, task, await _post_runware_async([task]))
+    except Exception as e:
+        print(f"Runware error for '{item['title']}': {str(e)}")
+        return _image_result(item, error=str(e))
+
+
+def _batch_results(prompts: list, tasks: list, data: dict) -> list:
+    """Match a Runware reply back to the prompts by taskUUID."""
+    urls = {}
+    for entry in data.get("data", []):
+        if entry.get("imageURL"):
+            urls.setdefault(entry.get("taskUUID"), entry["imageURL"])
+    errors = {err.get("taskUUID"): err.get("message", "Unknown Runware error")
+              for err in data.get("errors", [])}
+
+    results = []
+    for item, task in zip(prompts, tasks):
+        uuid = task["taskUUID"]
+        if uuid in urls:
+            results.append(_image_result(item, image_url=urls[uuid]))
+        else:
+            error = errors.get(uuid, "No image returned")
+            print(f"Runware error for '{item['title']}': {error}")
+            results.append(_image_result(item, error=error))
     return results
 
 
+async def generate_images_runware_async(prompts: list):
+    """Step 2: Generate images via Runware API (all prompts in one multi-task request)."""
+    if not prompts:
+        return []
+
+    tasks = [_runware_task(item) for item in prompts]
+    try:
+        data = await _post_runware_async(tasks)
+    except Exception as e:
+        # The whole batch failed (timeout, 5xx...): retry each image on its own
+        # so one bad prompt cannot take the others down with it.
+        print(f"Runware batch request failed, falling back to per-image requests: {str(e)}")
+        return list(await asyncio.gather(*(_generate_one_async(item) for item in prompts)))
+
+    return _batch_results(prompts, tasks, data)
+
+
+def generate_images_runware(prompts: list):
+    """Blocking generate_images_runware_async, for Flask views and job threads."""
+    return run_async(generate_images_runware_async(prompts))
+
+
 def _make_uuid():
     import uuid
     return str(uuid.uuid4())
\ No newline at end of file
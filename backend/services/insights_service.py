@@ -1,8 +1,12 @@
-from utils.gemini_client import MODEL
+import json
+from utils.gemini_client import MODEL, async_client_for
+from utils.async_runtime import run_async
+from utils.response_cache import cached_generation, get_cached, set_cached
 
-def generate_insights(client, text: str):
-    """Generate key insights from simplified NCERT topic content."""
-    prompt = (
+PROMPT_VERSION = "1"
+
+def _build_prompt(text: str) -> str:
+    return (
         "Analyze the following educational content and extract key insights.\n\n"
         "Return a JSON object with this exact structure:\n"
         "{\n"
@@ -28,11 +32,87 @@ def generate_insights(client, text: str):
         f"Content:\n{text}"
     )
 
+
+def _is_unusable(raw) -> bool:
+    """Errors and replies without a parseable JSON object are not cached."""
+    if not isinstance(raw, str) or raw.startswith("Error "):
+        return True
+    try:
+        parse_insights_json(raw)
+    except ValueError:  # json.JSONDecodeError is a ValueError
+        return True
+    return False
+
+
+@cached_generation("insights", PROMPT_VERSION, skip=_is_unusable)
+async def generate_insights_async(client, text: str):
+    """Generate key insights from simplified NCERT topic content (client: AsyncOpenAI from get_async_client)."""
     try:
-        response = client.chat.completions.create(
+        response = await client.chat.completions.create(
             model=MODEL,
-            messages=[{"role": "user", "content": prompt}]
+            messages=[{"role": "user", "content": _build_prompt(text)}]
         )
         return response.choices[0].message.content
     except Exception as e:
-        return f"Error generating insights: {str(e)}"
\ No newline at end of file
+        return f"Error generating insights: {str(e)}"
+
+
+def generate_insights(client, text: str):
+    """Blocking generate_insights_async; takes a sync client from get_client."""
+    return run_async(generate_insights_async(async_client_for(client), text))
+
+
+def parse_insights_json(raw: str) -> dict:
+    """Pull the first balanced JSON object out of the model reply (handles mixed text)."""
+    start_idx = raw.find('{')
+    if start_idx == -1:
+        raise ValueError("No JSON object found in response")
+
+    # Find matching closing brace
+    brace_count = 0
+    end_idx = -1
+    for i in range(start_idx, len(raw)):
+        if raw[i] == '{':
+            brace_count += 1
+        elif raw[i] == '}':
+            brace_count -= 1
+            if brace_count == 0:
+                end_idx = i + 1
+                break
+
+    if end_idx == -1:
+        raise ValueError("Malformed JSON in response")
+
+    return json.loads(raw[start_idx:end_idx])
+
+
+def stream_insights(client, text: str):
+    """
+    Streaming variant of generate_insights. Yields ("token", delta) for each
+    piece of the reply as it arrives, then ("done", parsed_insights).
+    """
+    cached = get_cached("insights", text)
+    if cached is not None:
+        yield "token", cached
+        yield "done", parse_insights_json(cached)
+        return
+
+    stream = client.chat.completions.create(
+        model=MODEL,
+        messages=[{"role": "user", "content": _build_prompt(text)}],
+        stream=True,
+    )
+
+    parts = []
+    for chunk in stream:
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta.content or ""
+        if delta:
+            parts.append(delta)
+            yield "token", delta
+
+    raw = "".join(parts)
+    parsed = parse_insights_json(raw)
+    set_cached("insights", raw, text)
+    yield "done", parsed
@@ -1,16 +1,26 @@
 import os
+import re
 import json
 import requests
+from concurrent.futures import ThreadPoolExecutor
 from openai import OpenAIError
+from utils.gemini_client import get_http_session
 
 
 ELEVENLABS_API_KEY = os.getenv("ELEVENLABS_API_KEY")
 ELEVENLABS_VOICE_ID = os.getenv("ELEVENLABS_VOICE_ID", "JBFqnCBsd6RMkjVDRZzb")  # Default: "George" – change as needed
 ELEVENLABS_MODEL_ID = os.getenv("ELEVENLABS_MODEL_ID", "eleven_turbo_v2_5")       # Fast + high quality
 
+# Pipelined narration: the first chunk is kept short so audio starts quickly,
+# later chunks are longer for smoother prosody.
+NARRATION_FIRST_CHUNK_CHARS = int(os.getenv("NARRATION_FIRST_CHUNK_CHARS", "80"))
+NARRATION_CHUNK_CHARS = int(os.getenv("NARRATION_CHUNK_CHARS", "300"))
+NARRATION_TTS_WORKERS = int(os.getenv("NARRATION_TTS_WORKERS", "3"))
+
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?])\s+|\n\s*\n")
 
-def generate_mindmap_explanation(mistral_client, mindmap_data: dict) -> str:
 
+def _build_explanation_messages(mindmap_data: dict) -> list:
     nodes = mindmap_data.get("nodes", [])
     links = mindmap_data.get("links", [])
 
@@ -63,7 +73,7 @@ IMPORTANT RULES:
 - Keep the total explanation between 200 and 350 words — concise but thorough.
 - Make it engaging and memorable for a student."""
 
-    messages = [
+    return [
         {
             "role": "system",
             "content": "You are a warm, engaging AI teacher who explains complex topics clearly and memorably. You always speak in plain, natural language suitable for text-to-speech."
@@ -74,6 +84,10 @@ IMPORTANT RULES:
         }
     ]
 
+
+def generate_mindmap_explanation(mistral_client, mindmap_data: dict) -> str:
+    messages = _build_explanation_messages(mindmap_data)
+
     try:
         from utils.gemini_client import MODEL  # reuse the same model constant (Mistral via OpenAI-compat client)
         resp = mistral_client.chat.completions.create(
@@ -90,10 +104,12 @@ IMPORTANT RULES:
         raise RuntimeError(f"Failed to generate explanation: {e}")
 
 
-def text_to_speech_elevenlabs(text: str) -> bytes:
+def text_to_speech_elevenlabs(text: str, previous_text: str = None, next_text: str = None) -> bytes:
     """
     Convert text to speech using ElevenLabs API.
     Returns raw MP3 audio bytes.
+    previous_text / next_text let ElevenLabs keep intonation continuous when
+    a longer narration is synthesized piece by piece.
     """
 
     if not ELEVENLABS_API_KEY:
@@ -117,9 +133,13 @@ def text_to_speech_elevenlabs(text: str) -> bytes:
             "use_speaker_boost": True,
         },
     }
+    if previous_text:
+        payload["previous_text"] = previous_text
+    if next_text:
+        payload["next_text"] = next_text
 
     try:
-        response = requests.post(url, json=payload, headers=headers, timeout=60)
+        response = get_http_session("elevenlabs").post(url, json=payload, headers=headers, timeout=60)
         response.raise_for_status()
         print(f"[MindmapExplain] ElevenLabs TTS success, audio size: {len(response.content)} bytes")
         return response.content
@@ -140,4 +160,67 @@ def explain_mindmap(mistral_client, mindmap_data: dict) -> bytes:
     """
     explanation = generate_mindmap_explanation(mistral_client, mindmap_data)
     audio_bytes = text_to_speech_elevenlabs(explanation)
-    return audio_bytes
\ No newline at end of file
+    return audio_bytes
+
+
+# ---------- Pipelined narration ----------
+
+def stream_mindmap_explanation(mistral_client, mindmap_data: dict):
+    """Yield the explanation text as the model produces it."""
+    from utils.gemini_client import MODEL
+    stream = mistral_client.chat.completions.create(
+        model=MODEL,
+        messages=_build_explanation_messages(mindmap_data),
+        max_tokens=600,
+        stream=True,
+    )
+    for chunk in stream:
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
+
+
+def iter_narration_chunks(deltas):
+    """
+    Regroup streamed text into speakable chunks that end on a sentence or
+    paragraph boundary, each yielded as soon as it is complete.
+    """
+    buffer = ""
+    target = NARRATION_FIRST_CHUNK_CHARS
+    for delta in deltas:
+        buffer += delta
+        while True:
+            cut = None
+            for m in _SENTENCE_END_RE.finditer(buffer):
+                if m.start() >= target:
+                    cut = m
+                    break
+            if cut is None:
+                break
+            chunk, buffer = buffer[:cut.start()].strip(), buffer[cut.end():]
+            if chunk:
+                yield chunk
+            target = NARRATION_CHUNK_CHARS
+    if buffer.strip():
+        yield buffer.strip()
+
+
+def explain_mindmap_pipelined(mistral_client, mindmap_data: dict):
+    """
+    Streaming pipeline: mindmap JSON → streamed Mistral explanation, cut into
+    sentence chunks → ElevenLabs per chunk (a few in parallel) → MP3 bytes
+    yielded strictly in order, starting as soon as the first chunk is voiced.
+    """
+    deltas = stream_mindmap_explanation(mistral_client, mindmap_data)
+    pending = []
+    previous = None
+
+    with ThreadPoolExecutor(max_workers=NARRATION_TTS_WORKERS) as pool:
+        for chunk in iter_narration_chunks(deltas):
+            pending.append(pool.submit(text_to_speech_elevenlabs, chunk, previous))
+            previous = chunk
+            # Hand over any audio that is already done without blocking the text stream
+            while pending and pending[0].done():
+                yield pending.pop(0).result()
+
+        while pending:
+            yield pending.pop(0).result()
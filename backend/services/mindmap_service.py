@@ -1,8 +1,14 @@
 import json
 from openai import OpenAIError
-from utils.gemini_client import MODEL
+from utils.gemini_client import MODEL, async_client_for
+from utils.async_runtime import run_async
+from utils.response_cache import cached_generation
 
-def generate_mindmap_code(client, text: str):
+PROMPT_VERSION = "1"
+
+@cached_generation("mindmap", PROMPT_VERSION)
+async def generate_mindmap_code_async(client, text: str):
+    """client is an AsyncOpenAI client from get_async_client."""
     messages = [
         {
             "role": "system",
@@ -63,7 +69,7 @@ Create a beautiful, student-friendly mind map from the text provided below.
     ]
 
     try:
-        resp = client.chat.completions.create(
+        resp = await client.chat.completions.create(
             model=MODEL,
             messages=messages,
             response_format={"type": "json_object"}
@@ -108,4 +114,9 @@ Create a beautiful, student-friendly mind map from the text provided below.
         
     except (OpenAIError, json.JSONDecodeError, ValueError) as e:
         print(f"Error generating mindmap: {str(e)}")
-        return {"error": str(e)}
\ No newline at end of file
+        return {"error": str(e)}
+
+
+def generate_mindmap_code(client, text: str):
+    """Blocking form of generate_mindmap_code_async (client: sync client from get_client)."""
+    return run_async(generate_mindmap_code_async(async_client_for(client), text))
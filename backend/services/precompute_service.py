@@ -0,0 +1,181 @@
+"""
+precompute_service.py
+Offline pipeline behind precompute.py: textbook PDFs -> structured topics ->
+every generator, written into the artifact store so term-start traffic is
+served from precomputed data instead of live model calls.
+
+A unit is one PDF, or one page range of it when a chapters file is given.
+It is extracted and structured exactly as /upload_pdf does for the same
+pages, and every topic goes through the same generators the routes use, so
+precomputed artifacts sit under the keys live requests look up.
+
+Progress is checkpointed per unit (its structured topics) and per
+(unit, topic, artifact); a rerun skips everything already done and retries
+what failed.
+"""
+
+import os
+import json
+import time
+import hashlib
+import asyncio
+from utils.async_runtime import run_async
+from utils.artifact_store import get_artifact_store
+from utils.gemini_client import initialize_openai_client
+from services.text_service import iter_pdf_pages, parse_page_range, structure_chapter, topics_from_dataset
+from services.topic_bundle_service import build_topic_bundle
+from services.translation_service import translate_texts_to_hindi
+
+GENERATED_ARTIFACTS = ("simplified", "mindmap", "flashcards", "quiz", "insights")
+PRECOMPUTE_ARTIFACTS = GENERATED_ARTIFACTS + ("translation",)
+
+
+def _file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def list_units(pdf_dir: str, chapters: dict = None) -> list:
+    """
+    Every PDF under pdf_dir as (unit_id, path, pages). chapters maps a PDF's
+    path relative to pdf_dir to a list of page ranges ("1-20", "21-"), one
+    unit each; other PDFs are a single whole-book unit.
+    """
+    chapters = chapters or {}
+    units = []
+    for root, _dirs, files in os.walk(pdf_dir):
+        for fname in sorted(files):
+            if not fname.lower().endswith(".pdf"):
+                continue
+            path = os.path.join(root, fname)
+            rel = os.path.relpath(path, pdf_dir).replace(os.sep, "/")
+            sha = _file_sha256(path)[:16]
+            for pages in chapters.get(rel) or [""]:
+                units.append((f"{sha}:{pages or 'all'}", path, pages))
+    units.sort(key=lambda u: (u[1], u[2]))
+    return units
+
+
+def structure_unit(unit_id: str, path: str, pages_spec: str) -> list:
+    """Topics of one unit, from the checkpoint or by extracting and structuring it."""
+    store = get_artifact_store()
+    topics = store.get_unit_topics(unit_id)
+    if topics is not None:
+        return topics
+
+    first, last = parse_page_range(pages_spec)
+    with open(path, "rb") as f:
+        pages = list(iter_pdf_pages(f, first, last))
+    text = "".join(f"{page}\n" for page in pages)
+    dataset = structure_chapter(initialize_openai_client(), text, pages=pages)
+    if isinstance(dataset, dict) and "error" in dataset:
+        raise RuntimeError(dataset["error"])
+
+    topics = topics_from_dataset(dataset)
+    store.save_unit(unit_id, path, pages_spec, topics)
+    return topics
+
+
+async def _precompute_topic(unit_id: str, index: int, topic: dict, artifacts, translate_slots) -> dict:
+    """Generate whatever is still missing for one topic; returns {artifact: status}."""
+    store = get_artifact_store()
+    title, content = topic.get("topic", ""), topic.get("content", "")
+    done = await asyncio.to_thread(store.done_artifacts, unit_id, index)
+    todo = [a for a in artifacts if a not in done]
+    if not todo:
+        return {}
+
+    # Translation works on the simplified text, which is a cache hit once stored
+    generate = [a for a in GENERATED_ARTIFACTS if a in todo or (a == "simplified" and "translation" in todo)]
+    records = {}
+    if generate:
+        await build_topic_bundle(title, content, generate, lambda rec: records.__setitem__(rec["artifact"], rec))
+
+    statuses = {}
+
+    async def mark(name, status, error=None):
+        statuses[name] = status
+        await asyncio.to_thread(store.mark, unit_id, index, name, status, error)
+
+    for name in generate:
+        if name in todo:
+            rec = records.get(name, {"status": "error", "error": "not generated"})
+            await mark(name, rec["status"], rec.get("error"))
+
+    if "translation" in todo:
+        simplified = records.get("simplified", {})
+        if simplified.get("status") != "ok":
+            await mark("translation", "error", "simplified text unavailable")
+        else:
+            # Fills the translation memory that /translate reads sentence by sentence
+            async with translate_slots:
+                try:
+                    await asyncio.to_thread(translate_texts_to_hindi, [title, simplified["data"]])
+                    await mark("translation", "ok")
+                except Exception as e:
+                    await mark("translation", "error", str(e))
+    return statuses
+
+
+async def _precompute_topics(unit_id: str, topics: list, artifacts, topic_concurrency: int,
+                             translate_concurrency: int, log) -> dict:
+    slots = asyncio.Semaphore(topic_concurrency)
+    translate_slots = asyncio.Semaphore(translate_concurrency)
+    counts = {"ok": 0, "error": 0}
+
+    async def one(index, topic):
+        if not (topic.get("content") or "").strip():
+            log(f"[Precompute]   {index + 1}/{len(topics)} {topic.get('topic', '')[:60]!r}: no content, skipped")
+            return
+        async with slots:
+            statuses = await _precompute_topic(unit_id, index, topic, artifacts, translate_slots)
+        for status in statuses.values():
+            counts[status] = counts.get(status, 0) + 1
+        failed = sorted(a for a, s in statuses.items() if s != "ok")
+        note = "up to date" if not statuses else (f"failed: {', '.join(failed)}" if failed else "ok")
+        log(f"[Precompute]   {index + 1}/{len(topics)} {topic.get('topic', '')[:60]!r}: {note}")
+
+    await asyncio.gather(*(one(i, t) for i, t in enumerate(topics)))
+    return counts
+
+
+def run_pipeline(pdf_dir: str, artifacts=None, chapters: dict = None, topic_concurrency: int = 4,
+                 translate_concurrency: int = 2, log=print) -> dict:
+    """Precompute every unit under pdf_dir into the artifact store; returns run totals."""
+    artifacts = [a for a in (artifacts or PRECOMPUTE_ARTIFACTS) if a in PRECOMPUTE_ARTIFACTS]
+    store = get_artifact_store()
+    store.writable = True
+
+    started = time.monotonic()
+    summary = {"units": 0, "units_failed": 0, "topics": 0, "ok": 0, "error": 0}
+    units = list_units(pdf_dir, chapters)
+    log(f"[Precompute] {len(units)} unit(s) in {pdf_dir}, artifacts: {', '.join(artifacts)}")
+
+    for unit_id, path, pages in units:
+        label = os.path.basename(path) + (f" pages {pages}" if pages else "")
+        try:
+            topics = structure_unit(unit_id, path, pages)
+        except Exception as e:
+            summary["units_failed"] += 1
+            log(f"[Precompute] {label}: structuring failed: {e}")
+            continue
+        log(f"[Precompute] {label}: {len(topics)} topic(s)")
+        counts = run_async(_precompute_topics(
+            unit_id, topics, artifacts, topic_concurrency, translate_concurrency, log
+        ))
+        summary["units"] += 1
+        summary["topics"] += len(topics)
+        summary["ok"] += counts.get("ok", 0)
+        summary["error"] += counts.get("error", 0)
+
+    summary["elapsed_s"] = round(time.monotonic() - started, 1)
+    summary["store"] = store.stats()
+    return summary
+
+
+def load_chapters(path: str) -> dict:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
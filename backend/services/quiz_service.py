@@ -1,8 +1,13 @@
 import json
 from openai import OpenAIError
-from utils.gemini_client import MODEL
+from utils.gemini_client import MODEL, async_client_for
+from utils.async_runtime import run_async
+from utils.response_cache import cached_generation
 
-def generate_quiz(client, topic_title: str, simplified_text: str):
+PROMPT_VERSION = "1"
+
+@cached_generation("quiz", PROMPT_VERSION)
+async def generate_quiz_async(client, topic_title: str, simplified_text: str):
     """
     Generate a structured quiz from simplified textbook content.
     Returns a validated JSON quiz object.
@@ -75,7 +80,7 @@ Critical Rules:
     ]
 
     try:
-        response = client.chat.completions.create(
+        response = await client.chat.completions.create(
             model=MODEL,
             messages=messages,
             response_format={"type": "json_object"}
@@ -107,4 +112,9 @@ Critical Rules:
         return quiz_data
 
     except (OpenAIError, json.JSONDecodeError, ValueError) as e:
-        return {"error": str(e)}
\ No newline at end of file
+        return {"error": str(e)}
+
+
+def generate_quiz(client, topic_title: str, simplified_text: str):
+    """Blocking form of generate_quiz_async (client: sync client from get_client)."""
+    return run_async(generate_quiz_async(async_client_for(client), topic_title, simplified_text))
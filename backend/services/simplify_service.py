@@ -1,9 +1,12 @@
-from utils.gemini_client import MODEL
+from utils.gemini_client import MODEL, async_client_for
+from utils.async_runtime import run_async
+from utils.response_cache import cached_generation, get_cached, set_cached
 from services.stylometry_service import stylometrize_text
 
-def simplify_text(client, text: str):
-    """Simplify NCERT textbook content using Gemini via OpenAI-compatible interface + stylometry formatting"""
-    prompt = (
+PROMPT_VERSION = "1"
+
+def _build_prompt(text: str) -> str:
+    return (
         "Rewrite the following NCERT textbook content in simplified language.\n\n"
         "Guidelines:\n"
         "- Keep the explanation accurate to the original meaning.\n"
@@ -20,10 +23,14 @@ def simplify_text(client, text: str):
         "Simplified explanation:"
     )
 
-    messages = [{"role": "user", "content": prompt}]
+
+@cached_generation("simplify", PROMPT_VERSION)
+async def simplify_text_async(client, text: str):
+    """Simplify NCERT textbook content using Gemini via OpenAI-compatible interface + stylometry formatting (client: AsyncOpenAI from get_async_client)."""
+    messages = [{"role": "user", "content": _build_prompt(text)}]
 
     try:
-        response = client.chat.completions.create(
+        response = await client.chat.completions.create(
             model=MODEL,
             messages=messages
         )
@@ -34,4 +41,57 @@ def simplify_text(client, text: str):
         return formatted
 
     except Exception as e:
-        return f"Error simplifying text: {str(e)}"
\ No newline at end of file
+        return f"Error simplifying text: {str(e)}"
+
+
+def simplify_text(client, text: str):
+    """Blocking simplify_text_async for Flask views and worker threads; takes a sync client from get_client."""
+    return run_async(simplify_text_async(async_client_for(client), text))
+
+
+def stream_simplified_text(client, text: str):
+    """
+    Streaming variant of simplify_text. Yields ("paragraph", formatted) as
+    soon as each paragraph of the completion is finished, then ("done", full)
+    with the same text simplify_text would have returned. Paragraphs are
+    formatted one by one, so what the student sees is already styled.
+    """
+    cached = get_cached("simplify", text)
+    if cached is not None:
+        yield "paragraph", cached
+        yield "done", cached
+        return
+
+    stream = client.chat.completions.create(
+        model=MODEL,
+        messages=[{"role": "user", "content": _build_prompt(text)}],
+        stream=True,
+    )
+
+    raw_parts = []
+    buffer = ""
+    for chunk in stream:
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta.content or ""
+        if not delta:
+            continue
+        raw_parts.append(delta)
+        buffer += delta
+
+        # Everything before the last blank line is a finished paragraph.
+        cut = buffer.rfind("\n\n")
+        if cut == -1:
+            continue
+        ready, buffer = buffer[:cut], buffer[cut + 2:]
+        formatted = stylometrize_text(ready)
+        if formatted:
+            yield "paragraph", formatted
+
+    formatted = stylometrize_text(buffer)
+    if formatted:
+        yield "paragraph", formatted
+
+    full = stylometrize_text("".join(raw_parts).strip())
+    set_cached("simplify", full, text)
+    yield "done", full
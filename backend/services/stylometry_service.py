@@ -1,5 +1,17 @@
 import re
 
+# Every pattern is compiled once at import; stylometrize_text runs on every
+# simplify response and on every streamed paragraph.
+_STAR_BOLD_RE = re.compile(r"(?<!\*)\*(?!\*)([^\n*]{1,120})(?<!\*)\*(?!\*)")
+_TERM_DEF_RE = re.compile(r"^\s*([A-Z][A-Za-z0-9 \-]{2,40})\s*:\s*(.+)$")
+_UNICODE_BULLET_RE = re.compile(r"^\u2022\s*")
+_PAREN_NUMBER_RE = re.compile(r"^\d+\)\s+")
+_DOT_NUMBER_RE = re.compile(r"^\d+\.\s+")
+_HEADING_RE = re.compile(r"^(?:\d+[\.\d]*\s+)?[A-Z][A-Za-z0-9 ,\-()]{3,}$")
+_BULLET_PREFIXES = ("• ", "● ", "▪ ", "– ", "— ")
+_HEADING_END_PUNCT = (".", "?", "!", ",")
+
+
 def _normalize_newlines(text: str) -> str:
     text = (text or "").replace("\r\n", "\n").replace("\r", "\n")
     text = "\n".join([ln.rstrip() for ln in text.split("\n")])
@@ -10,79 +22,54 @@ def _convert_star_bold(text: str) -> str:
     Convert *word/phrase* -> **word/phrase** (single asterisk to double).
     Uses negative lookbehind/lookahead so existing **bold** is left alone.
     """
-    pattern = re.compile(r"(?<!\*)\*(?!\*)([^\n*]{1,120})(?<!\*)\*(?!\*)")
-    return pattern.sub(r"**\1**", text)
+    if "*" not in text:
+        return text
+    return _STAR_BOLD_RE.sub(r"**\1**", text)
 
-def _bold_term_definitions(text: str) -> str:
+def _bold_term_definition(ln: str) -> str:
     """
     If a line looks like "Term: definition" bold just the term.
     Only applies to lines where the term looks like a real concept
     (starts with capital letter, is a noun-like phrase).
     """
-    out_lines = []
-    for ln in text.split("\n"):
-        stripped = ln.strip()
-        m = re.match(r"^\s*([A-Z][A-Za-z0-9 \-]{2,40})\s*:\s*(.+)$", stripped)
-        if m:
-            term = m.group(1).strip()
-            rest = m.group(2).strip()
-            out_lines.append(f"**{term}:** {rest}")
-        else:
-            out_lines.append(ln)
-    return "\n".join(out_lines)
+    if ":" not in ln:
+        return ln
+    m = _TERM_DEF_RE.match(ln.strip())
+    if m:
+        term = m.group(1).strip()
+        rest = m.group(2).strip()
+        return f"**{term}:** {rest}"
+    return ln
 
-def _bullet_normalize(text: str) -> str:
+def _bullet_normalize(ln: str) -> str:
     """
     Normalize various bullet styles to uniform "- " format.
     """
-    lines = []
-    for ln in text.split("\n"):
-        s = ln.strip()
-        if not s:
-            lines.append("")
-            continue
+    s = ln.strip()
+    if not s:
+        return ""
 
-        if s.startswith(("• ", "● ", "▪ ", "– ", "— ")):
-            lines.append("- " + s[2:].strip())
-        elif re.match(r"^\u2022\s*", s):  # unicode bullet without space
-            lines.append("- " + re.sub(r"^\u2022\s*", "", s).strip())
-        elif re.match(r"^\d+\)\s+", s):
+    if s.startswith(_BULLET_PREFIXES):
+        return "- " + s[2:].strip()
+    if s[0] == "\u2022":  # unicode bullet without space
+        return "- " + _UNICODE_BULLET_RE.sub("", s).strip()
+    if s[0].isdigit():
+        if _PAREN_NUMBER_RE.match(s):
             # "1) point" -> "- point"
-            lines.append("- " + re.sub(r"^\d+\)\s+", "", s).strip())
-        elif re.match(r"^\d+\.\s+", s):
+            return "- " + _PAREN_NUMBER_RE.sub("", s).strip()
+        if _DOT_NUMBER_RE.match(s):
             # Keep numbered items as-is (e.g. activity questions)
-            lines.append(s)
-        else:
-            lines.append(ln)
-    return "\n".join(lines)
+            return s
+    return ln
 
-def _paragraph_spacing(text: str) -> str:
-    """
-    Ensure clean paragraph breaks:
-    - Collapse 3+ blank lines to 2
-    - Add blank line after section headings
-    """
-    text = re.sub(r"\n{3,}", "\n\n", text)
-
-    lines = text.split("\n")
-    out = []
-    for i, ln in enumerate(lines):
-        out.append(ln)
-        s = ln.strip()
-
-        # A heading: short, starts with capital/number, no trailing punctuation
-        is_heading = (
-            bool(re.match(r"^(?:\d+[\.\d]*\s+)?[A-Z][A-Za-z0-9 ,\-()]{3,}$", s))
-            and len(s) <= 70
-            and not s.endswith((".", "?", "!", ","))
-        )
-        if is_heading:
-            if i + 1 < len(lines) and lines[i + 1].strip() != "":
-                out.append("")
-
-    text = "\n".join(out)
-    text = re.sub(r"\n{3,}", "\n\n", text)
-    return text.strip()
+def _is_heading(ln: str) -> bool:
+    """A heading: short, starts with capital/number, no trailing punctuation."""
+    s = ln.strip()
+    return (
+        len(s) <= 70
+        and not s.endswith(_HEADING_END_PUNCT)
+        and _HEADING_RE.match(s) is not None
+    )
 
 
 # NOTE: _light_keyword_bolding has been intentionally removed.
@@ -102,10 +89,24 @@ def stylometrize_text(text: str) -> str:
     - Paragraphs separated by blank lines
     - Normalized bullet points using "- " format
     - Clean heading spacing
+
+    Single pass over the lines: each line is bolded, term-bolded and
+    bullet-normalized in turn, then a small state machine collapses runs of
+    blank lines to one and puts a blank line after headings.
     """
-    text = _normalize_newlines(text)
-    text = _convert_star_bold(text)
-    text = _bold_term_definitions(text)
-    text = _bullet_normalize(text)
-    text = _paragraph_spacing(text)
-    return text.strip()
\ No newline at end of file
+    out = []
+    blank_pending = False
+    after_heading = False
+
+    for raw in _normalize_newlines(text).split("\n"):
+        ln = _bullet_normalize(_bold_term_definition(_convert_star_bold(raw)))
+        if not ln:
+            blank_pending = True
+            continue
+        if out and (blank_pending or after_heading):
+            out.append("")
+        out.append(ln)
+        blank_pending = False
+        after_heading = _is_heading(ln)
+
+    return "\n".join(out).strip()
@@ -1,15 +1,96 @@
 import fitz  # PyMuPDF
+import os
+import re
 import json
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from openai import OpenAIError
 from utils.gemini_client import MODEL
+from utils.response_cache import cached_generation
+from utils.telemetry import span, propagate
 
-def extract_text_from_pdf(file_stream):
+# Uploads bigger than this are spooled to disk instead of opened from memory
+PDF_SPOOL_MAX_MEMORY = int(os.getenv("PDF_SPOOL_MAX_MEMORY", str(8 * 1024 * 1024)))
+PDF_SPOOL_BLOCK_SIZE = 1024 * 1024
+
+# Chapters longer than this are structured in chunks instead of one request
+STRUCTURE_CHUNK_CHARS = int(os.getenv("STRUCTURE_CHUNK_CHARS", "12000"))
+STRUCTURE_CONCURRENCY = int(os.getenv("STRUCTURE_CONCURRENCY", "4"))
+# How many times a failed (usually truncated) chunk is halved and retried
+STRUCTURE_SPLIT_RETRIES = 2
+STRUCTURE_VERSION = "2"
+
+# NCERT sub-topic headings: "1.2 Cell Division", "5.3.1 TISSUES", "Activity 2.1"
+_HEADING_RE = re.compile(r"^\s*(?:\d+(?:\.\d+)+\s+[A-Z(]|Activity\s+\d+(?:\.\d+)*\b)")
+
+def _open_pdf(file_stream):
+    """
+    Open an uploaded PDF without holding big books in memory. Small uploads
+    are opened from memory; anything larger than PDF_SPOOL_MAX_MEMORY is
+    copied to a temp file in fixed-size blocks and opened from disk, so
+    PyMuPDF only pages in what it needs. Returns (doc, temp_path or None).
+    """
+    head = file_stream.read(PDF_SPOOL_MAX_MEMORY + 1)
+    if len(head) <= PDF_SPOOL_MAX_MEMORY:
+        return fitz.open(stream=head, filetype="pdf"), None
+
+    fd, path = tempfile.mkstemp(suffix=".pdf")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            out.write(head)
+            del head
+            shutil.copyfileobj(file_stream, out, PDF_SPOOL_BLOCK_SIZE)
+        return fitz.open(path, filetype="pdf"), path
+    except Exception:
+        os.remove(path)
+        raise
+
+
+def parse_page_range(spec):
+    """
+    Parse a 1-based, inclusive page range such as "45-80", "12", "45-" or "-10".
+    Returns (first_page, last_page); either may be None for an open end.
+    """
+    spec = str(spec or "").strip()
+    if not spec:
+        return None, None
+    m = re.fullmatch(r"(\d*)\s*-\s*(\d*)|(\d+)", spec)
+    if not m:
+        raise ValueError(f"Invalid page range: {spec!r}")
+    if m.group(3):
+        page = int(m.group(3))
+        return page, page
+    first = int(m.group(1)) if m.group(1) else None
+    last = int(m.group(2)) if m.group(2) else None
+    return first, last
+
+
+def iter_pdf_pages(file_stream, first_page: int = None, last_page: int = None):
+    """
+    Yield the text of each page in [first_page, last_page] (1-based,
+    inclusive), one page at a time, so only a single page's text is built
+    at once.
+    """
+    doc, path = _open_pdf(file_stream)
+    try:
+        first = max(first_page or 1, 1)
+        last = min(last_page or doc.page_count, doc.page_count)
+        if first > last:
+            raise ValueError(f"Page range {first}-{last} is outside this {doc.page_count}-page PDF")
+        for index in range(first - 1, last):
+            page = doc.load_page(index)
+            yield page.get_text("text")
+            page = None
+    finally:
+        doc.close()
+        if path:
+            os.remove(path)
+
+
+def extract_text_from_pdf(file_stream, first_page: int = None, last_page: int = None):
     """Extract raw text from uploaded PDF file"""
-    doc = fitz.open(stream=file_stream.read(), filetype="pdf")
-    text = ""
-    for page in doc:
-        text += page.get_text("text") + "\n"
-    return text
+    return "".join(f"{page}\n" for page in iter_pdf_pages(file_stream, first_page, last_page))
 
 
 def generate_json_dataset(client, text: str):
@@ -34,8 +115,172 @@ def generate_json_dataset(client, text: str):
             response_format={"type": "json_object"}
         )
         msg = resp.choices[0].message.content
-        dataset = json.loads(msg)
+        with span("structure.parse_json", chars=len(msg or "")):
+            dataset = json.loads(msg)
         return dataset
 
     except (OpenAIError, json.JSONDecodeError) as e:
-        return {"error": str(e)}
\ No newline at end of file
+        return {"error": str(e)}
+
+
+# ---------- Chunked structuring ----------
+
+def _split_oversized(unit: str, max_chars: int) -> list:
+    """Split a single section that is too long on paragraph, then line, boundaries."""
+    pieces, buf = [], ""
+    paragraphs = re.split(r"(\n\s*\n)", unit)
+    for para in paragraphs:
+        if len(buf) + len(para) <= max_chars:
+            buf += para
+            continue
+        if buf.strip():
+            pieces.append(buf)
+        buf = ""
+        if len(para) <= max_chars:
+            buf = para
+            continue
+        for ln in para.split("\n"):
+            if len(buf) + len(ln) + 1 > max_chars and buf.strip():
+                pieces.append(buf)
+                buf = ""
+            buf += ln + "\n"
+    if buf.strip():
+        pieces.append(buf)
+    return pieces
+
+
+def _split_on_headings(text: str) -> list:
+    sections, current = [], []
+    for ln in text.split("\n"):
+        if _HEADING_RE.match(ln) and any(x.strip() for x in current):
+            sections.append("\n".join(current))
+            current = []
+        current.append(ln)
+    if current:
+        sections.append("\n".join(current))
+    return sections
+
+
+def split_text_into_chunks(text: str, max_chars: int = None, pages: list = None) -> list:
+    """
+    Split chapter text into chunks of at most ~max_chars, cutting only on
+    detected sub-topic headings (or on page boundaries when pages are given)
+    so each chunk holds whole sections wherever possible.
+    """
+    max_chars = max_chars or STRUCTURE_CHUNK_CHARS
+    units = pages if pages is not None else _split_on_headings(text or "")
+
+    chunks, buf = [], ""
+    for unit in units:
+        if len(unit) > max_chars:
+            if buf.strip():
+                chunks.append(buf)
+            buf = ""
+            chunks.extend(_split_oversized(unit, max_chars))
+            continue
+        if len(buf) + len(unit) + 1 > max_chars and buf.strip():
+            chunks.append(buf)
+            buf = ""
+        buf = f"{buf}\n{unit}" if buf else unit
+    if buf.strip():
+        chunks.append(buf)
+    return chunks
+
+
+def topics_from_dataset(dataset) -> list:
+    """The model sometimes wraps the topic array in an object; unwrap it."""
+    if isinstance(dataset, list):
+        return [t for t in dataset if isinstance(t, dict)]
+    if isinstance(dataset, dict):
+        if "topic" in dataset and "content" in dataset:
+            return [dataset]
+        for value in dataset.values():
+            if isinstance(value, list):
+                return [t for t in value if isinstance(t, dict)]
+    return []
+
+
+def _structure_chunk(client, chunk: str, retries: int = STRUCTURE_SPLIT_RETRIES) -> list:
+    dataset = generate_json_dataset(client, chunk)
+    if not (isinstance(dataset, dict) and "error" in dataset):
+        return topics_from_dataset(dataset)
+
+    # Most failures here are output truncated mid-JSON: halve and try again.
+    if retries <= 0 or len(chunk) < 2000:
+        raise ValueError(dataset["error"])
+    halves = _split_oversized(chunk, len(chunk) // 2 + 1)
+    if len(halves) < 2:
+        raise ValueError(dataset["error"])
+    topics = []
+    for half in halves:
+        topics.extend(_structure_chunk(client, half, retries - 1))
+    return topics
+
+
+def _title_key(title: str) -> str:
+    title = re.sub(r"\((?:cont(?:inued|d)?\.?)\)", "", (title or "").lower())
+    return re.sub(r"[^a-z0-9]+", " ", title).strip()
+
+
+def _merge_topic(prev: dict, nxt: dict) -> dict:
+    prev_content = prev.get("content", "")
+    next_content = nxt.get("content", "")
+    if next_content in prev_content:
+        return prev
+    if prev_content in next_content:
+        return {**prev, "content": next_content}
+    return {**prev, "content": f"{prev_content.rstrip()}\n{next_content.lstrip()}"}
+
+
+def iter_structured_topics(client, text: str, pages: list = None, max_workers: int = None):
+    """
+    Structure a chapter chunk by chunk with bounded parallelism, yielding
+    topics in document order as soon as their chunk (and the one after it,
+    for boundary merging) is done. A topic split across a chunk boundary is
+    merged back together; repeated topics are dropped.
+    """
+    chunks = split_text_into_chunks(text, pages=pages)
+    if not chunks:
+        return
+    max_workers = max_workers or STRUCTURE_CONCURRENCY
+
+    seen = set()
+    pending = None
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(chunks)))) as pool:
+        futures = [pool.submit(propagate(_structure_chunk), client, c) for c in chunks]
+        for future in futures:
+            for topic in future.result():
+                if pending is not None and _title_key(topic.get("topic")) == _title_key(pending.get("topic")):
+                    pending = _merge_topic(pending, topic)
+                    continue
+                if pending is not None:
+                    yield pending
+                dedupe_key = (_title_key(topic.get("topic")), topic.get("content", "").strip())
+                if dedupe_key in seen:
+                    pending = None
+                    continue
+                seen.add(dedupe_key)
+                pending = topic
+    if pending is not None:
+        yield pending
+
+
+@cached_generation("structure", STRUCTURE_VERSION)
+def structure_chapter(client, text: str, pages: list = None):
+    """
+    Entry point used by /upload_pdf, /extract_text and precompute.py. Short
+    chapters still go to the model in one request; long ones use the
+    chunked mode. Either way the result is a list of {"topic", "content"}
+    dicts, or {"error": ...}. Cached, so a chapter precomputed offline
+    (same pages) is served straight from the artifact store.
+    """
+    if len(text or "") <= STRUCTURE_CHUNK_CHARS:
+        dataset = generate_json_dataset(client, text)
+        if isinstance(dataset, dict) and "error" in dataset:
+            return dataset
+        return topics_from_dataset(dataset)
+
+    try:
+        return list(iter_structured_topics(client, text, pages=pages))
+    except (OpenAIError, ValueError) as e:
+        return {"error": str(e)}
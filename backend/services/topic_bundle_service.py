@@ -0,0 +1,151 @@
+"""
+topic_bundle_service.py
+Everything a topic page needs (simplified text, mindmap, flashcards, quiz,
+insights, images) from one request. Generators run concurrently on the
+shared event loop; the ones that need simplified text wait on the single
+simplify call, so a full bundle takes as long as its slowest chain rather
+than the sum of all requests.
+"""
+
+import time
+import queue
+import asyncio
+from utils.async_runtime import get_loop
+from utils.request_deadline import remaining, DeadlineExceeded
+from utils.gemini_client import (
+    get_async_client, API_KEY_SIMPLIFY, API_KEY_MINDMAP, API_KEY_FLASHCARDS,
+    API_KEY_QUIZ, API_KEY_IMAGEPROMPT,
+)
+from services.simplify_service import simplify_text_async
+from services.mindmap_service import generate_mindmap_code_async
+from services.flashcard_service import generate_flashcards_async
+from services.quiz_service import generate_quiz_async
+from services.insights_service import generate_insights_async, parse_insights_json
+from services.image_service import generate_image_prompts_async, generate_images_runware_async
+
+BUNDLE_ARTIFACTS = ("simplified", "mindmap", "flashcards", "quiz", "insights", "images")
+
+_END = object()
+
+
+def _failed(result) -> bool:
+    # Services report most failures in-band rather than raising
+    if isinstance(result, dict) and "error" in result:
+        return True
+    return isinstance(result, str) and result.startswith("Error ")
+
+
+async def build_topic_bundle(topic: str, text: str, artifacts, emit, simplified: bool = False):
+    """
+    Generate the requested artifacts concurrently and call emit(record) as
+    each one finishes. A record is
+        {"artifact", "status": "ok", "data", "elapsed_ms"}  or
+        {"artifact", "status": "error", "error", "elapsed_ms"}.
+    If simplified is true, text is used as-is instead of being simplified first.
+    """
+    started = time.monotonic()
+
+    def record(name, data=None, error=None):
+        rec = {"artifact": name, "status": "error" if error else "ok",
+               "elapsed_ms": round((time.monotonic() - started) * 1000)}
+        if error:
+            rec["error"] = error
+        else:
+            rec["data"] = data
+        emit(rec)
+
+    async def simplify():
+        if simplified:
+            return text
+        result = await simplify_text_async(get_async_client("simplify", API_KEY_SIMPLIFY), text)
+        if _failed(result):
+            raise RuntimeError(result)
+        return result
+
+    simplified_task = asyncio.ensure_future(simplify())
+
+    async def simplified_artifact():
+        return await simplified_task
+
+    async def mindmap():
+        source = await simplified_task
+        return await generate_mindmap_code_async(get_async_client("mindmap", API_KEY_MINDMAP), source)
+
+    async def flashcards():
+        source = await simplified_task
+        return await generate_flashcards_async(get_async_client("flashcards", API_KEY_FLASHCARDS), source)
+
+    async def quiz():
+        source = await simplified_task
+        return await generate_quiz_async(get_async_client("quiz", API_KEY_QUIZ), topic, source)
+
+    async def insights():
+        source = await simplified_task
+        raw = await generate_insights_async(get_async_client("simplify", API_KEY_SIMPLIFY), source)
+        if _failed(raw):
+            raise RuntimeError(raw)
+        return parse_insights_json(raw)
+
+    async def images():
+        source = await simplified_task
+        prompts = await generate_image_prompts_async(get_async_client("imageprompt", API_KEY_IMAGEPROMPT), source)
+        results = await generate_images_runware_async(prompts)
+        return {"images": results, "count": len(results)}
+
+    producers = {
+        "simplified": simplified_artifact,
+        "mindmap": mindmap,
+        "flashcards": flashcards,
+        "quiz": quiz,
+        "insights": insights,
+        "images": images,
+    }
+
+    async def run(name):
+        try:
+            result = await producers[name]()
+        except Exception as e:
+            record(name, error=str(e))
+            return
+        if _failed(result):
+            record(name, error=result["error"] if isinstance(result, dict) else result)
+        else:
+            record(name, data=result)
+
+    try:
+        await asyncio.gather(*(run(name) for name in artifacts))
+    finally:
+        if not simplified_task.done():
+            simplified_task.cancel()
+        elif not simplified_task.cancelled():
+            simplified_task.exception()  # already reported per artifact
+
+    emit({"artifact": "done", "status": "ok",
+          "elapsed_ms": round((time.monotonic() - started) * 1000)})
+
+
+def iter_topic_bundle(topic: str, text: str, artifacts=None, simplified: bool = False):
+    """
+    Sync view of build_topic_bundle for Flask: yields records in completion
+    order. Closing the generator early (client went away) cancels the work.
+    """
+    artifacts = list(artifacts or BUNDLE_ARTIFACTS)
+    records = queue.Queue()
+    future = asyncio.run_coroutine_threadsafe(
+        build_topic_bundle(topic, text, artifacts, records.put, simplified), get_loop()
+    )
+    future.add_done_callback(lambda _f: records.put(_END))
+
+    try:
+        while True:
+            try:
+                rec = records.get(timeout=remaining())
+            except queue.Empty:
+                raise DeadlineExceeded("Request timed out")
+            if rec is _END:
+                break
+            yield rec
+        future.result()  # surface anything that escaped the per-artifact handling
+    finally:
+        if not future.done():
+            future.cancel()
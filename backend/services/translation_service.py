@@ -1,15 +1,217 @@
+import os
+import re
+import hashlib
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from deep_translator import GoogleTranslator
+from deep_translator.exceptions import RequestError, TooManyRequests
+from requests.exceptions import ConnectionError as RequestsConnectionError, Timeout
+from utils.resilience import call as upstream_call
+
+TARGET_LANG = "hi"
+
+# Google's per-request limit is 5000 characters; leave headroom for separators
+TRANSLATE_MAX_CHARS = int(os.getenv("TRANSLATE_MAX_CHARS", "4500"))
+TRANSLATE_WORKERS = int(os.getenv("TRANSLATE_WORKERS", "4"))
+# deep_translator sends its requests without a timeout, so bound the wait here
+TRANSLATE_TIMEOUT = float(os.getenv("TRANSLATE_TIMEOUT", "30"))
+TRANSLATION_MEMORY_PATH = os.getenv(
+    "TRANSLATION_MEMORY_PATH", os.path.join("cache", "translation_memory.sqlite3")
+)
+
+# Sentence ends (including the Devanagari danda) and line breaks. Line breaks
+# are always segment boundaries so a packed request can be split on "\n".
+_SEGMENT_SPLIT_RE = re.compile(r"((?<=[.!?।])[ \t]+|[ \t]*\n\s*)")
+_HAS_LETTERS_RE = re.compile(r"[^\W\d_]")
+
+
+# ---------- Translation memory ----------
+
+class _TranslationMemory:
+    """Persistent sentence -> translation store so repeated sentences are never re-sent."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connect(self):
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS tm ("
+                " key TEXT PRIMARY KEY, target TEXT, source TEXT, translated TEXT)"
+            )
+        return self._conn
+
+    @staticmethod
+    def _key(source: str, target: str) -> str:
+        return hashlib.sha1(f"{target}\x00{source}".encode("utf-8")).hexdigest()
+
+    def lookup(self, sources: list, target: str) -> dict:
+        found = {}
+        with self._lock:
+            conn = self._connect()
+            for source in sources:
+                row = conn.execute(
+                    "SELECT translated FROM tm WHERE key = ?", (self._key(source, target),)
+                ).fetchone()
+                if row:
+                    found[source] = row[0]
+        return found
+
+    def store(self, pairs: dict, target: str):
+        if not pairs:
+            return
+        with self._lock:
+            conn = self._connect()
+            conn.executemany(
+                "INSERT OR REPLACE INTO tm (key, target, source, translated) VALUES (?, ?, ?, ?)",
+                [(self._key(s, target), target, s, t) for s, t in pairs.items()],
+            )
+            conn.commit()
+
+
+_memory = _TranslationMemory(TRANSLATION_MEMORY_PATH)
+_local = threading.local()
+
+
+def _translator() -> GoogleTranslator:
+    # One translator per worker thread instead of one per string
+    if getattr(_local, "translator", None) is None:
+        _local.translator = GoogleTranslator(source="auto", target=TARGET_LANG)
+    return _local.translator
+
+
+# ---------- Segmenting and packing ----------
+
+def _hard_split(sentence: str, max_chars: int) -> list:
+    """Last resort for a single sentence over the limit: cut on spaces."""
+    pieces, buf = [], ""
+    for word in sentence.split(" "):
+        if buf and len(buf) + len(word) + 1 > max_chars:
+            pieces.append(buf)
+            buf = ""
+        buf = f"{buf} {word}" if buf else word
+    if buf:
+        pieces.append(buf)
+    return pieces
+
+
+def split_for_translation(text: str, max_chars: int = None):
+    """
+    Split text into translatable segments and the exact separators between
+    them, so the translation can be reassembled with the original layout.
+    Returns (segments, separators) with len(separators) == len(segments) - 1.
+    """
+    max_chars = max_chars or TRANSLATE_MAX_CHARS
+    parts = _SEGMENT_SPLIT_RE.split(text or "")
+    segments, separators = [], []
+    for i, part in enumerate(parts):
+        if i % 2:
+            separators.append(part)
+            continue
+        if len(part) <= max_chars:
+            segments.append(part)
+            continue
+        pieces = _hard_split(part, max_chars)
+        segments.extend(pieces)
+        separators.extend([" "] * (len(pieces) - 1))
+    return segments, separators
+
+
+def _pack(segments: list, max_chars: int) -> list:
+    """Group short segments into newline-joined requests under the provider limit."""
+    batches, current, size = [], [], 0
+    for seg in segments:
+        if current and size + len(seg) + 1 > max_chars:
+            batches.append(current)
+            current, size = [], 0
+        current.append(seg)
+        size += len(seg) + 1
+    if current:
+        batches.append(current)
+    return batches
+
+
+_RETRYABLE = (RequestError, TooManyRequests, RequestsConnectionError, Timeout)
+
+
+def _translate(text: str) -> str:
+    # Runs on the bounded-call thread, so it uses that thread's translator
+    return upstream_call(
+        "translate.google.com",
+        lambda: _translator().translate(text),
+        retry_on=_RETRYABLE,
+        timeout=TRANSLATE_TIMEOUT,
+    )
+
+
+def _translate_batch(batch: list) -> dict:
+    """Translations of the segments the provider actually translated; the rest are left out."""
+    if len(batch) > 1:
+        translated = _translate("\n".join(batch)) or ""
+        lines = translated.split("\n")
+        if len(lines) == len(batch):
+            return {seg: ln.strip() for seg, ln in zip(batch, lines) if ln.strip()}
+        # The provider merged or split lines; translate this batch one by one.
+    result = {}
+    for seg in batch:
+        translated = (_translate(seg) or "").strip()
+        if translated:
+            result[seg] = translated
+    return result
+
+
+# ---------- Public API ----------
+
+def translate_texts_to_hindi(texts: list) -> list:
+    """
+    Translate many texts at once. Every text is cut into sentences, sentences
+    already in the translation memory are reused, and the rest are packed
+    into as few provider requests as possible and sent concurrently.
+    """
+    split = [split_for_translation(t) for t in texts]
+
+    unique = []
+    seen = set()
+    for segments, _ in split:
+        for seg in segments:
+            if seg not in seen and _HAS_LETTERS_RE.search(seg):
+                seen.add(seg)
+                unique.append(seg)
+
+    translations = _memory.lookup(unique, TARGET_LANG)
+    missing = [seg for seg in unique if seg not in translations]
+
+    if missing:
+        batches = _pack(missing, TRANSLATE_MAX_CHARS)
+        with ThreadPoolExecutor(max_workers=max(1, min(TRANSLATE_WORKERS, len(batches)))) as pool:
+            for result in pool.map(_translate_batch, batches):
+                translations.update(result)
+                # An echo of the source is indistinguishable from a failed call; keep it out of memory
+                _memory.store({seg: t for seg, t in result.items() if t != seg}, TARGET_LANG)
+
+    out = []
+    for segments, separators in split:
+        pieces = [translations.get(seg, seg) for seg in segments]
+        text = pieces[0] if pieces else ""
+        for sep, piece in zip(separators, pieces[1:]):
+            text += sep + piece
+        out.append(text)
+    return out
+
 
 def translate_text_to_hindi(text: str) -> str:
     """
     Translate English text to Hindi using Google Translator
     """
     try:
-        hindi_text = GoogleTranslator(
-            source="auto",
-            target="hi"
-        ).translate(text)
-        return hindi_text
+        return translate_texts_to_hindi([text])[0]
     except Exception as e:
         raise RuntimeError(f"Translation failed: {e}")
 
@@ -19,13 +221,27 @@ def translate_topics_to_hindi(topics: list) -> list:
     Each topic has 'topic' and 'content' fields
     Returns topics with added 'topic_hindi' and 'content_hindi' fields
     """
+    # Fast path: every title and content in one batched pass
+    try:
+        texts = []
+        for topic in topics:
+            texts.append(topic.get('topic', ''))
+            texts.append(topic.get('content', ''))
+        translated = translate_texts_to_hindi(texts)
+        return [
+            {**topic, 'topic_hindi': translated[2 * i], 'content_hindi': translated[2 * i + 1]}
+            for i, topic in enumerate(topics)
+        ]
+    except Exception as e:
+        print(f"[Translation] Batched topic translation failed, translating one by one: {e}")
+
     translated_topics = []
-    
+
     for topic in topics:
         try:
             topic_hindi = translate_text_to_hindi(topic.get('topic', ''))
             content_hindi = translate_text_to_hindi(topic.get('content', ''))
-            
+
             translated_topics.append({
                 **topic,
                 'topic_hindi': topic_hindi,
@@ -39,5 +255,5 @@ def translate_topics_to_hindi(topics: list) -> list:
                 'content_hindi': topic.get('content', ''),
                 'translation_error': str(e)
             })
-    
-    return translated_topics
\ No newline at end of file
+
+    return translated_topics
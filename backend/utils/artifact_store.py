@@ -0,0 +1,183 @@
+"""
+artifact_store.py
+Local store of precomputed artifacts (structured topics, simplified text,
+mindmaps, flashcards, quizzes, insights), filled offline by precompute.py.
+
+It is the last tier of the response cache and uses the same keys, so the
+routes serve precomputed artifacts directly, without a model call, whatever
+the memory and disk tiers have evicted. Entries never expire. The server
+only reads it; live generations are written to the cache tiers, not here.
+
+The same SQLite file holds the pipeline's checkpoints: the structured
+topics of every textbook unit and the status of every (unit, topic,
+artifact), so an interrupted run resumes where it stopped.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import threading
+
+ARTIFACT_STORE_PATH = os.getenv("ARTIFACT_STORE_PATH", os.path.join("artifacts", "artifacts.sqlite3"))
+
+# Response cache namespace -> the pipeline artifact whose checkpoints it backs
+_NAMESPACE_ARTIFACTS = {
+    "simplify": "simplified",
+    "mindmap": "mindmap",
+    "flashcards": "flashcards",
+    "quiz": "quiz",
+    "insights": "insights",
+}
+
+
+class ArtifactStore:
+    name = "artifacts"
+
+    def __init__(self, path: str, writable: bool = False):
+        self.path = path
+        self.writable = writable
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connect(self):
+        """The connection, or None while a read-only store has not been created yet."""
+        if self._conn is None:
+            if not self.writable and not os.path.exists(self.path):
+                return None
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(
+                "CREATE TABLE IF NOT EXISTS artifacts ("
+                " key TEXT PRIMARY KEY, namespace TEXT, version TEXT, created REAL, payload TEXT);"
+                "CREATE TABLE IF NOT EXISTS units ("
+                " unit_id TEXT PRIMARY KEY, path TEXT, pages TEXT, topics TEXT, structured_at REAL);"
+                "CREATE TABLE IF NOT EXISTS progress ("
+                " unit_id TEXT, topic_index INTEGER, artifact TEXT, status TEXT, error TEXT,"
+                " updated REAL, PRIMARY KEY (unit_id, topic_index, artifact));"
+            )
+        return self._conn
+
+    # ---- response cache tier ----
+
+    def get(self, key):
+        with self._lock:
+            conn = self._connect()
+            if conn is None:
+                return None
+            row = conn.execute(
+                "SELECT namespace, version, created, payload FROM artifacts WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {"namespace": row[0], "version": row[1], "created": row[2], "payload": row[3]}
+
+    def set(self, key, entry):
+        if not self.writable:
+            return
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO artifacts (key, namespace, version, created, payload)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (key, entry["namespace"], entry["version"], entry["created"], entry["payload"]),
+            )
+            conn.commit()
+
+    def invalidate(self, predicate) -> int:
+        """
+        Delete matching entries. The server's read-only store is left alone,
+        like set(). Checkpoints no longer backed by an entry are cleared too,
+        so the next precompute run regenerates instead of reporting up to date.
+        """
+        if not self.writable:
+            return 0
+        with self._lock:
+            conn = self._connect()
+            rows = conn.execute("SELECT key, namespace, version, created FROM artifacts").fetchall()
+            doomed = [(key, ns) for key, ns, version, created in rows
+                      if predicate({"namespace": ns, "version": version, "created": created})]
+            conn.executemany("DELETE FROM artifacts WHERE key = ?", [(key,) for key, _ns in doomed])
+            namespaces = {ns for _key, ns in doomed}
+            # Progress rows carry no cache key, so a namespace loses all of its checkpoints
+            artifacts = [(_NAMESPACE_ARTIFACTS[ns],) for ns in namespaces if ns in _NAMESPACE_ARTIFACTS]
+            conn.executemany("DELETE FROM progress WHERE artifact = ?", artifacts)
+            if "structure" in namespaces:
+                # Units are re-structured, and every topic index may move with them
+                conn.execute("DELETE FROM units")
+                conn.execute("DELETE FROM progress")
+            conn.commit()
+        return len(doomed)
+
+    def stats(self) -> dict:
+        with self._lock:
+            conn = self._connect()
+            if conn is None:
+                return {"items": 0, "units": 0, "path": self.path}
+            items = conn.execute("SELECT COUNT(*) FROM artifacts").fetchone()[0]
+            units = conn.execute("SELECT COUNT(*) FROM units").fetchone()[0]
+        return {"items": items, "units": units, "path": self.path}
+
+    # ---- pipeline checkpoints ----
+
+    def get_unit_topics(self, unit_id: str):
+        with self._lock:
+            conn = self._connect()
+            if conn is None:
+                return None
+            row = conn.execute("SELECT topics FROM units WHERE unit_id = ?", (unit_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def save_unit(self, unit_id: str, path: str, pages: str, topics: list):
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO units (unit_id, path, pages, topics, structured_at)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (unit_id, path, pages, json.dumps(topics, ensure_ascii=False), time.time()),
+            )
+            conn.commit()
+
+    def done_artifacts(self, unit_id: str, topic_index: int) -> set:
+        with self._lock:
+            conn = self._connect()
+            if conn is None:
+                return set()
+            rows = conn.execute(
+                "SELECT artifact FROM progress WHERE unit_id = ? AND topic_index = ? AND status = 'ok'",
+                (unit_id, topic_index),
+            ).fetchall()
+        return {row[0] for row in rows}
+
+    def mark(self, unit_id: str, topic_index: int, artifact: str, status: str, error: str = None):
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO progress (unit_id, topic_index, artifact, status, error, updated)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (unit_id, topic_index, artifact, status, error, time.time()),
+            )
+            conn.commit()
+
+    def progress_summary(self) -> dict:
+        with self._lock:
+            conn = self._connect()
+            if conn is None:
+                return {}
+            rows = conn.execute(
+                "SELECT artifact, status, COUNT(*) FROM progress GROUP BY artifact, status"
+            ).fetchall()
+        summary = {}
+        for artifact, status, count in rows:
+            summary.setdefault(artifact, {})[status] = count
+        return summary
+
+
+_store = ArtifactStore(ARTIFACT_STORE_PATH)
+
+
+def get_artifact_store() -> ArtifactStore:
+    return _store
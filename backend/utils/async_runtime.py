@@ -0,0 +1,67 @@
+"""
+async_runtime.py
+One asyncio event loop, running on a daemon thread, shared by the whole
+process. The async LLM clients from gemini_client live on this loop, so
+hundreds of model calls can be in flight at once without an OS thread each.
+
+Sync code (Flask views, the job queue, thread pools) hands coroutines over
+with run_async(); the caller's context (including the request deadline)
+travels with the coroutine.
+"""
+
+import asyncio
+import threading
+import concurrent.futures
+from utils.request_deadline import remaining, DeadlineExceeded
+
+_loop = None
+_thread = None
+_lock = threading.Lock()
+
+
+def get_loop() -> asyncio.AbstractEventLoop:
+    """The shared event loop, started on first use."""
+    global _loop, _thread
+    with _lock:
+        if _loop is None:
+            loop = asyncio.new_event_loop()
+            ready = threading.Event()
+
+            def run():
+                asyncio.set_event_loop(loop)
+                loop.call_soon(ready.set)
+                loop.run_forever()
+
+            _thread = threading.Thread(target=run, name="async-runtime", daemon=True)
+            _thread.start()
+            ready.wait()
+            _loop = loop
+        return _loop
+
+
+def run_async(coro):
+    """
+    Run a coroutine on the shared loop and block until it finishes.
+    Gives up with DeadlineExceeded when the current request's deadline passes.
+    """
+    loop = get_loop()
+    if threading.current_thread() is _thread:
+        coro.close()
+        raise RuntimeError("run_async() called from the shared event loop; await the coroutine instead")
+
+    future = asyncio.run_coroutine_threadsafe(coro, loop)
+    try:
+        return future.result(timeout=remaining())
+    except concurrent.futures.TimeoutError:
+        future.cancel()
+        raise DeadlineExceeded("Request timed out")
+
+
+def shutdown_async_runtime():
+    """Stop the shared loop (on server shutdown)."""
+    global _loop, _thread
+    with _lock:
+        if _loop is not None:
+            _loop.call_soon_threadsafe(_loop.stop)
+            _thread.join(timeout=5)
+        _loop, _thread = None, None
@@ -0,0 +1,141 @@
+"""
+blob_cache.py
+Content-addressed on-disk store for binary artifacts (rendered PDFs, audio).
+
+Files live at <directory>/<key[:2]>/<key><suffix>. The file mtime is the
+LRU clock: hits touch it, and once the directory grows past max_bytes the
+least recently used files are removed until it is back under 90%.
+"""
+
+import os
+import hashlib
+import threading
+
+
+def content_key(*parts) -> str:
+    """sha256 over the given parts (str or bytes), length-prefixed so parts cannot run together."""
+    h = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, str):
+            part = part.encode("utf-8")
+        elif part is None:
+            part = b""
+        h.update(str(len(part)).encode("ascii") + b":")
+        h.update(part)
+    return h.hexdigest()
+
+
+class BlobCache:
+    def __init__(self, directory: str, max_bytes: int, suffix: str = ""):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self._lock = threading.Lock()
+        self._bytes = None  # computed lazily
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def path_for(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}{self.suffix}")
+
+    def get(self, key: str):
+        """Return the cached file path, or None on a miss."""
+        path = self.path_for(key)
+        try:
+            os.utime(path, None)
+        except OSError:
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return path
+
+    def put(self, key: str, data: bytes) -> str:
+        writer = self.writer(key)
+        writer.write(data)
+        return writer.commit()
+
+    def writer(self, key: str):
+        """Incremental writer, for teeing a stream into the cache as it is forwarded."""
+        return _BlobWriter(self, key)
+
+    def _iter_files(self):
+        if not os.path.isdir(self.directory):
+            return
+        for root, _dirs, files in os.walk(self.directory):
+            for fname in files:
+                if fname.endswith(self.suffix) and not fname.endswith(".part"):
+                    yield os.path.join(root, fname)
+
+    def _account(self, size: int):
+        with self._lock:
+            if self._bytes is None:
+                self._bytes = sum(os.path.getsize(p) for p in self._iter_files())
+            else:
+                self._bytes += size
+            if self._bytes > self.max_bytes:
+                self._evict_locked()
+
+    def _evict_locked(self):
+        files = []
+        for p in self._iter_files():
+            try:
+                st = os.stat(p)
+            except OSError:
+                continue
+            files.append((st.st_mtime, st.st_size, p))
+        files.sort()
+        total = sum(size for _, size, _ in files)
+        target = int(self.max_bytes * 0.9)
+        for _mtime, size, p in files:
+            if total <= target:
+                break
+            try:
+                os.remove(p)
+            except OSError:
+                continue
+            total -= size
+            self.evictions += 1
+        self._bytes = total
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+
+class _BlobWriter:
+    """Writes to a .part file and only publishes it under the real name on commit()."""
+
+    def __init__(self, cache: BlobCache, key: str):
+        self.cache = cache
+        self.path = cache.path_for(key)
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        # Workers share the cache directory and thread idents repeat across processes
+        self._tmp = f"{self.path}.{os.getpid()}.{threading.get_ident()}.part"
+        self._f = open(self._tmp, "wb")
+        self._size = 0
+
+    def write(self, data: bytes):
+        self._f.write(data)
+        self._size += len(data)
+
+    def commit(self) -> str:
+        self._f.close()
+        os.replace(self._tmp, self.path)
+        self.cache._account(self._size)
+        return self.path
+
+    def abort(self):
+        self._f.close()
+        try:
+            os.remove(self._tmp)
+        except OSError:
+            pass
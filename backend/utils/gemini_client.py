@@ -1,6 +1,22 @@
 import os
-from openai import OpenAI
+import re
+import time
+import asyncio
+import threading
+from urllib.parse import urlparse
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from openai import OpenAI, AsyncOpenAI
 from dotenv import load_dotenv
+from utils.request_deadline import remaining, DeadlineExceeded
+from utils.resilience import (
+    upstream, backoff_delay, retry_after, is_retryable_status, counts_as_failure,
+)
+from utils.telemetry import (
+    BodyMeter, start_span, upstream_duration, upstream_errors,
+    upstream_request_bytes, upstream_response_bytes,
+)
 
 # Load environment variables
 load_dotenv()
@@ -16,24 +32,604 @@ API_KEY_QUIZ = os.getenv("API_KEY_QUIZ")
 API_KEY_MCQ = os.getenv("API_KEY_MCQ")
 API_KEY_FLASHCARDS = os.getenv("API_KEY_FLASHCARDS")
 OPEN_API = os.getenv("API_KEY_OPENAI")
+MISTRAL_API_KEY = os.getenv("MISTRAL_API_KEY")
+
+# Connection pool settings (shared by every pooled client)
+LLM_POOL_SIZE = int(os.getenv("LLM_POOL_SIZE", "20"))
+LLM_KEEPALIVE_SIZE = int(os.getenv("LLM_KEEPALIVE_SIZE", "10"))
+LLM_KEEPALIVE_EXPIRY = float(os.getenv("LLM_KEEPALIVE_EXPIRY", "60"))
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "5"))
+LLM_READ_TIMEOUT = float(os.getenv("LLM_READ_TIMEOUT", "120"))
+LLM_MAX_CONCURRENCY_PER_KEY = int(os.getenv("LLM_MAX_CONCURRENCY_PER_KEY", "8"))
+# Async clients hold no thread per call, so they can keep far more in flight
+LLM_ASYNC_MAX_CONCURRENCY_PER_KEY = int(os.getenv("LLM_ASYNC_MAX_CONCURRENCY_PER_KEY", "64"))
+
+
+# ---------- Client registry ----------
+#
+# One client per (purpose, api_key) for the whole process, so every request
+# reuses the same keep-alive connection pool instead of paying a fresh TCP +
+# TLS handshake. Clients sharing an API key also share a semaphore that caps
+# how many upstream calls can be in flight for that key at once.
+
+_registry_lock = threading.Lock()
+_clients = {}
+_client_keys = {}          # id(client) -> (purpose, api_key), to find a client's async twin
+_key_semaphores = {}
+_async_key_semaphores = {}
+_stats = {
+    "clients_created": 0,
+    "pool_hits": 0,
+    "upstream_requests": 0,
+    "connections_opened": 0,
+}
+
+
+def _bump(name: str, amount: int = 1):
+    with _registry_lock:
+        _stats[name] += amount
+
+
+def _semaphore_for(api_key: str) -> threading.BoundedSemaphore:
+    with _registry_lock:
+        sem = _key_semaphores.get(api_key)
+        if sem is None:
+            sem = threading.BoundedSemaphore(LLM_MAX_CONCURRENCY_PER_KEY)
+            _key_semaphores[api_key] = sem
+        return sem
+
+
+def _trace_connections(event_name: str, info: dict):
+    """httpcore trace hook: counts only brand-new TCP connections."""
+    if event_name == "connection.connect_tcp.complete":
+        _bump("connections_opened")
+
+
+def _cap_to_deadline(request):
+    """Never wait on upstream past the current request's deadline; returns seconds left."""
+    left = remaining()
+    if left is not None:
+        timeout = dict(request.extensions.get("timeout") or {})
+        for name in ("connect", "read", "write", "pool"):
+            current = timeout.get(name)
+            timeout[name] = left if current is None else min(current, left)
+        request.extensions["timeout"] = timeout
+    return left
+
+
+# ---------- Retries, adaptive timeouts, hedging (see utils/resilience.py) ----------
+
+_RETRYABLE_ERRORS = (httpx.TimeoutException, httpx.NetworkError, httpx.RemoteProtocolError)
+_STREAM_BODY_RE = re.compile(rb'"stream"\s*:\s*true')
+
+
+def _is_streaming(request) -> bool:
+    """Token streams are neither hedged nor timed: their length says nothing about upstream health."""
+    if "text/event-stream" in request.headers.get("accept", ""):
+        return True
+    try:
+        return bool(_STREAM_BODY_RE.search(request.content))
+    except httpx.RequestNotRead:
+        return True
+
+
+def _adapt_read_timeout(request, up, purpose: str):
+    timeout = dict(request.extensions.get("timeout") or {})
+    timeout["read"] = up.read_timeout(purpose, timeout.get("read"))
+    request.extensions["timeout"] = timeout
+
+
+def _retry_delay(up, attempt: int, reason, hint: float = 0.0):
+    """Backoff before the next attempt, or None to give up."""
+    delay = backoff_delay(attempt, hint)
+    if delay is not None:
+        up.count("retries")
+        print(f"[Upstream] {up.name}: {reason}, retry {attempt} in {delay:.2f}s")
+    return delay
+
+
+def _settle(up, purpose: str, status_code: int, headers, attempt: int, started):
+    """Record how an attempt went; returns a backoff delay if the answer should be retried."""
+    if counts_as_failure(status_code):
+        up.record_failure()
+    else:
+        ok = 200 <= status_code < 300 and started is not None
+        up.record_success(purpose, time.monotonic() - started if ok else None)
+    if not is_retryable_status(status_code):
+        return None
+    return _retry_delay(up, attempt, f"HTTP {status_code}", retry_after(headers))
+
+
+def _start_upstream_span(request, purpose: str):
+    host = request.url.host
+    try:
+        size = len(request.content)
+    except httpx.RequestNotRead:
+        size = 0
+    upstream_request_bytes.inc(size, host=host, purpose=purpose)
+    return start_span("upstream", host=host, purpose=purpose, request_bytes=size)
+
+
+def _end_upstream_span(span, purpose: str, status_code: int = None, error: BaseException = None):
+    """Close an exchange's span at response headers (or failure) and record its latency."""
+    host = span.attrs["host"]
+    if isinstance(error, asyncio.CancelledError):
+        span.set(cancelled=True)   # the losing half of a hedge
+    elif error is not None:
+        span.set(error=type(error).__name__)
+        upstream_errors.inc(host=host, purpose=purpose, type=type(error).__name__)
+    else:
+        span.set(status=status_code)
+        if status_code >= 400:
+            upstream_errors.inc(host=host, purpose=purpose, type=f"http_{status_code}")
+    span.end()
+    upstream_duration.observe(span.duration, host=host, purpose=purpose,
+                              status=status_code if error is None else "error")
+
+
+class _ReleasingStream(httpx.SyncByteStream):
+    """Response body wrapper that meters the body and frees the concurrency slot exactly once on close."""
+
+    def __init__(self, stream, semaphore: threading.BoundedSemaphore, meter: BodyMeter):
+        self._stream = stream
+        self._semaphore = semaphore
+        self._meter = meter
+        self._released = False
+
+    def __iter__(self):
+        for chunk in self._stream:
+            self._meter.feed(chunk)
+            yield chunk
+
+    def close(self):
+        try:
+            self._stream.close()
+        finally:
+            if not self._released:
+                self._released = True
+                self._semaphore.release()
+                self._meter.close()
+
+
+class _PooledTransport(httpx.HTTPTransport):
+    """
+    HTTP transport that enforces the per-key concurrency limit, counts
+    connection reuse, and retries and circuit-breaks per upstream host.
+    """
+
+    def __init__(self, semaphore: threading.BoundedSemaphore, purpose: str, **kwargs):
+        super().__init__(**kwargs)
+        self._semaphore = semaphore
+        self._purpose = purpose
+
+    def _send(self, request):
+        left = _cap_to_deadline(request)
+        _bump("upstream_requests")
+        if not self._semaphore.acquire(timeout=left):
+            raise DeadlineExceeded("Request timed out waiting for an upstream slot")
+        span = _start_upstream_span(request, self._purpose)
+        try:
+            response = super().handle_request(request)
+        except Exception as e:
+            self._semaphore.release()
+            _end_upstream_span(span, self._purpose, error=e)
+            raise
+        _end_upstream_span(span, self._purpose, response.status_code)
+        meter = BodyMeter(span.attrs["host"], self._purpose, response.headers.get("content-type"), span)
+        # Keep the slot until the body (possibly a token stream) is closed.
+        return httpx.Response(
+            status_code=response.status_code,
+            headers=response.headers,
+            stream=_ReleasingStream(response.stream, self._semaphore, meter),
+            extensions=response.extensions,
+        )
+
+    def handle_request(self, request):
+        request.extensions["trace"] = _trace_connections
+        up = upstream(request.url.host)
+        streaming = _is_streaming(request)
+        attempt = 0
+        while True:
+            attempt += 1
+            if not streaming:
+                _adapt_read_timeout(request, up, self._purpose)
+            up.before_call()
+            started = time.monotonic()
+            try:
+                response = self._send(request)
+            except _RETRYABLE_ERRORS as e:
+                up.record_failure()
+                delay = _retry_delay(up, attempt, repr(e))
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                continue
+            except BaseException:
+                up.release()
+                raise
+            delay = _settle(up, self._purpose, response.status_code, response.headers,
+                            attempt, None if streaming else started)
+            if delay is None:
+                return response
+            # Drain the (small) error body so the connection goes back to the pool
+            try:
+                response.read()
+            finally:
+                response.close()
+            time.sleep(delay)
+
+
+class _ReleasingAsyncStream(httpx.AsyncByteStream):
+    def __init__(self, stream, semaphore: asyncio.Semaphore, meter: BodyMeter):
+        self._stream = stream
+        self._semaphore = semaphore
+        self._meter = meter
+        self._released = False
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            self._meter.feed(chunk)
+            yield chunk
+
+    async def aclose(self):
+        try:
+            await self._stream.aclose()
+        finally:
+            if not self._released:
+                self._released = True
+                self._semaphore.release()
+                self._meter.close()
+
+
+class _AsyncPooledTransport(httpx.AsyncHTTPTransport):
+    """
+    Async twin of _PooledTransport, for clients living on the shared event
+    loop. Non-streaming calls can also be hedged here (UPSTREAM_HEDGE).
+    """
+
+    def __init__(self, semaphore: asyncio.Semaphore, purpose: str, **kwargs):
+        super().__init__(**kwargs)
+        self._semaphore = semaphore
+        self._purpose = purpose
+
+    async def _send(self, request):
+        left = _cap_to_deadline(request)
+        _bump("upstream_requests")
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), left)
+        except asyncio.TimeoutError:
+            raise DeadlineExceeded("Request timed out waiting for an upstream slot")
+        span = _start_upstream_span(request, self._purpose)
+        try:
+            response = await super().handle_async_request(request)
+        except BaseException as e:
+            self._semaphore.release()
+            _end_upstream_span(span, self._purpose, error=e)
+            raise
+        _end_upstream_span(span, self._purpose, response.status_code)
+        meter = BodyMeter(span.attrs["host"], self._purpose, response.headers.get("content-type"), span)
+        return httpx.Response(
+            status_code=response.status_code,
+            headers=response.headers,
+            stream=_ReleasingAsyncStream(response.stream, self._semaphore, meter),
+            extensions=response.extensions,
+        )
+
+    async def _hedged_send(self, request, up, streaming: bool):
+        """Send; if no answer by the purpose's p95, send a duplicate and keep whichever answers first."""
+        delay = None if streaming else up.hedge_delay(self._purpose)
+        if delay is None:
+            return await self._send(request)
+
+        first = asyncio.ensure_future(self._send(request))
+        second = None
+        winner = None
+        try:
+            done, _ = await asyncio.wait({first}, timeout=delay)
+            if not done:
+                up.count("hedges")
+                second = asyncio.ensure_future(self._send(request))
+            pending, error = {first, second} - {None}, None
+            while winner is None:
+                if not pending:
+                    raise error
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is not None:
+                        error = task.exception()
+                    elif winner is None:
+                        winner = task
+            if winner is second:
+                up.count("hedge_wins")
+            return winner.result()
+        finally:
+            # Cancel the slower request, or close it if both answered
+            for task in (first, second):
+                if task is None or task is winner:
+                    continue
+                if not task.done():
+                    task.cancel()
+                elif not task.cancelled() and task.exception() is None:
+                    await task.result().aclose()
+
+    async def handle_async_request(self, request):
+        request.extensions["trace"] = _trace_connections_async
+        up = upstream(request.url.host)
+        streaming = _is_streaming(request)
+        attempt = 0
+        while True:
+            attempt += 1
+            if not streaming:
+                _adapt_read_timeout(request, up, self._purpose)
+            up.before_call()
+            started = time.monotonic()
+            try:
+                response = await self._hedged_send(request, up, streaming)
+            except _RETRYABLE_ERRORS as e:
+                up.record_failure()
+                delay = _retry_delay(up, attempt, repr(e))
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                continue
+            except BaseException:
+                up.release()
+                raise
+            delay = _settle(up, self._purpose, response.status_code, response.headers,
+                            attempt, None if streaming else started)
+            if delay is None:
+                return response
+            try:
+                await response.aread()
+            finally:
+                await response.aclose()
+            await asyncio.sleep(delay)
+
+
+async def _trace_connections_async(event_name: str, info: dict):
+    _trace_connections(event_name, info)
+
+
+def _async_semaphore_for(api_key: str) -> asyncio.Semaphore:
+    with _registry_lock:
+        sem = _async_key_semaphores.get(api_key)
+        if sem is None:
+            sem = asyncio.Semaphore(LLM_ASYNC_MAX_CONCURRENCY_PER_KEY)
+            _async_key_semaphores[api_key] = sem
+        return sem
+
+
+def _pool_limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=LLM_POOL_SIZE,
+        max_keepalive_connections=LLM_KEEPALIVE_SIZE,
+        keepalive_expiry=LLM_KEEPALIVE_EXPIRY,
+    )
+
+
+def _build_async_http_client(api_key: str, purpose: str) -> httpx.AsyncClient:
+    transport = _AsyncPooledTransport(_async_semaphore_for(api_key), purpose, limits=_pool_limits())
+    timeout = httpx.Timeout(LLM_READ_TIMEOUT, connect=LLM_CONNECT_TIMEOUT)
+    return httpx.AsyncClient(transport=transport, timeout=timeout)
+
+
+def _build_http_client(api_key: str, purpose: str) -> httpx.Client:
+    transport = _PooledTransport(_semaphore_for(api_key), purpose, limits=_pool_limits())
+    timeout = httpx.Timeout(LLM_READ_TIMEOUT, connect=LLM_CONNECT_TIMEOUT)
+    return httpx.Client(transport=transport, timeout=timeout)
+
+
+def _get_or_create(purpose: str, api_key: str, factory):
+    registry_key = (purpose, api_key)
+    with _registry_lock:
+        client = _clients.get(registry_key)
+        if client is not None:
+            _stats["pool_hits"] += 1
+            return client
+
+    client = factory()
+
+    with _registry_lock:
+        # Another thread may have won the race; keep the first client.
+        existing = _clients.get(registry_key)
+        if existing is not None:
+            _stats["pool_hits"] += 1
+            return existing
+        _clients[registry_key] = client
+        _client_keys[id(client)] = registry_key
+        _stats["clients_created"] += 1
+        return client
+
+
+def get_client(purpose: str, api_key: str):
+    """Return the shared OpenAI-compatible client for this purpose and key."""
+    return _get_or_create(
+        purpose,
+        api_key,
+        lambda: OpenAI(
+            api_key=api_key,
+            base_url=BASE_URL,
+            http_client=_build_http_client(api_key, purpose),
+            max_retries=0,  # the transport retries (utils/resilience.py)
+        ),
+    )
+
+
+def get_mistral_client(purpose: str = "chatbot", api_key: str = None):
+    """Return the shared native Mistral SDK client (used by the chatbot)."""
+    from mistralai import Mistral
+
+    api_key = api_key or MISTRAL_API_KEY
+    return _get_or_create(
+        purpose,
+        api_key,
+        lambda: Mistral(
+            api_key=api_key,
+            client=_build_http_client(api_key, purpose),
+            timeout_ms=int(LLM_READ_TIMEOUT * 1000),
+        ),
+    )
+
+
+class _UpstreamAdapter(HTTPAdapter):
+    """
+    requests adapter that caps each call's timeout to the request deadline and
+    applies the same retries, adaptive timeouts and circuit breaker as the
+    httpx transports.
+    """
+
+    def __init__(self, purpose: str, **kwargs):
+        super().__init__(**kwargs)
+        self._purpose = purpose
+
+    def _timeout(self, up, timeout, stream: bool):
+        connect, read = timeout if isinstance(timeout, tuple) else (timeout, timeout)
+        if not stream:
+            read = up.read_timeout(self._purpose, read)
+        left = remaining()
+        if left is not None:
+            connect = left if connect is None else min(connect, left)
+            read = left if read is None else min(read, left)
+        return (connect, read)
+
+    def _start_span(self, up, request):
+        body = request.body
+        if isinstance(body, str):
+            body = body.encode()
+        size = len(body) if isinstance(body, bytes) else 0
+        upstream_request_bytes.inc(size, host=up.name, purpose=self._purpose)
+        return start_span("upstream", host=up.name, purpose=self._purpose, request_bytes=size)
+
+    def send(self, request, stream=False, timeout=None, **kwargs):
+        up = upstream(urlparse(request.url).hostname)
+        attempt = 0
+        while True:
+            attempt += 1
+            up.before_call()
+            started = time.monotonic()
+            span = self._start_span(up, request)
+            try:
+                response = super().send(request, stream=stream,
+                                        timeout=self._timeout(up, timeout, stream), **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                _end_upstream_span(span, self._purpose, error=e)
+                up.record_failure()
+                delay = _retry_delay(up, attempt, repr(e))
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                continue
+            except BaseException as e:
+                _end_upstream_span(span, self._purpose, error=e)
+                up.release()
+                raise
+            _end_upstream_span(span, self._purpose, response.status_code)
+            # Streamed bodies (audio) are counted only when the length is announced
+            size = int(response.headers.get("content-length") or (0 if stream else len(response.content)))
+            upstream_response_bytes.inc(size, host=up.name, purpose=self._purpose)
+            span.set(response_bytes=size)
+            delay = _settle(up, self._purpose, response.status_code, response.headers,
+                            attempt, None if stream else started)
+            if delay is None:
+                return response
+            response.close()
+            time.sleep(delay)
+
+
+def get_async_client(purpose: str, api_key: str):
+    """Async twin of get_client; use it from coroutines on the shared event loop."""
+    return _get_or_create(
+        f"{purpose}:async",
+        api_key,
+        lambda: AsyncOpenAI(
+            api_key=api_key,
+            base_url=BASE_URL,
+            http_client=_build_async_http_client(api_key, purpose),
+            max_retries=0,
+        ),
+    )
+
+
+def get_async_mistral_client(purpose: str = "chatbot", api_key: str = None):
+    """Mistral client whose *_async methods run on a pooled httpx.AsyncClient."""
+    from mistralai import Mistral
+
+    api_key = api_key or MISTRAL_API_KEY
+    return _get_or_create(
+        f"{purpose}:async",
+        api_key,
+        lambda: Mistral(
+            api_key=api_key,
+            async_client=_build_async_http_client(api_key, purpose),
+            timeout_ms=int(LLM_READ_TIMEOUT * 1000),
+        ),
+    )
+
+
+def async_client_for(client):
+    """
+    The async OpenAI-compatible client matching a sync client from
+    get_client (same purpose and key), so sync wrappers can delegate.
+    """
+    with _registry_lock:
+        registry_key = _client_keys.get(id(client))
+    if registry_key is None:
+        return get_async_client("adhoc", client.api_key)
+    purpose, api_key = registry_key
+    return get_async_client(purpose, api_key)
+
+
+def get_async_http_client(purpose: str) -> httpx.AsyncClient:
+    """Shared keep-alive httpx.AsyncClient for non-LLM upstreams (images)."""
+    return _get_or_create(
+        f"{purpose}:async",
+        None,
+        lambda: httpx.AsyncClient(
+            transport=_AsyncPooledTransport(_async_semaphore_for(purpose), purpose, limits=_pool_limits()),
+            timeout=httpx.Timeout(LLM_READ_TIMEOUT, connect=LLM_CONNECT_TIMEOUT),
+        ),
+    )
+
+
+def get_http_session(purpose: str) -> requests.Session:
+    """Return a shared keep-alive requests.Session for non-LLM upstreams (TTS, images)."""
+
+    def factory():
+        session = requests.Session()
+        adapter = _UpstreamAdapter(purpose, pool_connections=LLM_POOL_SIZE, pool_maxsize=LLM_POOL_SIZE)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    return _get_or_create(purpose, None, factory)
+
+
+def get_client_pool_stats() -> dict:
+    """Counters for measuring how much client/connection setup the registry saves."""
+    with _registry_lock:
+        stats = dict(_stats)
+        stats["clients"] = len(_clients)
+    stats["connections_reused"] = max(stats["upstream_requests"] - stats["connections_opened"], 0)
+    return stats
+
 
 def initialize_imageprompt_client():
-    return OpenAI(api_key=API_KEY_IMAGEPROMPT, base_url=BASE_URL)
+    return get_client("imageprompt", API_KEY_IMAGEPROMPT)
 
 def initialize_simplify_client():
-    return OpenAI(api_key=API_KEY_SIMPLIFY, base_url=BASE_URL)
+    return get_client("simplify", API_KEY_SIMPLIFY)
 
 def initialize_mindmap_client():
-    return OpenAI(api_key=API_KEY_MINDMAP, base_url=BASE_URL)
+    return get_client("mindmap", API_KEY_MINDMAP)
 
 def initialize_quiz_client():
-    return OpenAI(api_key=API_KEY_QUIZ, base_url=BASE_URL)
+    return get_client("quiz", API_KEY_QUIZ)
 
 def initialize_mcq_client():
-    return OpenAI(api_key=API_KEY_MCQ, base_url=BASE_URL)
+    return get_client("mcq", API_KEY_MCQ)
 
 def initialize_flashcards_client():
-    return OpenAI(api_key=API_KEY_FLASHCARDS, base_url=BASE_URL)
+    return get_client("flashcards", API_KEY_FLASHCARDS)
 
 def initialize_openai_client():
-    return OpenAI(api_key=OPEN_API, base_url=BASE_URL)
+    return get_client("openai", OPEN_API)
@@ -0,0 +1,276 @@
+"""
+job_queue.py
+In-process background jobs for slow endpoints (PDF export, image
+generation, mindmap narration), so they stop pinning a Flask worker.
+
+Jobs run on a local thread pool; their state and results live in SQLite and
+plain files under JOB_DIR, so nothing external is needed. Submitting a job
+identical to one that is still queued, running or finished (and not yet
+expired) returns the existing job instead of doing the work twice.
+
+Each queued/running row records the pid of the process running it, which
+refreshes its `updated` heartbeat. Rows whose process is gone (a killed or
+timed-out worker) or whose heartbeat went stale are failed on the next
+submit or worker start, so new submissions never attach to a dead job.
+
+A job function has the signature fn(payload, progress) and returns either
+    (bytes, mimetype, filename)   for binary results, or
+    any JSON-serializable value   for JSON results.
+progress(fraction, message="") may be called to report 0..1 progress.
+"""
+
+import os
+import json
+import time
+import uuid
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from utils.blob_cache import content_key
+
+JOB_DIR = os.getenv("JOB_DIR", os.path.join("cache", "jobs"))
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+JOB_RESULT_TTL = int(os.getenv("JOB_RESULT_TTL", str(6 * 3600)))
+# With several server workers sharing JOB_DIR, recovery runs once in the
+# master process (see gunicorn.conf.py) instead of in every worker.
+JOB_RECOVER_ON_START = os.getenv("JOB_RECOVER_ON_START", "1") != "0"
+JOB_HEARTBEAT_INTERVAL = float(os.getenv("JOB_HEARTBEAT_INTERVAL", "15"))
+# A live job whose heartbeat is older than this is treated as orphaned
+JOB_STALE_AFTER = float(os.getenv("JOB_STALE_AFTER", "120"))
+
+_kinds = {}
+_lock = threading.Lock()
+_conn = None
+_pool = None
+_live = set()   # ids of the jobs this process is queueing or running
+
+
+def register_job_kind(kind: str, fn):
+    _kinds[kind] = fn
+
+
+def _db():
+    global _conn, _pool
+    if _conn is None:
+        os.makedirs(JOB_DIR, exist_ok=True)
+        _conn = sqlite3.connect(os.path.join(JOB_DIR, "jobs.sqlite3"), check_same_thread=False)
+        _conn.row_factory = sqlite3.Row
+        _conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id TEXT PRIMARY KEY, kind TEXT, dedupe_key TEXT, status TEXT,"
+            " progress REAL, message TEXT, error TEXT,"
+            " result_path TEXT, result_mime TEXT, result_name TEXT,"
+            " created REAL, updated REAL, expires REAL)"
+        )
+        columns = {row["name"] for row in _conn.execute("PRAGMA table_info(jobs)")}
+        if "owner_pid" not in columns:
+            _conn.execute("ALTER TABLE jobs ADD COLUMN owner_pid INTEGER")
+        _conn.execute("CREATE INDEX IF NOT EXISTS jobs_dedupe ON jobs (dedupe_key)")
+        if JOB_RECOVER_ON_START:
+            _mark_interrupted(_conn)
+        _fail_orphans_locked(_conn)
+        _conn.commit()
+        _pool = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix="job")
+        threading.Thread(target=_heartbeat, name="job-heartbeat", daemon=True).start()
+    return _conn
+
+
+def _pid_alive(pid: int) -> bool:
+    if os.name == "nt":
+        return True  # os.kill would terminate it; rely on the heartbeat
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _fail_orphans_locked(conn):
+    """Fail queued/running jobs whose owning process is gone or has stopped heartbeating."""
+    now, me = time.time(), os.getpid()
+    rows = conn.execute(
+        "SELECT id, owner_pid, updated FROM jobs WHERE status IN ('queued', 'running')"
+    ).fetchall()
+    orphans = []
+    for row in rows:
+        pid = row["owner_pid"]
+        if pid == me:
+            # Same pid as ours but not our job: an earlier process that reused the pid
+            dead = row["id"] not in _live
+        else:
+            dead = pid is None or not _pid_alive(pid) or (row["updated"] or 0) < now - JOB_STALE_AFTER
+        if dead:
+            orphans.append((now, now + JOB_RESULT_TTL, row["id"]))
+    if orphans:
+        conn.executemany(
+            "UPDATE jobs SET status = 'failed', error = 'Interrupted: the worker running it stopped',"
+            " updated = ?, expires = ? WHERE id = ?",
+            orphans,
+        )
+        print(f"[Jobs] failed {len(orphans)} job(s) left behind by a stopped worker")
+
+
+def _heartbeat():
+    while True:
+        time.sleep(JOB_HEARTBEAT_INTERVAL)
+        with _lock:
+            if not _live:
+                continue
+            try:
+                _conn.execute(
+                    "UPDATE jobs SET updated = ? WHERE owner_pid = ? AND status IN ('queued', 'running')",
+                    (time.time(), os.getpid()),
+                )
+                _conn.commit()
+            except sqlite3.Error as e:
+                print(f"[Jobs] heartbeat failed: {e}")
+
+
+def _mark_interrupted(conn):
+    # Payloads are held in memory only, so work from a previous process is lost.
+    now = time.time()
+    conn.execute(
+        "UPDATE jobs SET status = 'failed', error = 'Interrupted by server restart', updated = ?,"
+        " expires = ? WHERE status IN ('queued', 'running')",
+        (now, now + JOB_RESULT_TTL),
+    )
+
+
+def recover_interrupted_jobs():
+    """Fail jobs left queued/running by a previous server; call once before workers start."""
+    path = os.path.join(JOB_DIR, "jobs.sqlite3")
+    if not os.path.exists(path):
+        return
+    conn = sqlite3.connect(path)
+    try:
+        _mark_interrupted(conn)
+        conn.commit()
+    except sqlite3.OperationalError:
+        pass  # table not created yet
+    finally:
+        conn.close()
+
+
+def shutdown_job_queue(wait: bool = True):
+    """Stop taking jobs; with wait=True, let running jobs finish first."""
+    if _pool is not None:
+        _pool.shutdown(wait=wait, cancel_futures=not wait)
+
+
+def _update(job_id: str, **fields):
+    fields["updated"] = time.time()
+    cols = ", ".join(f"{k} = ?" for k in fields)
+    with _lock:
+        conn = _db()
+        conn.execute(f"UPDATE jobs SET {cols} WHERE id = ?", (*fields.values(), job_id))
+        conn.commit()
+
+
+def _purge_expired_locked(conn):
+    now = time.time()
+    rows = conn.execute(
+        "SELECT id, result_path FROM jobs WHERE expires IS NOT NULL AND expires < ?", (now,)
+    ).fetchall()
+    for row in rows:
+        if row["result_path"]:
+            try:
+                os.remove(row["result_path"])
+            except OSError:
+                pass
+    conn.execute("DELETE FROM jobs WHERE expires IS NOT NULL AND expires < ?", (now,))
+
+
+def _run(job_id: str, kind: str, payload: dict):
+    _update(job_id, status="running", progress=0.0)
+
+    def progress(fraction: float, message: str = ""):
+        _update(job_id, progress=max(0.0, min(float(fraction), 1.0)), message=message)
+
+    try:
+        result = _kinds[kind](payload, progress)
+        if isinstance(result, tuple):
+            data, mime, name = result
+        else:
+            data, mime, name = json.dumps(result, ensure_ascii=False).encode("utf-8"), "application/json", None
+        path = os.path.join(JOB_DIR, f"{job_id}.bin")
+        with open(path, "wb") as f:
+            f.write(data)
+        _update(job_id, status="done", progress=1.0, result_path=path, result_mime=mime,
+                result_name=name, expires=time.time() + JOB_RESULT_TTL)
+    except Exception as e:
+        print(f"[Jobs] {kind} job {job_id} failed: {e}")
+        _update(job_id, status="failed", error=str(e), expires=time.time() + JOB_RESULT_TTL)
+    finally:
+        with _lock:
+            _live.discard(job_id)
+
+
+def submit_job(kind: str, payload: dict) -> dict:
+    """Queue a job (or attach to an identical live one) and return its status."""
+    if kind not in _kinds:
+        raise ValueError(f"Unknown job kind: {kind}")
+
+    dedupe_key = content_key(kind, json.dumps(payload, sort_keys=True, ensure_ascii=False))
+    now = time.time()
+    with _lock:
+        conn = _db()
+        _purge_expired_locked(conn)
+        _fail_orphans_locked(conn)
+        row = conn.execute(
+            "SELECT id FROM jobs WHERE dedupe_key = ? AND status != 'failed'"
+            " ORDER BY created DESC LIMIT 1",
+            (dedupe_key,),
+        ).fetchone()
+        if row:
+            conn.commit()
+            job_id = row["id"]
+            deduplicated = True
+        else:
+            job_id = uuid.uuid4().hex
+            conn.execute(
+                "INSERT INTO jobs (id, kind, dedupe_key, status, progress, created, updated, owner_pid)"
+                " VALUES (?, ?, ?, 'queued', 0, ?, ?, ?)",
+                (job_id, kind, dedupe_key, now, now, os.getpid()),
+            )
+            conn.commit()
+            _live.add(job_id)
+            _pool.submit(_run, job_id, kind, payload)
+            deduplicated = False
+
+    status = get_job(job_id)
+    status["deduplicated"] = deduplicated
+    return status
+
+
+def get_job(job_id: str):
+    """Public status view of a job, or None if it does not exist (or expired)."""
+    with _lock:
+        row = _db().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+    if row is None:
+        return None
+    return {
+        "job_id": row["id"],
+        "kind": row["kind"],
+        "status": row["status"],
+        "progress": row["progress"],
+        "message": row["message"],
+        "error": row["error"],
+        "created": row["created"],
+        "updated": row["updated"],
+        "expires": row["expires"],
+    }
+
+
+def get_job_result(job_id: str):
+    """(path, mimetype, filename) for a finished job, or None."""
+    with _lock:
+        row = _db().execute(
+            "SELECT status, result_path, result_mime, result_name FROM jobs WHERE id = ?", (job_id,)
+        ).fetchone()
+    if row is None or row["status"] != "done" or not row["result_path"]:
+        return None
+    if not os.path.exists(row["result_path"]):
+        return None
+    return row["result_path"], row["result_mime"], row["result_name"]
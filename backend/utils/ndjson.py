@@ -0,0 +1,29 @@
+import json
+from flask import Response, stream_with_context
+
+
+def ndjson_line(record) -> str:
+    """One JSON document per line."""
+    return json.dumps(record, ensure_ascii=False) + "\n"
+
+
+def ndjson_response(records):
+    """
+    Stream an iterable of dicts as application/x-ndjson. As with
+    sse_response, an exception mid-stream becomes a final {"error": ...} line.
+    """
+    def generate():
+        try:
+            for record in records:
+                yield ndjson_line(record)
+        except Exception as e:
+            yield ndjson_line({"artifact": "error", "status": "error", "error": str(e)})
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="application/x-ndjson",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+        },
+    )
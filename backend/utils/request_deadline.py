@@ -0,0 +1,114 @@
+"""
+request_deadline.py
+Per-route request timeouts.
+
+Almost all request time is spent waiting on upstream HTTP (LLM, TTS, image
+APIs), so a route's timeout is enforced there: every request gets a
+deadline, and the shared clients in gemini_client cap each upstream call's
+timeouts to whatever is left of it. Once the deadline has passed, the next
+upstream call raises DeadlineExceeded, which is answered with a 504.
+
+Timeouts are matched by the longest path prefix in ROUTE_TIMEOUTS, e.g.
+    ROUTE_TIMEOUTS="/export=300,/generate_audio=180"
+on top of the built-in defaults, with REQUEST_TIMEOUT for everything else.
+Work handed to background threads (thread pools, the job queue) does not
+inherit the deadline.
+"""
+
+import os
+import time
+import contextvars
+from dotenv import load_dotenv
+
+load_dotenv()
+
+REQUEST_TIMEOUT = float(os.getenv("REQUEST_TIMEOUT", "120"))
+
+_DEFAULT_ROUTE_TIMEOUTS = {
+    "/upload_pdf": 300,
+    "/export": 300,
+    "/explain_mindmap": 300,
+    "/generate_audio": 180,
+    "/generate_images": 180,
+    "/topic_bundle": 300,
+    "/jobs": 30,
+    "/cache": 30,
+    "/upstream": 30,
+    "/metrics": 30,
+}
+
+_deadline = contextvars.ContextVar("request_deadline", default=None)
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+def _parse_route_timeouts(spec: str) -> dict:
+    timeouts = dict(_DEFAULT_ROUTE_TIMEOUTS)
+    for item in (spec or "").split(","):
+        prefix, sep, seconds = item.strip().partition("=")
+        if not sep:
+            continue
+        try:
+            timeouts[prefix.strip()] = float(seconds)
+        except ValueError:
+            print(f"[Deadline] ignoring bad ROUTE_TIMEOUTS entry: {item!r}")
+    return timeouts
+
+
+ROUTE_TIMEOUTS = _parse_route_timeouts(os.getenv("ROUTE_TIMEOUTS", ""))
+
+
+def timeout_for_path(path: str) -> float:
+    best, best_len = REQUEST_TIMEOUT, -1
+    for prefix, seconds in ROUTE_TIMEOUTS.items():
+        if path.startswith(prefix) and len(prefix) > best_len:
+            best, best_len = seconds, len(prefix)
+    return best
+
+
+def remaining(default: float = None):
+    """
+    Seconds left before the current request's deadline, capped at default.
+    Returns default outside a request. Raises DeadlineExceeded once it has passed.
+    """
+    deadline = _deadline.get()
+    if deadline is None:
+        return default
+    left = deadline - time.monotonic()
+    if left <= 0:
+        raise DeadlineExceeded("Request timed out")
+    return left if default is None else min(default, left)
+
+
+def clear_deadline():
+    """Drop the deadline in the current context, for work shared by several requests."""
+    _deadline.set(None)
+
+
+def install_request_deadlines(app):
+    """Start a deadline for every request and answer DeadlineExceeded with 504."""
+    from flask import request
+    from utils.response_formatter import error_response
+
+    @app.before_request
+    def _start_deadline():
+        _deadline.set(time.monotonic() + timeout_for_path(request.path))
+
+    @app.after_request
+    def _report_timeout(response):
+        # SDK clients wrap DeadlineExceeded in their own errors, which routes
+        # turn into a 500; report those as the timeout they really are.
+        deadline = _deadline.get()
+        if deadline is not None and response.status_code >= 500 and time.monotonic() >= deadline:
+            response.status_code = 504
+        return response
+
+    @app.teardown_request
+    def _clear_deadline(_exc=None):
+        _deadline.set(None)
+
+    @app.errorhandler(DeadlineExceeded)
+    def _deadline_exceeded(e):
+        return error_response(str(e) or "Request timed out", 504)
@@ -0,0 +1,309 @@
+"""
+resilience.py
+Retry, backoff, hedging and circuit breaking for upstream calls.
+
+The pooled transports in gemini_client run every LLM, TTS and image request
+through this module, and call() wraps anything that does its own HTTP
+(translation). Per upstream it keeps:
+
+- a rolling latency window per purpose (simplify, flashcards, elevenlabs...),
+  used to tighten read timeouts to a multiple of the observed p99 and to
+  decide when a slow call gets a hedged duplicate (after its p95);
+- a circuit breaker per host: after UPSTREAM_BREAKER_FAILURES consecutive
+  failures it fails fast for UPSTREAM_BREAKER_COOLDOWN seconds, then lets a
+  single probe through before closing again;
+- retry and hedge counters, reported by get_resilience_stats().
+
+Only connection errors, timeouts and 408/425/429/5xx answers are retried,
+with full-jitter exponential backoff that never sleeps past the request
+deadline. Hedging is off unless UPSTREAM_HEDGE names a purpose or host
+("*" for all), since a duplicate request is billed like any other.
+"""
+
+import os
+import time
+import random
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from dotenv import load_dotenv
+from utils.request_deadline import remaining
+from utils.telemetry import start_span, upstream_duration, upstream_errors
+
+load_dotenv()
+
+RETRY_ATTEMPTS = int(os.getenv("UPSTREAM_RETRY_ATTEMPTS", "3"))
+RETRY_BASE_DELAY = float(os.getenv("UPSTREAM_RETRY_BASE_DELAY", "0.5"))
+RETRY_MAX_DELAY = float(os.getenv("UPSTREAM_RETRY_MAX_DELAY", "8"))
+RETRYABLE_STATUS = {408, 425, 429, 500, 502, 503, 504}
+
+ADAPTIVE_TIMEOUTS = os.getenv("UPSTREAM_ADAPTIVE_TIMEOUTS", "1") != "0"
+TIMEOUT_PERCENTILE = float(os.getenv("UPSTREAM_TIMEOUT_PERCENTILE", "99"))
+TIMEOUT_MULTIPLIER = float(os.getenv("UPSTREAM_TIMEOUT_MULTIPLIER", "3"))
+TIMEOUT_FLOOR = float(os.getenv("UPSTREAM_TIMEOUT_FLOOR", "15"))
+LATENCY_WINDOW = int(os.getenv("UPSTREAM_LATENCY_WINDOW", "200"))
+LATENCY_MIN_SAMPLES = int(os.getenv("UPSTREAM_LATENCY_MIN_SAMPLES", "20"))
+
+HEDGE = {h.strip() for h in os.getenv("UPSTREAM_HEDGE", "").split(",") if h.strip()}
+HEDGE_PERCENTILE = float(os.getenv("UPSTREAM_HEDGE_PERCENTILE", "95"))
+HEDGE_MIN_DELAY = float(os.getenv("UPSTREAM_HEDGE_MIN_DELAY", "1"))
+
+BREAKER_FAILURES = int(os.getenv("UPSTREAM_BREAKER_FAILURES", "5"))
+BREAKER_COOLDOWN = float(os.getenv("UPSTREAM_BREAKER_COOLDOWN", "30"))
+
+# Threads for call(timeout=...): a stuck call keeps its thread, not the caller's
+BOUNDED_CALL_WORKERS = int(os.getenv("UPSTREAM_BOUNDED_CALL_WORKERS", "16"))
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised without contacting the upstream while its circuit is open."""
+
+
+class _Latencies:
+    def __init__(self):
+        self.samples = deque(maxlen=LATENCY_WINDOW)
+
+    def percentile(self, p: float):
+        if len(self.samples) < LATENCY_MIN_SAMPLES:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+
+class Upstream:
+    """Breaker state, latency windows and counters for one upstream host."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._latencies = {}
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+        self.counters = {
+            "requests": 0, "successes": 0, "failures": 0, "retries": 0,
+            "hedges": 0, "hedge_wins": 0, "rejected": 0, "circuit_opened": 0,
+        }
+
+    # ---- latency ----
+
+    def _window(self, purpose: str) -> _Latencies:
+        window = self._latencies.get(purpose)
+        if window is None:
+            window = self._latencies[purpose] = _Latencies()
+        return window
+
+    def read_timeout(self, purpose: str, default):
+        """default, tightened to TIMEOUT_MULTIPLIER x the observed p99 once there is enough data."""
+        if not ADAPTIVE_TIMEOUTS:
+            return default
+        with self._lock:
+            p = self._window(purpose).percentile(TIMEOUT_PERCENTILE)
+        if p is None:
+            return default
+        adaptive = max(TIMEOUT_FLOOR, p * TIMEOUT_MULTIPLIER)
+        return adaptive if default is None else min(default, adaptive)
+
+    def hedge_delay(self, purpose: str):
+        """Seconds to wait before sending a duplicate, or None when this call is not hedged."""
+        if not ("*" in HEDGE or self.name in HEDGE or purpose in HEDGE):
+            return None
+        with self._lock:
+            p = self._window(purpose).percentile(HEDGE_PERCENTILE)
+        return None if p is None else max(HEDGE_MIN_DELAY, p)
+
+    # ---- breaker ----
+
+    def before_call(self):
+        """Admit a call, or raise CircuitOpenError while the upstream is considered down."""
+        with self._lock:
+            self.counters["requests"] += 1
+            if self.state == OPEN and time.monotonic() - self.opened_at >= BREAKER_COOLDOWN:
+                self.state = HALF_OPEN
+            if self.state == HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return
+            if self.state != CLOSED:
+                self.counters["rejected"] += 1
+                raise CircuitOpenError(f"{self.name} is unavailable (circuit open), try again shortly")
+
+    def record_success(self, purpose: str = None, latency: float = None):
+        """The upstream answered (not necessarily with a 2xx); latency only for comparable calls."""
+        with self._lock:
+            self.counters["successes"] += 1
+            self.consecutive_failures = 0
+            self._probe_in_flight = False
+            if self.state != CLOSED:
+                self.state = CLOSED
+                print(f"[Upstream] {self.name}: circuit closed")
+            if purpose is not None and latency is not None:
+                self._window(purpose).samples.append(latency)
+
+    def record_failure(self):
+        with self._lock:
+            self.counters["failures"] += 1
+            self.consecutive_failures += 1
+            self._probe_in_flight = False
+            if self.state == HALF_OPEN or (
+                self.state == CLOSED and self.consecutive_failures >= BREAKER_FAILURES
+            ):
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+                self.counters["circuit_opened"] += 1
+                print(f"[Upstream] {self.name}: circuit opened after "
+                      f"{self.consecutive_failures} consecutive failures")
+
+    def release(self):
+        """The call ended without telling us anything about the upstream (e.g. our own deadline)."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def count(self, name: str):
+        with self._lock:
+            self.counters[name] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            latency = {}
+            for purpose, window in self._latencies.items():
+                latency[purpose] = {
+                    "samples": len(window.samples),
+                    "p50_ms": _ms(window.percentile(50)),
+                    "p95_ms": _ms(window.percentile(95)),
+                    "p99_ms": _ms(window.percentile(99)),
+                }
+            return {
+                "state": self.state,
+                "consecutive_failures": self.consecutive_failures,
+                **self.counters,
+                "latency": latency,
+            }
+
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 1)
+
+
+_upstreams = {}
+_upstreams_lock = threading.Lock()
+
+
+def upstream(name: str) -> Upstream:
+    with _upstreams_lock:
+        up = _upstreams.get(name)
+        if up is None:
+            up = _upstreams[name] = Upstream(name)
+        return up
+
+
+# ---------- Retry policy ----------
+
+def is_retryable_status(status_code: int) -> bool:
+    return status_code in RETRYABLE_STATUS
+
+
+def counts_as_failure(status_code: int) -> bool:
+    """429 means this key is rate limited, not that the provider is down."""
+    return status_code >= 500 or status_code == 408
+
+
+def retry_after(headers) -> float:
+    value = (headers or {}).get("retry-after")
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def backoff_delay(attempt: int, hint: float = 0.0):
+    """
+    Full-jitter delay before retry number attempt (1-based), or None when the
+    attempts or the request deadline are used up.
+    """
+    if attempt >= RETRY_ATTEMPTS:
+        return None
+    delay = random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * (2 ** (attempt - 1))))
+    delay = max(delay, min(hint, RETRY_MAX_DELAY))
+    left = remaining()
+    if left is not None and delay >= left:
+        return None
+    return delay
+
+
+# ---------- Wrapper for calls that do their own HTTP ----------
+
+_bounded_pool = None
+_bounded_lock = threading.Lock()
+
+
+def _run_bounded(fn, timeout: float):
+    global _bounded_pool
+    with _bounded_lock:
+        if _bounded_pool is None:
+            _bounded_pool = ThreadPoolExecutor(
+                max_workers=BOUNDED_CALL_WORKERS, thread_name_prefix="upstream-call"
+            )
+    future = _bounded_pool.submit(fn)
+    try:
+        return future.result(timeout=timeout)
+    except FutureTimeout:
+        future.cancel()
+        raise TimeoutError(f"upstream call timed out after {timeout:.0f}s")
+
+
+def _end_span(span, purpose: str, error: BaseException = None):
+    host = span.attrs["host"]
+    if error is not None:
+        span.set(error=type(error).__name__)
+        upstream_errors.inc(host=host, purpose=purpose, type=type(error).__name__)
+    span.end()
+    upstream_duration.observe(span.duration, host=host, purpose=purpose,
+                              status="error" if error is not None else "ok")
+
+
+def call(name: str, fn, retry_on: tuple = (), purpose: str = None, timeout: float = None):
+    """
+    Run fn() against upstream name with the breaker, retries on retry_on
+    exceptions (plus timeouts) and, if timeout is given, a bound on how long
+    the caller waits, adapted to observed latency like the HTTP transports.
+    """
+    up = upstream(name)
+    purpose = purpose or name
+    retryable = tuple(retry_on) + (TimeoutError,)
+    attempt = 0
+    while True:
+        attempt += 1
+        up.before_call()
+        started = time.monotonic()
+        span = start_span("upstream", host=name, purpose=purpose)
+        try:
+            if timeout is None:
+                result = fn()
+            else:
+                result = _run_bounded(fn, remaining(up.read_timeout(purpose, timeout)))
+        except retryable as e:
+            _end_span(span, purpose, e)
+            up.record_failure()
+            delay = backoff_delay(attempt)
+            if delay is None:
+                raise
+            up.count("retries")
+            print(f"[Upstream] {name}: {e!r}, retry {attempt} in {delay:.2f}s")
+            time.sleep(delay)
+            continue
+        except BaseException as e:
+            _end_span(span, purpose, e)
+            up.release()
+            raise
+        _end_span(span, purpose)
+        up.record_success(purpose, time.monotonic() - started)
+        return result
+
+
+def get_resilience_stats() -> dict:
+    with _upstreams_lock:
+        ups = list(_upstreams.values())
+    return {up.name: up.stats() for up in ups}
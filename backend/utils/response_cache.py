@@ -0,0 +1,408 @@
+"""
+response_cache.py
+Content-addressed cache for LLM-backed generators.
+
+Key = sha256(namespace, model, prompt template version, normalized inputs),
+so the same NCERT topic text always maps to the same entry no matter which
+student asks for it. Entries live in a small in-memory LRU tier backed by
+an on-disk tier with TTL and size-based eviction, and finally in the
+artifact store that precompute.py fills offline (no TTL, no eviction).
+
+Usage:
+    PROMPT_VERSION = "1"
+
+    @cached_generation("simplify", PROMPT_VERSION)
+    def simplify_text(client, text): ...
+
+Bump PROMPT_VERSION whenever the prompt changes; old entries stop matching
+immediately and purge_stale_entries() reclaims their space.
+"""
+
+import os
+import re
+import json
+import time
+import asyncio
+import hashlib
+import inspect
+import functools
+import threading
+from collections import OrderedDict
+from utils.gemini_client import MODEL
+from utils.single_flight import coalesce, coalesce_async, COALESCING_ENABLED, get_coalescing_stats
+from utils.artifact_store import get_artifact_store
+from utils.telemetry import span
+
+CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "1") != "0"
+CACHE_DIR = os.getenv("RESPONSE_CACHE_DIR", os.path.join("cache", "responses"))
+CACHE_TTL = int(os.getenv("RESPONSE_CACHE_TTL", str(30 * 24 * 3600)))
+CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+CACHE_MEMORY_ITEMS = int(os.getenv("RESPONSE_CACHE_MEMORY_ITEMS", "1024"))
+
+_MISS = object()
+
+
+# ── Key construction ──────────────────────────────────────────
+
+def normalize_text(text: str) -> str:
+    """Whitespace-insensitive form of the input so trivial edits still hit."""
+    text = (text or "").replace("\r\n", "\n").replace("\r", "\n")
+    text = "\n".join(re.sub(r"[ \t]+", " ", ln).strip() for ln in text.split("\n"))
+    text = re.sub(r"\n{3,}", "\n\n", text)
+    return text.strip()
+
+
+def _normalize_arg(value):
+    if isinstance(value, str):
+        return normalize_text(value)
+    return value
+
+
+def make_key(namespace: str, version: str, args: tuple, kwargs: dict) -> str:
+    parts = {
+        "ns": namespace,
+        "model": MODEL,
+        "v": version,
+        "args": [_normalize_arg(a) for a in args],
+        "kwargs": {k: _normalize_arg(v) for k, v in sorted(kwargs.items())},
+    }
+    raw = json.dumps(parts, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+# ── Tiers ─────────────────────────────────────────────────────
+#
+# Every tier stores the same entry dict:
+#   {"namespace", "version", "created", "payload"}
+# where payload is the JSON-encoded result. Decoding on every hit means
+# callers always get a fresh object and can mutate it safely.
+
+class MemoryLRUTier:
+    name = "memory"
+
+    def __init__(self, max_items: int):
+        self.max_items = max_items
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            if CACHE_TTL and time.time() - entry["created"] > CACHE_TTL:
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return entry
+
+    def set(self, key, entry):
+        with self._lock:
+            self._data[key] = entry
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_items:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, predicate) -> int:
+        with self._lock:
+            doomed = [k for k, e in self._data.items() if predicate(e)]
+            for k in doomed:
+                del self._data[k]
+            return len(doomed)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"items": len(self._data), "evictions": self.evictions}
+
+
+class DiskTier:
+    name = "disk"
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._bytes = None  # computed lazily on first write
+        self.evictions = 0
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def _iter_files(self):
+        if not os.path.isdir(self.directory):
+            return
+        for root, _dirs, files in os.walk(self.directory):
+            for fname in files:
+                if fname.endswith(".json"):
+                    yield os.path.join(root, fname)
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if CACHE_TTL and time.time() - entry.get("created", 0) > CACHE_TTL:
+            self._remove(path)
+            return None
+        try:
+            os.utime(path, None)  # mtime doubles as LRU clock
+        except OSError:
+            pass
+        return entry
+
+    def set(self, key, entry):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data = json.dumps(entry, ensure_ascii=False).encode("utf-8")
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+        with self._lock:
+            if self._bytes is None:
+                self._bytes = sum(os.path.getsize(p) for p in self._iter_files())
+            else:
+                self._bytes += len(data)
+            if self._bytes > self.max_bytes:
+                self._evict_locked()
+
+    def _remove(self, path) -> int:
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+        except OSError:
+            return 0
+        with self._lock:
+            if self._bytes is not None:
+                self._bytes = max(self._bytes - size, 0)
+        return size
+
+    def _evict_locked(self):
+        """Drop least-recently-used files until we are back under 90% of the cap."""
+        files = []
+        for p in self._iter_files():
+            try:
+                st = os.stat(p)
+            except OSError:
+                continue
+            files.append((st.st_mtime, st.st_size, p))
+        files.sort()
+        total = sum(size for _, size, _ in files)
+        target = int(self.max_bytes * 0.9)
+        for _mtime, size, p in files:
+            if total <= target:
+                break
+            try:
+                os.remove(p)
+            except OSError:
+                continue
+            total -= size
+            self.evictions += 1
+        self._bytes = total
+
+    def invalidate(self, predicate) -> int:
+        removed = 0
+        for p in list(self._iter_files()):
+            try:
+                with open(p, "r", encoding="utf-8") as f:
+                    entry = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if predicate(entry):
+                self._remove(p)
+                removed += 1
+        return removed
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"bytes": self._bytes, "max_bytes": self.max_bytes, "evictions": self.evictions}
+
+
+class ResponseCache:
+    """Looks up tiers in order and promotes lower-tier hits into the faster tiers."""
+
+    def __init__(self, tiers: list):
+        self.tiers = tiers
+        self._lock = threading.Lock()
+        self._counters = {}
+
+    def _count(self, namespace, field):
+        with self._lock:
+            c = self._counters.setdefault(namespace, {"hits": 0, "misses": 0, "sets": 0})
+            c[field] += 1
+
+    def get(self, namespace, key):
+        for i, tier in enumerate(self.tiers):
+            entry = tier.get(key)
+            if entry is not None:
+                for upper in self.tiers[:i]:
+                    upper.set(key, entry)
+                self._count(namespace, "hits")
+                return json.loads(entry["payload"])
+        self._count(namespace, "misses")
+        return _MISS
+
+    def set(self, namespace, version, key, value):
+        entry = {
+            "namespace": namespace,
+            "version": version,
+            "created": time.time(),
+            "payload": json.dumps(value, ensure_ascii=False),
+        }
+        for tier in self.tiers:
+            try:
+                tier.set(key, entry)
+            except OSError as e:
+                print(f"[ResponseCache] {tier.name} tier write failed: {e}")
+        self._count(namespace, "sets")
+
+    def invalidate(self, predicate) -> int:
+        return sum(tier.invalidate(predicate) for tier in self.tiers)
+
+    def stats(self) -> dict:
+        with self._lock:
+            namespaces = {ns: dict(c) for ns, c in self._counters.items()}
+        for c in namespaces.values():
+            total = c["hits"] + c["misses"]
+            c["hit_rate"] = round(c["hits"] / total, 4) if total else 0.0
+        return {
+            "enabled": CACHE_ENABLED,
+            "namespaces": namespaces,
+            "tiers": {tier.name: tier.stats() for tier in self.tiers},
+        }
+
+
+_cache = ResponseCache([
+    MemoryLRUTier(CACHE_MEMORY_ITEMS),
+    DiskTier(CACHE_DIR, CACHE_MAX_BYTES),
+    get_artifact_store(),   # precomputed by precompute.py; read-only in the server
+])
+
+# namespace -> current prompt template version
+_versions = {}
+
+
+def set_cache_backend(cache: ResponseCache):
+    """Swap in a different tier stack (e.g. memory-only) for the whole process."""
+    global _cache
+    _cache = cache
+
+
+def _is_error_result(result) -> bool:
+    if isinstance(result, dict) and "error" in result:
+        return True
+    if isinstance(result, str) and result.startswith("Error "):
+        return True
+    return False
+
+
+# ── Public API ────────────────────────────────────────────────
+
+def cached_generation(namespace: str, version: str, skip=_is_error_result):
+    """
+    Cache a generator of the form fn(client, *inputs), sync or async. The
+    client is never part of the key. Results for which skip(result) is true (error payloads
+    by default) are returned but not stored. Concurrent misses for the same
+    key share one call (see utils/single_flight.py).
+    """
+    _versions[namespace] = version
+
+    def decorator(fn):
+        if inspect.iscoroutinefunction(fn):
+            return _cached_coroutine(fn, namespace, version, skip)
+
+        @functools.wraps(fn)
+        def wrapper(client, *args, **kwargs):
+            with span(f"service.{namespace}") as s:
+                if not (CACHE_ENABLED or COALESCING_ENABLED):
+                    return fn(client, *args, **kwargs)
+
+                key = make_key(namespace, version, args, kwargs)
+                if CACHE_ENABLED:
+                    cached = _cache.get(namespace, key)
+                    s.set(cache="miss" if cached is _MISS else "hit")
+                    if cached is not _MISS:
+                        return cached
+
+                def produce():
+                    result = fn(client, *args, **kwargs)
+                    if CACHE_ENABLED and not skip(result):
+                        _cache.set(namespace, version, key, result)
+                    return result
+
+                return coalesce(namespace, key, produce)
+
+        wrapper.uncached = fn
+        wrapper.cache_namespace = namespace
+        return wrapper
+
+    return decorator
+
+
+def _cached_coroutine(fn, namespace: str, version: str, skip):
+    """cached_generation for async generators; disk I/O stays off the event loop."""
+
+    @functools.wraps(fn)
+    async def wrapper(client, *args, **kwargs):
+        with span(f"service.{namespace}") as s:
+            if not (CACHE_ENABLED or COALESCING_ENABLED):
+                return await fn(client, *args, **kwargs)
+
+            key = make_key(namespace, version, args, kwargs)
+            if CACHE_ENABLED:
+                cached = await asyncio.to_thread(_cache.get, namespace, key)
+                s.set(cache="miss" if cached is _MISS else "hit")
+                if cached is not _MISS:
+                    return cached
+
+            async def produce():
+                result = await fn(client, *args, **kwargs)
+                if CACHE_ENABLED and not skip(result):
+                    await asyncio.to_thread(_cache.set, namespace, version, key, result)
+                return result
+
+            return await coalesce_async(namespace, key, produce)
+
+    wrapper.uncached = fn
+    wrapper.cache_namespace = namespace
+    return wrapper
+
+
+def get_cached(namespace: str, *args, **kwargs):
+    """Look up a generator's cached result directly; returns None on a miss."""
+    if not CACHE_ENABLED:
+        return None
+    key = make_key(namespace, _versions[namespace], args, kwargs)
+    cached = _cache.get(namespace, key)
+    return None if cached is _MISS else cached
+
+
+def set_cached(namespace: str, value, *args, **kwargs):
+    """Store a result produced outside the decorated function (e.g. a finished stream)."""
+    if not CACHE_ENABLED or _is_error_result(value):
+        return
+    version = _versions[namespace]
+    _cache.set(namespace, version, make_key(namespace, version, args, kwargs), value)
+
+
+def invalidate_namespace(namespace: str) -> int:
+    """Drop every cached entry for one generator, whatever its version."""
+    return _cache.invalidate(lambda e: e.get("namespace") == namespace)
+
+
+def purge_stale_entries() -> int:
+    """Drop entries whose prompt template version is no longer current."""
+    def is_stale(entry):
+        current = _versions.get(entry.get("namespace"))
+        return current is not None and entry.get("version") != current
+    return _cache.invalidate(is_stale)
+
+
+def get_cache_stats() -> dict:
+    stats = _cache.stats()
+    stats["coalescing"] = get_coalescing_stats()
+    return stats
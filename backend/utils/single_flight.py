@@ -0,0 +1,157 @@
+"""
+single_flight.py
+Coalesces identical in-flight calls: while a call for a key is running,
+later callers with the same key wait for it and share its result instead of
+starting their own upstream request. When a class opens the same topic at
+once, forty identical /simplify_text calls become one model call.
+
+The async path (every generator behind cached_generation) runs the shared
+call as its own task with no request deadline; each caller waits only as
+long as its own deadline allows, and the call is cancelled once nobody is
+waiting for it any more. Followers get a deep copy of the result so they
+can mutate it freely.
+"""
+
+import os
+import copy
+import asyncio
+import threading
+from utils.request_deadline import remaining, clear_deadline, DeadlineExceeded
+
+COALESCING_ENABLED = os.getenv("REQUEST_COALESCING", "1") != "0"
+
+
+class _AsyncFlight:
+    __slots__ = ("task", "loop", "waiters")
+
+    def __init__(self, task, loop):
+        self.task = task
+        self.loop = loop
+        self.waiters = 0
+
+
+class _SyncFlight:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._async = {}
+        self._sync = {}
+        self._counters = {}
+
+    def _count(self, namespace: str, field: str):
+        with self._lock:
+            c = self._counters.setdefault(
+                namespace, {"calls": 0, "coalesced": 0, "waiters_gave_up": 0, "abandoned": 0}
+            )
+            c[field] += 1
+
+    async def do_async(self, namespace: str, key: str, make_coro):
+        """Await make_coro(), or the identical call already in flight for key."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            flight = self._async.get(key)
+            leader = flight is None or flight.loop is not loop
+            if leader:
+                flight = _AsyncFlight(loop.create_task(self._detached(make_coro)), loop)
+                self._async[key] = flight
+                flight.task.add_done_callback(lambda _task: self._forget(self._async, key, flight))
+            flight.waiters += 1
+        self._count(namespace, "calls" if leader else "coalesced")
+
+        try:
+            result = await asyncio.shield(flight.task)
+        except asyncio.CancelledError:
+            # This caller gave up (deadline, disconnect); the call carries on for the others.
+            self._count(namespace, "waiters_gave_up")
+            with self._lock:
+                flight.waiters -= 1
+                abandon = flight.waiters == 0 and not flight.task.done()
+                if abandon and self._async.get(key) is flight:
+                    # Unlist it now, not in the done callback, so nobody joins a cancelled call
+                    del self._async[key]
+            if abandon:
+                flight.task.cancel()
+                self._count(namespace, "abandoned")
+            raise
+        with self._lock:
+            flight.waiters -= 1
+        return result if leader else copy.deepcopy(result)
+
+    @staticmethod
+    async def _detached(make_coro):
+        # Shared by several requests, so bounded by its waiters rather than one request's deadline
+        clear_deadline()
+        return await make_coro()
+
+    def do(self, namespace: str, key: str, fn):
+        """Blocking form of do_async for sync generators."""
+        with self._lock:
+            flight = self._sync.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._sync[key] = _SyncFlight()
+        self._count(namespace, "calls" if leader else "coalesced")
+
+        if leader:
+            try:
+                flight.result = fn()
+                return flight.result
+            except BaseException as e:
+                flight.error = e
+                raise
+            finally:
+                self._forget(self._sync, key, flight)
+                flight.done.set()
+
+        if not flight.done.wait(remaining()):
+            self._count(namespace, "waiters_gave_up")
+            raise DeadlineExceeded("Request timed out waiting for an identical request in flight")
+        if isinstance(flight.error, DeadlineExceeded):
+            # The leader ran out of time, not necessarily this caller
+            return self.do(namespace, key, fn)
+        if flight.error is not None:
+            raise flight.error
+        return copy.deepcopy(flight.result)
+
+    def _forget(self, flights: dict, key: str, flight):
+        with self._lock:
+            if flights.get(key) is flight:
+                del flights[key]
+
+    def stats(self) -> dict:
+        with self._lock:
+            namespaces = {ns: dict(c) for ns, c in self._counters.items()}
+            in_flight = len(self._async) + len(self._sync)
+        return {
+            "enabled": COALESCING_ENABLED,
+            "in_flight": in_flight,
+            "calls_saved": sum(c["coalesced"] for c in namespaces.values()),
+            "namespaces": namespaces,
+        }
+
+
+_flights = SingleFlight()
+
+
+async def coalesce_async(namespace: str, key: str, make_coro):
+    if not COALESCING_ENABLED:
+        return await make_coro()
+    return await _flights.do_async(namespace, key, make_coro)
+
+
+def coalesce(namespace: str, key: str, fn):
+    if not COALESCING_ENABLED:
+        return fn()
+    return _flights.do(namespace, key, fn)
+
+
+def get_coalescing_stats() -> dict:
+    return _flights.stats()
@@ -0,0 +1,35 @@
+import json
+from flask import Response, stream_with_context
+
+
+def sse_event(event: str, data) -> str:
+    """Format one server-sent event; data is JSON-encoded."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def sse_response(events):
+    """
+    Stream an iterable of already-formatted SSE strings. Any exception raised
+    while producing them is reported to the client as a final "error" event,
+    since the 200 status line has already been sent by then.
+    """
+    def generate():
+        try:
+            for chunk in events:
+                yield chunk
+        except Exception as e:
+            yield sse_event("error", {"message": str(e)})
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",  # stop reverse proxies buffering the stream
+        },
+    )
+
+
+def wants_stream(data: dict) -> bool:
+    """Streaming is opt-in per request: {"stream": true} in the JSON body."""
+    return bool((data or {}).get("stream"))
@@ -0,0 +1,399 @@
+"""
+telemetry.py
+Built-in metrics and tracing, with no collector to run.
+
+Metrics: latency histograms per route, per upstream and per span, plus
+counters for request/response bytes, LLM prompt/completion tokens and
+errors by type. GET /metrics renders them in the Prometheus text format
+(per worker process).
+
+Tracing: every request gets a trace. span("name") opens a child of the
+current span (route -> service -> upstream call); the pooled transports
+open one per upstream exchange and fill in status, bytes and token usage.
+When the response has been sent, the trace is appended as one JSON line to
+TRACE_FILE, which is rotated once it passes TRACE_FILE_MAX_BYTES.
+"""
+
+import os
+import json
+import time
+import uuid
+import random
+import threading
+import contextvars
+from contextlib import contextmanager
+from dotenv import load_dotenv
+
+load_dotenv()
+
+TELEMETRY_ENABLED = os.getenv("TELEMETRY_ENABLED", "1") != "0"
+TRACE_FILE = os.getenv("TRACE_FILE", os.path.join("cache", "traces.jsonl"))
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "1.0"))
+TRACE_FILE_MAX_BYTES = int(os.getenv("TRACE_FILE_MAX_BYTES", str(50 * 1024 * 1024)))
+# Bodies up to this size are parsed for token usage after they have been forwarded
+USAGE_PARSE_MAX_BYTES = int(os.getenv("USAGE_PARSE_MAX_BYTES", str(1024 * 1024)))
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+
+# ---------- Metrics ----------
+
+def _label_key(labels: dict) -> tuple:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(key: tuple, extra: tuple = ()) -> str:
+    pairs = key + extra
+    if not pairs:
+        return ""
+    escaped = (
+        '{}="{}"'.format(k, v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for k, v in pairs
+    )
+    return "{" + ",".join(escaped) + "}"
+
+
+class Counter:
+    type = "counter"
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> list:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(key)} {_number(value)}" for key, value in items]
+
+
+class Histogram:
+    type = "histogram"
+
+    def __init__(self, name: str, help_text: str, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._series = {}   # labels -> [bucket counts..., sum, count]
+
+    def observe(self, value: float, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> list:
+        with self._lock:
+            items = sorted((key, list(series)) for key, series in self._series.items())
+        lines = []
+        for key, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(key, (('le', _number(bound)),))} {cumulative}")
+            lines.append(f"{self.name}_bucket{_format_labels(key, (('le', '+Inf'),))} {series[-1]}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {_number(series[-2])}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {series[-1]}")
+        return lines
+
+
+def _number(value) -> str:
+    if isinstance(value, float):
+        return repr(round(value, 6)) if value != int(value) else str(int(value))
+    return str(value)
+
+
+http_duration = Histogram("http_request_duration_seconds", "Request latency by route")
+http_request_bytes = Counter("http_request_bytes_total", "Request body bytes by route")
+http_response_bytes = Counter("http_response_bytes_total", "Response body bytes by route")
+http_errors = Counter("http_errors_total", "Responses with status >= 400 by route and status")
+upstream_duration = Histogram("upstream_request_duration_seconds", "Upstream time to response headers by host and purpose")
+upstream_request_bytes = Counter("upstream_request_bytes_total", "Bytes sent upstream by host and purpose")
+upstream_response_bytes = Counter("upstream_response_bytes_total", "Bytes received from upstream by host and purpose")
+upstream_errors = Counter("upstream_errors_total", "Failed upstream exchanges by host and error type")
+llm_tokens = Counter("llm_tokens_total", "LLM tokens reported by the provider, by purpose, model and kind")
+span_duration = Histogram("span_duration_seconds", "Duration of traced steps by span name")
+
+_metrics = [
+    http_duration, http_request_bytes, http_response_bytes, http_errors,
+    upstream_duration, upstream_request_bytes, upstream_response_bytes, upstream_errors,
+    llm_tokens, span_duration,
+]
+
+
+def render_metric(name: str, metric_type: str, help_text: str, samples) -> str:
+    """Exposition text for values kept elsewhere; samples is [(labels dict, value)]."""
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} {metric_type}"]
+    for labels, value in samples:
+        if value is None:
+            continue
+        lines.append(f"{name}{_format_labels(_label_key(labels))} {_number(value)}")
+    return "\n".join(lines)
+
+
+def render_metrics() -> str:
+    blocks = []
+    for metric in _metrics:
+        lines = metric.render()
+        if lines:
+            blocks.append("\n".join([f"# HELP {metric.name} {metric.help}",
+                                     f"# TYPE {metric.name} {metric.type}"] + lines))
+    return "\n".join(blocks)
+
+
+# ---------- Tracing ----------
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+
+class Trace:
+    def __init__(self):
+        self.id = uuid.uuid4().hex
+        self.started = time.time()
+        self.spans = []
+        self._lock = threading.Lock()
+
+    def add(self, span):
+        with self._lock:
+            self.spans.append(span)
+
+
+class Span:
+    __slots__ = ("trace", "id", "parent_id", "name", "attrs", "started", "_t0", "duration", "measured")
+
+    def __init__(self, name: str, parent=None, trace: Trace = None, measured: bool = True, **attrs):
+        self.trace = parent.trace if parent is not None else trace
+        self.id = uuid.uuid4().hex[:16]
+        self.parent_id = parent.id if parent is not None else None
+        self.name = name
+        self.attrs = attrs
+        self.started = time.time()
+        self._t0 = time.monotonic()
+        self.duration = None
+        self.measured = measured
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def end(self):
+        if self.duration is not None:
+            return
+        self.duration = time.monotonic() - self._t0
+        if self.measured:
+            span_duration.observe(self.duration, span=self.name)
+        if self.trace is not None:
+            self.trace.add(self)
+
+    def to_dict(self, origin: float) -> dict:
+        return {
+            "id": self.id,
+            "parent": self.parent_id,
+            "name": self.name,
+            "start_ms": round((self.started - origin) * 1000, 2),
+            "duration_ms": None if self.duration is None else round(self.duration * 1000, 2),
+            "attrs": self.attrs,
+        }
+
+
+def start_span(name: str, **attrs) -> Span:
+    """A child of the current span, not yet made current; call end() when done."""
+    return Span(name, parent=_current_span.get(), **attrs)
+
+
+@contextmanager
+def span(name: str, **attrs):
+    """Time a step as a child of the current span (a no-op trace outside requests)."""
+    s = start_span(name, **attrs)
+    token = _current_span.set(s)
+    try:
+        yield s
+    except BaseException as e:
+        s.set(error=type(e).__name__)
+        raise
+    finally:
+        _current_span.reset(token)
+        s.end()
+
+
+def propagate(fn):
+    """Wrap fn so it runs under the caller's current span when submitted to a thread pool."""
+    parent = _current_span.get()
+
+    def run(*args, **kwargs):
+        token = _current_span.set(parent)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _current_span.reset(token)
+
+    return run
+
+
+class BodyMeter:
+    """
+    Counts an upstream response body as it streams through and, once it is
+    closed, picks the provider's token usage out of it (JSON or SSE).
+    """
+
+    def __init__(self, host: str, purpose: str, content_type: str, span: Span = None):
+        self.host = host
+        self.purpose = purpose
+        self.is_sse = "event-stream" in (content_type or "")
+        self.is_json = "json" in (content_type or "")
+        self.span = span
+        self.size = 0
+        self._chunks = []
+        self._tail = b""
+        self._closed = False
+
+    def feed(self, chunk: bytes):
+        self.size += len(chunk)
+        if self.is_json and self.size <= USAGE_PARSE_MAX_BYTES:
+            self._chunks.append(chunk)
+        elif self.is_sse:
+            # Usage, when sent, is in the last event
+            self._tail = (self._tail + chunk)[-16384:]
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        upstream_response_bytes.inc(self.size, host=self.host, purpose=self.purpose)
+        usage, model = self._usage()
+        attrs = {"response_bytes": self.size}
+        if usage:
+            for kind in ("prompt_tokens", "completion_tokens"):
+                if isinstance(usage.get(kind), int):
+                    llm_tokens.inc(usage[kind], purpose=self.purpose, model=model or "", kind=kind[:-7])
+                    attrs[kind] = usage[kind]
+        if self.span is not None:
+            self.span.set(**attrs)
+
+    def _usage(self):
+        try:
+            if self.is_json and self.size <= USAGE_PARSE_MAX_BYTES and self._chunks:
+                body = json.loads(b"".join(self._chunks))
+                return body.get("usage"), body.get("model")
+            if self.is_sse and b'"usage"' in self._tail:
+                for line in reversed(self._tail.split(b"\n")):
+                    if line.startswith(b"data:") and b'"usage"' in line:
+                        event = json.loads(line[5:].strip())
+                        event = event.get("data", event)   # Mistral nests the chunk under "data"
+                        return event.get("usage"), event.get("model")
+        except (ValueError, AttributeError):
+            pass
+        return None, None
+
+
+# ---------- Trace export ----------
+
+_export_lock = threading.Lock()
+
+
+def _export(trace: Trace, root: Span):
+    if not TRACE_FILE:
+        return
+    record = {
+        "trace_id": trace.id,
+        "name": root.name,
+        "start": trace.started,
+        "duration_ms": round((root.duration or 0) * 1000, 2),
+        "attrs": root.attrs,
+        "spans": [s.to_dict(trace.started) for s in sorted(trace.spans, key=lambda s: s.started)],
+    }
+    line = json.dumps(record, ensure_ascii=False, default=str) + "\n"
+    with _export_lock:
+        try:
+            directory = os.path.dirname(TRACE_FILE)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            if os.path.exists(TRACE_FILE) and os.path.getsize(TRACE_FILE) > TRACE_FILE_MAX_BYTES:
+                os.replace(TRACE_FILE, TRACE_FILE + ".1")
+            with open(TRACE_FILE, "a", encoding="utf-8") as f:
+                f.write(line)
+        except OSError as e:
+            print(f"[Telemetry] trace export failed: {e}")
+
+
+# ---------- Flask integration ----------
+
+def install_telemetry(app):
+    """Trace and measure every request. Install before anything that rewrites responses."""
+    if not TELEMETRY_ENABLED:
+        return
+    from flask import request, g
+    from werkzeug.wsgi import ClosingIterator
+
+    def route_label():
+        return request.url_rule.rule if request.url_rule is not None else "unmatched"
+
+    @app.before_request
+    def _start_trace():
+        trace = Trace() if random.random() < TRACE_SAMPLE_RATE else None
+        # Route latency has its own histogram, so the root span is not measured again
+        root = Span(f"{request.method} {route_label()}", trace=trace, measured=False)
+        g.telemetry_span = root
+        _current_span.set(root)
+        if request.content_length:
+            http_request_bytes.inc(request.content_length, route=route_label())
+
+    @app.after_request
+    def _finish_trace(response):
+        root = getattr(g, "telemetry_span", None)
+        if root is None:
+            return response
+        route, method = route_label(), request.method
+        root.set(status=response.status_code)
+        if response.status_code >= 400:
+            http_errors.inc(route=route, status=response.status_code)
+
+        sent = {"bytes": 0}
+
+        def finish():
+            # Not in teardown_request: that can run before a streamed body is produced
+            _current_span.set(None)
+            if root.duration is not None:
+                return
+            root.end()
+            http_duration.observe(root.duration, route=route, method=method,
+                                  status=response.status_code)
+            http_response_bytes.inc(sent["bytes"], route=route)
+            root.set(response_bytes=sent["bytes"])
+            if root.trace is not None:
+                _export(root.trace, root)
+
+        if response.direct_passthrough:
+            # send_file bodies are handed to wsgi.file_wrapper/sendfile untouched, and
+            # Werkzeug skips call_on_close for them, so finish now; the transfer is not timed
+            sent["bytes"] = response.content_length or 0
+            finish()
+            return response
+        if response.is_streamed:
+            body = response.response
+
+            def counted():
+                for chunk in body:
+                    sent["bytes"] += len(chunk)
+                    yield chunk
+
+            # The server closes what it was handed, so pass that on to the original body
+            close = getattr(body, "close", None)
+            response.response = ClosingIterator(counted(), close) if close else counted()
+        else:
+            sent["bytes"] = response.content_length or 0
+        response.call_on_close(finish)
+        return response
@@ -0,0 +1,9 @@
+"""
+WSGI entry point for production servers:
+    gunicorn -c gunicorn.conf.py wsgi:app
+or simply `python serve.py`.
+"""
+
+from app import app
+
+application = app
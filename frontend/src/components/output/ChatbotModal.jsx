@@ -12,6 +12,8 @@ const ChatbotModal = ({ selectedTopic, selectedLanguage, onClose }) => {
   const [input, setInput] = useState("");
   const [isLoading, setIsLoading] = useState(false);
   const [error, setError] = useState(null);
+  // Server-side session: after the first turn only the new message is sent
+  const [sessionId, setSessionId] = useState(null);
   const bottomRef = useRef(null);
   const inputRef = useRef(null);
 
@@ -55,9 +57,12 @@ const ChatbotModal = ({ selectedTopic, selectedLanguage, onClose }) => {
       const res = await api.chatWithBot({
         topic: selectedTopic?.topic || "",
         topic_content: getTopicContent(),
-        conversation_history: getConversationHistory(),
+        conversation_history: sessionId ? [] : getConversationHistory(),
         message: trimmed,
+        session: true,
+        session_id: sessionId,
       });
+      setSessionId(res.data.data.session_id);
 
       const assistantMsg = {
         role: "assistant",
@@ -87,6 +92,7 @@ const ChatbotModal = ({ selectedTopic, selectedLanguage, onClose }) => {
     ]);
     setInput("");
     setError(null);
+    setSessionId(null);
   };
 
   // Simple markdown-like renderer for bold (**text**) and newlines
@@ -9,9 +9,10 @@ const apiClient = axios.create({
 
 export const extractText = (text) => apiClient.post("/extract_text", { text });
 
-export const uploadPDF = (file) => {
+export const uploadPDF = (file, pages) => {
   const formData = new FormData();
   formData.append("file", file);
+  if (pages) formData.append("pages", pages); // e.g. "45-80"
   return apiClient.post("/upload_pdf", formData, {
     headers: { "Content-Type": "multipart/form-data" },
   });
@@ -74,12 +75,35 @@ export const exportChapterCombinedPDF = (chapterTitle, topics, templateDataUrl)
   );
 };
 
+// ✅ CHAPTER COMBINED, multipart: mindmaps go up as binary parts instead of
+// base64 inside JSON (about 33% smaller, no server-side decode)
+const dataUrlToBlob = async (dataUrl) => (await fetch(dataUrl)).blob();
+
+export const exportChapterCombinedPDFMultipart = async (chapterTitle, topics, templateDataUrl) => {
+  const form = new FormData();
+  form.append("chapter_title", chapterTitle);
+  const textTopics = [];
+  for (let i = 0; i < topics.length; i++) {
+    const { mindmap_image_data_url, ...rest } = topics[i];
+    textTopics.push(rest);
+    if (mindmap_image_data_url) {
+      form.append(`mindmap_image_${i + 1}`, await dataUrlToBlob(mindmap_image_data_url), `mindmap_${i + 1}.png`);
+    }
+  }
+  form.append("topics", JSON.stringify(textTopics));
+  if (templateDataUrl) form.append("template", await dataUrlToBlob(templateDataUrl), "template.png");
+  return axios.post(`${API_BASE_URL}/export/chapter/combined/pdf`, form, { responseType: "blob" });
+};
+
 export const generateQuiz = (topic, text) =>
   apiClient.post("/generate_quiz", { topic_title: topic, simplified_text: text });
 
 export const generateImages = (data) =>
   apiClient.post("/generate_images", data);
 
+export const generateCharts = (text, format = "png") =>
+  apiClient.post("/generate_charts", { text, format });
+
 export const generateMCQ = (topic, content) =>
   apiClient.post("/mcq", { topic, content });
 
@@ -105,4 +129,60 @@ export const explainFlashcard = (question, answer, language) =>
 export const chatWithBot = (payload) =>
   axios.post(`${API_BASE_URL}/chat`, payload);
 
+// Streaming (SSE) variants of /simplify_text, /chat and /generate_insights.
+// onEvent(event, data) is called for every "paragraph"/"token" chunk and
+// once more with "done" (or "error") at the end.
+export const streamPost = async (path, payload, onEvent) => {
+  const res = await fetch(`${API_BASE_URL}${path}`, {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify({ ...payload, stream: true }),
+  });
+  if (!res.ok || !res.body) throw new Error(`Request failed: ${res.status}`);
+
+  const reader = res.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+  for (;;) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+    let sep;
+    while ((sep = buffer.indexOf("\n\n")) !== -1) {
+      const raw = buffer.slice(0, sep);
+      buffer = buffer.slice(sep + 2);
+      const event = (raw.match(/^event: (.*)$/m) || [])[1] || "message";
+      const data = (raw.match(/^data: (.*)$/m) || [])[1];
+      onEvent(event, data ? JSON.parse(data) : null);
+    }
+  }
+};
+
+// Everything for one topic in a single request. onRecord is called with each
+// {artifact, status, data | error} line from /topic_bundle as soon as that
+// artifact is ready, and finally with {artifact: "done"}.
+export const streamTopicBundle = async (topic, text, onRecord, options = {}) => {
+  const res = await fetch(`${API_BASE_URL}/topic_bundle`, {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify({ topic, text, ...options }),
+  });
+  if (!res.ok || !res.body) throw new Error(`Request failed: ${res.status}`);
+
+  const reader = res.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+  for (;;) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+    let nl;
+    while ((nl = buffer.indexOf("\n")) !== -1) {
+      const line = buffer.slice(0, nl).trim();
+      buffer = buffer.slice(nl + 1);
+      if (line) onRecord(JSON.parse(line));
+    }
+  }
+};
+
 export default apiClient;